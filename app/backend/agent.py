@@ -6,15 +6,17 @@ Uses pydantic-ai with duckduckgo_search_tool to find restaurant details.
 
 import asyncio
 import sys
+import threading
 from pathlib import Path
 
 # Add project root to path for direct execution
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from app.backend import http_client
 from app.backend.logging import start_action
 from app.config import LLMConfig, get_app_config, get_llm_config
-from dataclasses import dataclass
+from dataclasses import astuple, dataclass
 from pydantic import BaseModel
 from pydantic_ai import Agent
 
@@ -38,7 +40,6 @@ def sync_duckduckgo_search_tool(max_results: int | None = None):
 
     def search_duckduckgo(query: str) -> list[dict[str, str]]:
         """Synchronous DuckDuckGo search using direct HTTP requests."""
-        import requests
         import urllib.parse
 
         try:
@@ -46,7 +47,7 @@ def sync_duckduckgo_search_tool(max_results: int | None = None):
             search_url = "https://api.duckduckgo.com/"
             params = {'q': f"{query} restaurant near {73107}", 'format': 'json', 'no_html': '1', 'skip_disambig': '1'}
 
-            response = requests.get(search_url, params=params, timeout=10)
+            response = http_client.get(search_url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -150,11 +151,13 @@ class RestaurantSearchAgent:
 
     zip_code: str
     llm_config: LLMConfig | None = None
+    # Prebuilt model (and provider) to share between agents; built from llm_config if omitted
+    model: Any = None
 
     def __post_init__(self):
         if self.llm_config is None:
             self.llm_config = get_llm_config()
-        model = create_model_from_config(self.llm_config)
+        model = self.model if self.model is not None else create_model_from_config(self.llm_config)
         system_prompt = f"""You are a restaurant information assistant.
 Search for restaurant details near zip code {self.zip_code}.
 Find: address, phone, hours, website, brief description.
@@ -227,6 +230,55 @@ Return only factual info from search results."""
                 return None
 
 
+class AgentRegistry:
+    """Process-wide search agents keyed by (LLMConfig, zip code).
+
+    Building an agent creates a model, a provider and the provider's HTTP
+    client; the registry builds each once and hands the same instances to
+    every lookup. Models are shared between zip codes with the same LLMConfig.
+    A changed config (e.g. a new LLM_MODEL) maps to a new key, so it gets fresh
+    instances while the least recently built ones beyond ``max_agents`` are dropped.
+    """
+
+    def __init__(self, max_agents: int = 8):
+        self.max_agents = max_agents
+        self._lock = threading.Lock()
+        self._models: dict[tuple, Any] = {}
+        self._agents: dict[tuple, RestaurantSearchAgent] = {}
+
+    def get(self, zip_code: str, llm_config: LLMConfig | None = None) -> RestaurantSearchAgent:
+        """Get the shared agent for ``zip_code`` and ``llm_config`` (default: current config)."""
+        llm_config = llm_config or get_llm_config()
+        config_key = astuple(llm_config)
+        with self._lock:
+            agent = self._agents.get((config_key, zip_code))
+            if agent is None:
+                if config_key not in self._models:
+                    self._models[config_key] = create_model_from_config(llm_config)
+                agent = RestaurantSearchAgent(zip_code, llm_config, model=self._models[config_key])
+                self._agents[(config_key, zip_code)] = agent
+                while len(self._agents) > self.max_agents:
+                    del self._agents[next(iter(self._agents))]
+                live = {key for key, _ in self._agents}
+                for stale in [key for key in self._models if key not in live]:
+                    del self._models[stale]
+            return agent
+
+    def clear(self) -> None:
+        """Drop every cached agent and model."""
+        with self._lock:
+            self._agents.clear()
+            self._models.clear()
+
+
+agents = AgentRegistry()
+
+
+def get_search_agent(llm_config: LLMConfig | None = None) -> RestaurantSearchAgent:
+    """Shared agent for the configured zip code and LLM."""
+    return agents.get(get_app_config()["zip_code"], llm_config)
+
+
 async def lookup_restaurant_info_async(restaurant_name: str) -> RestaurantInfo | None:
     """
     Async convenience function with default config.
@@ -237,23 +289,22 @@ async def lookup_restaurant_info_async(restaurant_name: str) -> RestaurantInfo |
     Returns:
         RestaurantInfo or None on error
     """
-    app_config = get_app_config()
-    agent = RestaurantSearchAgent(zip_code=app_config["zip_code"])
-    return await agent.search_async(restaurant_name)
+    return await get_search_agent().search_async(restaurant_name)
 
 
-def lookup_restaurant_info(restaurant_name: str) -> RestaurantInfo | None:
+def lookup_restaurant_info(restaurant_name: str, raise_errors: bool = False) -> RestaurantInfo | None:
     """
     Sync convenience function with default config.
 
     Args:
         restaurant_name: Name of the restaurant
+        raise_errors: Re-raise configuration, connection and HTTP errors instead
+                      of returning None (used by bulk enrichment to count failures)
 
     Returns:
-        RestaurantInfo or None on error
+        RestaurantInfo, or None if nothing usable was found (or on error)
     """
     import json
-    import requests
     from eliot import log_message
 
     log_message(message_type="lookup_info_start", restaurant=restaurant_name)
@@ -284,7 +335,7 @@ If you cannot find specific information, use null for that field. Do not make up
 
             payload = {"model": llm_config.model, "prompt": prompt, "stream": False, "format": "json"}
 
-            response = requests.post(ollama_url, json=payload, timeout=30)
+            response = http_client.post(ollama_url, json=payload, timeout=llm_config.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -330,7 +381,7 @@ If you cannot find specific information, use null for that field. Do not make up
                 "max_tokens": 500,
             }
 
-            response = requests.post(openrouter_url, headers=headers, json=payload, timeout=30)
+            response = http_client.post(openrouter_url, headers=headers, json=payload, timeout=llm_config.timeout)
             response.raise_for_status()
 
             result = response.json()
@@ -353,13 +404,15 @@ If you cannot find specific information, use null for that field. Do not make up
         else:
             # For other providers, fall back to the pydantic-ai approach
             log_message(message_type="lookup_info_fallback_provider", provider=llm_config.provider)
-            agent = RestaurantSearchAgent(zip_code=app_config["zip_code"])
+            agent = get_search_agent(llm_config)
             log_message(message_type="lookup_info_agent_created")
             result = agent.search(restaurant_name)
             return result
 
     except Exception as e:
         log_message(message_type="lookup_info_error", error=str(e))
+        if raise_errors:
+            raise
         return None
     finally:
         log_message(message_type="lookup_info_complete", found=False)  # Will be overridden if successful
@@ -0,0 +1,129 @@
+"""
+Async data-access layer.
+
+Awaitable versions of the app.backend.db API for FastHTML route handlers. Every
+call runs the blocking sqlite3 function on one bounded, process-wide thread pool
+(DB_EXECUTOR_WORKERS threads), so the event loop stays responsive and slow
+writes queue on the pool instead of pinning request threads. Each pool thread
+reuses its own pooled connection from app.backend.db.
+"""
+
+import asyncio
+import functools
+import threading
+from app.backend import db
+from app.config import get_app_config
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared database executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_app_config()["db_executor_workers"],
+                    thread_name_prefix="lunch-db",
+                )
+    return _executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Shutdown hook: stop the shared executor (a new one is created on next use)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the shared executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def create_db_and_tables():
+    return await run_db(db.create_db_and_tables)
+
+
+async def get_all_restaurants() -> list[tuple[str, str]]:
+    return await run_db(db.get_all_restaurants)
+
+
+async def get_restaurants(option) -> list[tuple[str, str]]:
+    return await run_db(db.get_restaurants, option)
+
+
+async def search_restaurants(query: str, limit: int = 20) -> list[dict]:
+    return await run_db(db.search_restaurants, query, limit)
+
+
+async def rng_restaurant(option, rng=None) -> tuple[str, str]:
+    return await run_db(db.rng_restaurant, option, rng)
+
+
+async def add_restaurant_to_db(name, option) -> bool:
+    return await run_db(db.add_restaurant_to_db, name, option)
+
+
+async def delete_restaurant_from_db(name) -> bool:
+    return await run_db(db.delete_restaurant_from_db, name)
+
+
+async def set_restaurant_rating(name: str, rating: float | None) -> None:
+    return await run_db(db.set_restaurant_rating, name, rating)
+
+
+async def apply_restaurant_batch(operations) -> list[dict]:
+    return await run_db(db.apply_restaurant_batch, operations)
+
+
+async def add_to_recent_lunch(restaurant_name) -> bool:
+    return await run_db(db.add_to_recent_lunch, restaurant_name)
+
+
+async def calculate_lunch(option="Normal", session_rolled=None, rotation_key=None, mode=None, rng=None) -> tuple[str, str]:
+    return await run_db(db.calculate_lunch, option, session_rolled, rotation_key, mode, rng)
+
+
+async def calculate_lunches(
+    count: int, option="Normal", session_rolled=None, rotation_key=None, mode=None, rng=None
+) -> list[tuple[str, str]]:
+    return await run_db(db.calculate_lunches, count, option, session_rolled, rotation_key, mode, rng)
+
+
+def schedule_prefetch(rotation_key: str, option="Normal") -> Future:
+    """Ready a rotation's next pick on the shared executor without waiting for it."""
+    future = get_executor().submit(db.prefetch_next_pick, rotation_key, option, db.db_path)
+    future.add_done_callback(_report_prefetch_error)
+    return future
+
+
+def _report_prefetch_error(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error prefetching next pick: {future.exception()}")
+
+
+async def get_recent_lunches(limit: int | None = None) -> list[tuple[str, str]]:
+    return await run_db(db.get_recent_lunches, limit)
+
+
+async def get_restaurant_info(restaurant_name: str, max_age_days: int | None = None) -> dict | None:
+    return await run_db(db.get_restaurant_info, restaurant_name, max_age_days)
+
+
+async def save_restaurant_info(restaurant_name: str, **fields) -> None:
+    return await run_db(db.save_restaurant_info, restaurant_name, **fields)
+
+
+async def delete_restaurant_info(restaurant_name: str) -> None:
+    return await run_db(db.delete_restaurant_info, restaurant_name)
+
+
+async def import_file(path, table: str, **kwargs) -> db.ImportResult:
+    return await run_db(db.import_file, path, table, **kwargs)
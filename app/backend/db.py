@@ -1,9 +1,20 @@
 import csv
+import io
+import itertools
+import json
+import msgpack
 import os
 import random
+import re
 import sqlite3
+import string
 import sys
-from datetime import datetime
+import threading
+from app.config import StorageConfig, get_storage_config
+from collections.abc import Callable, Collection, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
 from pathlib import Path
 
 
@@ -44,262 +55,1868 @@ db_path = get_user_data_dir() / "lunch.db"
 # CSV seed data: bundled with app (read-only)
 restaurants_csv = get_base_path() / "app" / "data" / "lunch_list.csv"
 
-
-def create_db_and_tables():
-    """Create database and tables if they don't exist"""
-    conn = None
-    try:
-        # Create a connection
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Create tables if they don't exist
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS lunch_list (
-            restaurants TEXT PRIMARY KEY,
-            option TEXT
-        )
+# Prebuilt seed database: produced at build time by build_seed_db (read-only)
+seed_db_path = get_base_path() / "app" / "data" / "seed.db"
+
+
+def _migration_base_tables(conn: sqlite3.Connection) -> None:
+    """v1: the original lunch_list, recent_lunch and restaurant_info tables."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS lunch_list (
+        restaurants TEXT PRIMARY KEY,
+        option TEXT
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS recent_lunch (
+        restaurants TEXT PRIMARY KEY,
+        date TEXT
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS restaurant_info (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        restaurant_name TEXT NOT NULL UNIQUE,
+        address TEXT,
+        phone TEXT,
+        hours TEXT,
+        website TEXT,
+        description TEXT,
+        last_updated TEXT,
+        FOREIGN KEY (restaurant_name) REFERENCES lunch_list(restaurants)
+            ON DELETE CASCADE
+    )
+    ''')
+
+
+def _migration_category_key(conn: sqlite3.Connection) -> None:
+    """v2: normalized category key with a covering index for category lookups."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(lunch_list)")}
+    if "category" not in columns:
+        conn.execute("ALTER TABLE lunch_list ADD COLUMN category TEXT GENERATED ALWAYS AS (lower(trim(option))) VIRTUAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lunch_list_category ON lunch_list (category, restaurants, option)")
+
+
+def _migration_history_log(conn: sqlite3.Connection) -> None:
+    """v3: append-only, date-indexed recent_lunch so repeat visits are kept."""
+    conn.execute('''
+    CREATE TABLE recent_lunch_log (
+        id INTEGER PRIMARY KEY,
+        restaurants TEXT NOT NULL,
+        date TEXT NOT NULL
+    )
+    ''')
+    conn.execute(
+        "INSERT INTO recent_lunch_log (restaurants, date) "
+        "SELECT restaurants, coalesce(date, '') FROM recent_lunch WHERE restaurants IS NOT NULL ORDER BY date"
+    )
+    conn.execute("DROP TABLE recent_lunch")
+    conn.execute("ALTER TABLE recent_lunch_log RENAME TO recent_lunch")
+    conn.execute("CREATE INDEX idx_recent_lunch_date ON recent_lunch (date)")
+    conn.execute("CREATE INDEX idx_recent_lunch_restaurant ON recent_lunch (restaurants, date)")
+
+
+def _migration_search_index(conn: sqlite3.Connection) -> None:
+    """v4: stable integer ids on lunch_list and an FTS5 index kept in sync by triggers.
+
+    lunch_list is rebuilt with an explicit ``id INTEGER PRIMARY KEY`` (last, so
+    positional reads of name and option are unchanged); implicit rowids may be
+    renumbered by VACUUM, which would desynchronize the search index.
+    """
+    conn.execute('''
+    CREATE TABLE lunch_list_new (
+        restaurants TEXT NOT NULL UNIQUE,
+        option TEXT,
+        category TEXT GENERATED ALWAYS AS (lower(trim(option))) VIRTUAL,
+        id INTEGER PRIMARY KEY
+    )
+    ''')
+    conn.execute(
+        "INSERT INTO lunch_list_new (restaurants, option) "
+        "SELECT restaurants, option FROM lunch_list WHERE restaurants IS NOT NULL ORDER BY restaurants"
+    )
+    conn.execute("DROP TABLE lunch_list")
+    conn.execute("ALTER TABLE lunch_list_new RENAME TO lunch_list")
+    conn.execute("CREATE INDEX idx_lunch_list_category ON lunch_list (category, restaurants, option)")
+
+    conn.execute('''
+    CREATE VIRTUAL TABLE restaurant_search USING fts5(
+        name, option, address, hours, description,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''')
+    conn.execute('''
+    INSERT INTO restaurant_search (rowid, name, option, address, hours, description)
+    SELECT l.id, l.restaurants, l.option, i.address, i.hours, i.description
+    FROM lunch_list l LEFT JOIN restaurant_info i ON i.restaurant_name = l.restaurants
+    ''')
+
+    # One search row per lunch_list row (rowid = lunch_list.id), enriched from restaurant_info
+    conn.execute('''
+    CREATE TRIGGER lunch_list_search_insert AFTER INSERT ON lunch_list BEGIN
+        INSERT INTO restaurant_search (rowid, name, option, address, hours, description)
+        SELECT new.id, new.restaurants, new.option, i.address, i.hours, i.description
+        FROM (SELECT 1) LEFT JOIN restaurant_info i ON i.restaurant_name = new.restaurants;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER lunch_list_search_delete AFTER DELETE ON lunch_list BEGIN
+        DELETE FROM restaurant_search WHERE rowid = old.id;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER lunch_list_search_update AFTER UPDATE ON lunch_list BEGIN
+        DELETE FROM restaurant_search WHERE rowid = old.id;
+        INSERT INTO restaurant_search (rowid, name, option, address, hours, description)
+        SELECT new.id, new.restaurants, new.option, i.address, i.hours, i.description
+        FROM (SELECT 1) LEFT JOIN restaurant_info i ON i.restaurant_name = new.restaurants;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER restaurant_info_search_insert AFTER INSERT ON restaurant_info BEGIN
+        UPDATE restaurant_search SET address = new.address, hours = new.hours, description = new.description
+        WHERE rowid = (SELECT id FROM lunch_list WHERE restaurants = new.restaurant_name);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER restaurant_info_search_update AFTER UPDATE ON restaurant_info BEGIN
+        UPDATE restaurant_search SET address = NULL, hours = NULL, description = NULL
+        WHERE rowid = (SELECT id FROM lunch_list WHERE restaurants = old.restaurant_name);
+        UPDATE restaurant_search SET address = new.address, hours = new.hours, description = new.description
+        WHERE rowid = (SELECT id FROM lunch_list WHERE restaurants = new.restaurant_name);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER restaurant_info_search_delete AFTER DELETE ON restaurant_info BEGIN
+        UPDATE restaurant_search SET address = NULL, hours = NULL, description = NULL
+        WHERE rowid = (SELECT id FROM lunch_list WHERE restaurants = old.restaurant_name);
+    END
+    ''')
+
+
+def _migration_rotation(conn: sqlite3.Connection) -> None:
+    """v5: persistent shuffle-bag rotation per (rotation key, category)."""
+    conn.execute('''
+    CREATE TABLE rotation_bag (
+        rotation_key TEXT NOT NULL,
+        category TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        restaurant_id INTEGER NOT NULL,
+        PRIMARY KEY (rotation_key, category, position)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE rotation_cursor (
+        rotation_key TEXT NOT NULL,
+        category TEXT NOT NULL,
+        cursor INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        max_id INTEGER NOT NULL,
+        updated TEXT NOT NULL,
+        PRIMARY KEY (rotation_key, category)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX idx_rotation_cursor_updated ON rotation_cursor (updated)")
+
+
+def _migration_ratings(conn: sqlite3.Connection) -> None:
+    """v6: optional 0-5 rating per restaurant for weighted selection.
+
+    Kept beside lunch_list rather than in it: a query on the virtual ``category``
+    column counts as using every column, so adding one to lunch_list would stop
+    the category index from covering catalog reads.
+    """
+    conn.execute('''
+    CREATE TABLE restaurant_rating (
+        restaurant_id INTEGER PRIMARY KEY,
+        rating REAL NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TRIGGER lunch_list_rating_delete AFTER DELETE ON lunch_list BEGIN
+        DELETE FROM restaurant_rating WHERE restaurant_id = old.id;
+    END
+    ''')
+
+
+def _migration_groups(conn: sqlite3.Connection) -> None:
+    """v7: group rooms whose members' vetoes and likes are bitsets over lunch_list ids.
+
+    Ids of deleted restaurants are queued in ``group_released_id`` so their bits
+    can be cleared from every member before a new restaurant reuses the id.
+    ``catalog_generation`` counts lunch_list writes, so caches derived from the
+    catalog can tell its changes apart from commits to other tables.
+    """
+    conn.execute('''
+    CREATE TABLE group_room (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        created TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE group_member (
+        room_id INTEGER NOT NULL,
+        member TEXT NOT NULL,
+        vetoes BLOB NOT NULL,
+        likes BLOB NOT NULL,
+        PRIMARY KEY (room_id, member)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE TABLE group_released_id (restaurant_id INTEGER PRIMARY KEY)")
+    conn.execute('''
+    CREATE TRIGGER lunch_list_group_release AFTER DELETE ON lunch_list BEGIN
+        INSERT OR IGNORE INTO group_released_id (restaurant_id) VALUES (old.id);
+    END
+    ''')
+
+    conn.execute("CREATE TABLE catalog_generation (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL)")
+    conn.execute("INSERT INTO catalog_generation (id, generation) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+        CREATE TRIGGER lunch_list_generation_{event.lower()} AFTER {event} ON lunch_list BEGIN
+            UPDATE catalog_generation SET generation = generation + 1 WHERE id = 1;
+        END
         ''')
 
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS recent_lunch (
-            restaurants TEXT PRIMARY KEY,
-            date TEXT
-        )
+
+def _migration_history_key(conn: sqlite3.Connection) -> None:
+    """v8: one history row per (restaurant, date) so re-imported history is not double counted.
+
+    Exact duplicates (left by importing the same history twice) are dropped first;
+    the unique index replaces the plain (restaurants, date) index.
+    """
+    conn.execute("DELETE FROM recent_lunch WHERE id NOT IN (SELECT min(id) FROM recent_lunch GROUP BY restaurants, date)")
+    conn.execute("DROP INDEX IF EXISTS idx_recent_lunch_restaurant")
+    conn.execute("CREATE UNIQUE INDEX idx_recent_lunch_visit ON recent_lunch (restaurants, date)")
+
+
+def _migration_rating_generation(conn: sqlite3.Connection) -> None:
+    """v9: ``rating_generation`` counts restaurant_rating writes.
+
+    Like catalog_generation, it is bumped by triggers, so tables weighted by
+    rating see ratings written by any connection or process.
+    """
+    conn.execute("CREATE TABLE rating_generation (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL)")
+    conn.execute("INSERT INTO rating_generation (id, generation) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+        CREATE TRIGGER restaurant_rating_generation_{event.lower()} AFTER {event} ON restaurant_rating BEGIN
+            UPDATE rating_generation SET generation = generation + 1 WHERE id = 1;
+        END
         ''')
 
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS restaurant_info (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            restaurant_name TEXT NOT NULL UNIQUE,
-            address TEXT,
-            phone TEXT,
-            hours TEXT,
-            website TEXT,
-            description TEXT,
-            last_updated TEXT,
-            FOREIGN KEY (restaurant_name) REFERENCES lunch_list(restaurants)
-                ON DELETE CASCADE
+
+def _migration_category_stats(conn: sqlite3.Connection) -> None:
+    """v10: per-category size and id bounds kept by triggers, for sampling without scans.
+
+    The bounds only ever widen (a delete leaves them in place); they are used
+    to draw candidate ids, and a drawn id that is gone is simply drawn again.
+    """
+    conn.execute('''
+    CREATE TABLE category_stats (
+        category TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        min_id INTEGER NOT NULL,
+        max_id INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    conn.execute(
+        "INSERT INTO category_stats (category, size, min_id, max_id) "
+        "SELECT category, count(*), min(id), max(id) FROM lunch_list WHERE category IS NOT NULL GROUP BY category"
+    )
+    add = '''
+        INSERT INTO category_stats (category, size, min_id, max_id)
+        SELECT new.category, 1, new.id, new.id WHERE new.category IS NOT NULL
+        ON CONFLICT (category) DO UPDATE
+            SET size = size + 1, min_id = min(min_id, excluded.min_id), max_id = max(max_id, excluded.max_id);
+    '''
+    remove = "UPDATE category_stats SET size = size - 1 WHERE category = old.category;"
+    conn.execute(f"CREATE TRIGGER lunch_list_stats_insert AFTER INSERT ON lunch_list BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER lunch_list_stats_delete AFTER DELETE ON lunch_list BEGIN {remove} END")
+    conn.execute(f"CREATE TRIGGER lunch_list_stats_update AFTER UPDATE OF option, id ON lunch_list BEGIN {remove} {add} END")
+
+
+# Ordered schema migrations; PRAGMA user_version records how many have been applied
+MIGRATIONS = [
+    _migration_base_tables,
+    _migration_category_key,
+    _migration_history_log,
+    _migration_search_index,
+    _migration_rotation,
+    _migration_ratings,
+    _migration_groups,
+    _migration_history_key,
+    _migration_rating_generation,
+    _migration_category_stats,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply any pending migrations and return the schema version found on disk.
+
+    A database that is already current costs a single ``PRAGMA user_version`` read.
+    A return value of 0 means the schema was bootstrapped from scratch.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return version
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock in case another process migrated first
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return version
+
+
+def _file_fingerprint(path: str) -> tuple[int, int] | str | None:
+    """Identify the file behind a database path so replaced files get a fresh connection."""
+    if path == ":memory:" or path.startswith("file:"):
+        return path
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+_SYNCHRONOUS_LEVELS = {"off": 0, "normal": 1, "full": 2, "extra": 3}
+_TEMP_STORE_LEVELS = {"default": 0, "file": 1, "memory": 2}
+
+
+def apply_storage_config(conn: sqlite3.Connection, storage: StorageConfig) -> None:
+    """Apply a storage profile's pragmas to an open connection."""
+    # busy_timeout first so switching journal mode waits out other writers
+    conn.execute(f"PRAGMA busy_timeout = {int(storage.busy_timeout)}")
+    conn.execute(f"PRAGMA journal_mode = {storage.journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {storage.synchronous}")
+    conn.execute(f"PRAGMA mmap_size = {int(storage.mmap_size)}")
+    conn.execute(f"PRAGMA cache_size = {int(storage.cache_size)}")
+    conn.execute(f"PRAGMA temp_store = {storage.temp_store}")
+
+
+# Database paths whose schema was bootstrapped from version 0 and may still need seeding
+_unseeded: set[str] = set()
+
+
+def open_connection(path: str | Path, storage: StorageConfig | None = None) -> sqlite3.Connection:
+    """Open a new, unpooled SQLite connection with the storage profile applied
+    and the schema migrated to :data:`SCHEMA_VERSION`.
+
+    Connections run in autocommit mode (``isolation_level=None``); writes are
+    grouped explicitly with :func:`transaction`.
+    """
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    try:
+        apply_storage_config(conn, storage or get_storage_config())
+        # Rows removed by INSERT OR REPLACE must fire delete triggers to keep the search index in sync
+        conn.execute("PRAGMA recursive_triggers = ON")
+        if migrate(conn) == 0:
+            _unseeded.add(str(path))
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def _open_read_only(path: str | Path) -> sqlite3.Connection:
+    """Open a read-only connection (``mode=ro``) to an existing database file.
+
+    Nothing is written: no storage profile or migrations are applied, only the
+    profile's busy_timeout. Open (and so migrate) a pooled connection first.
+    """
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {int(get_storage_config().busy_timeout)}")
+    return conn
+
+
+class ConnectionManager:
+    """Long-lived SQLite connections, one per (thread, database path).
+
+    sqlite3 connections must not be shared between threads while in use, so each
+    thread keeps its own connection per path and reuses it for every call. The
+    connection is reopened if the file on disk is replaced, and connections owned
+    by threads that have exited are closed the next time a connection is opened.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool: dict[threading.Thread, dict[str, tuple[sqlite3.Connection, tuple | str | None]]] = {}
+
+    def get(self, path: str | Path) -> sqlite3.Connection:
+        """Return the calling thread's connection for ``path``, opening it if needed."""
+        key = str(path)
+        thread = threading.current_thread()
+        fingerprint = _file_fingerprint(key)
+        conns = self._pool.get(thread)
+        if conns is not None:
+            entry = conns.get(key)
+            if entry is not None:
+                if entry[1] == fingerprint:
+                    return entry[0]
+                del conns[key]
+                entry[0].close()
+
+        conn = open_connection(key)
+        with self._lock:
+            self._prune_dead_threads()
+            self._pool.setdefault(thread, {})[key] = (conn, _file_fingerprint(key))
+        return conn
+
+    def _prune_dead_threads(self) -> None:
+        for thread in [t for t in self._pool if not t.is_alive()]:
+            for conn, _ in self._pool.pop(thread).values():
+                conn.close()
+
+    def close_all(self) -> None:
+        """Close every pooled connection (application shutdown, test teardown)."""
+        with self._lock:
+            pool, self._pool = self._pool, {}
+        for conns in pool.values():
+            for conn, _ in conns.values():
+                conn.close()
+
+    def __len__(self) -> int:
+        return sum(len(conns) for conns in self._pool.values())
+
+
+connections = ConnectionManager()
+
+
+def get_connection(path: str | Path | None = None) -> sqlite3.Connection:
+    """Get the pooled connection for ``path`` (defaults to the module ``db_path``)."""
+    return connections.get(path if path is not None else db_path)
+
+
+@contextmanager
+def transaction(immediate: bool = False, path: str | Path | None = None):
+    """Run a block in a single transaction on the pooled connection.
+
+    Commits on success and rolls back on any exception. ``immediate=True`` takes
+    the write lock up front (``BEGIN IMMEDIATE``) for read-then-write sequences.
+    """
+    conn = get_connection(path)
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# SQLite's lower() only folds ASCII letters; mirror it so Python keys match the category column
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def category_key(option: str) -> str:
+    """Normalize a category the same way as the ``lunch_list.category`` column."""
+    return option.strip(" ").translate(_ASCII_LOWER)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable in-memory copy of ``lunch_list``."""
+
+    restaurants: tuple[tuple[str, str], ...] = ()
+    by_category: dict[str, tuple[tuple[str, str], ...]] = field(default_factory=dict)
+    # Increments on every reload; lets derived caches detect a new catalog cheaply
+    version: int = 0
+    # (watcher epoch, catalog_generation) the rows were read at; see CatalogCache.stamp
+    stamp: tuple[int, int] | None = None
+
+
+# Called with (stamp before, stamp after, added names, removed names) after a local catalog write
+CatalogListener = Callable[[tuple[int, int], tuple[int, int], list[str], list[str]], None]
+
+
+class CatalogCache:
+    """Read-through snapshot of ``lunch_list`` grouped by category.
+
+    The snapshot is dropped when this process writes the catalog (see
+    :meth:`invalidate`) and whenever ``PRAGMA data_version`` on a dedicated,
+    read-only watcher connection changes, which happens when any other connection
+    (another thread, uvicorn worker or the Tauri sidecar) commits. A cache hit
+    costs one pragma read; commits that did not touch lunch_list (e.g. history
+    writes) cost one more read of ``catalog_generation`` and keep the snapshot.
+    The watcher is opened read-only after the pooled connection has migrated the
+    schema. URI databases fall back to a regular connection. Every ``:memory:``
+    connection is a separate database, so for those the calling thread's pooled
+    connection is read directly; only its own writes (which invalidate) can
+    change it, and the generation is re-read on every call.
+
+    Derived indexes that can apply a write's added and removed names in place
+    :meth:`subscribe` to local writes (reported by :meth:`record_change`) and
+    compare :meth:`stamp` values to tell whether anything else changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path: str | None = None
+        self._fingerprint = None
+        self._watcher: sqlite3.Connection | None = None
+        self._pooled = False  # the watcher is a pooled connection (":memory:"); never closed here
+        self._epoch = 0
+        self._data_version: int | None = None
+        self._generation: int | None = None
+        self._snapshot: CatalogSnapshot | None = None
+        self._version = 0
+        self._listeners: list[CatalogListener] = []
+
+    def _ensure_watcher(self, key: str) -> None:
+        if key == ":memory:":
+            conn = get_connection(key)
+            if conn is not self._watcher:
+                self._close_watcher()
+                self._watcher, self._pooled = conn, True
+                self._path = key
+                self._epoch += 1
+            return
+        fingerprint = _file_fingerprint(key)
+        if self._watcher is not None and key == self._path and fingerprint == self._fingerprint:
+            return
+        self._close_watcher()
+        if key.startswith("file:"):
+            self._watcher = open_connection(key)
+        else:
+            get_connection(key)
+            self._watcher = _open_read_only(key)
+        self._path = key
+        self._fingerprint = _file_fingerprint(key)
+        self._epoch += 1
+        self._data_version = None
+
+    def _watch(self) -> int:
+        """Current catalog_generation: one pragma read unless another connection committed."""
+        data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+        # data_version does not change for a connection's own commits, which a pooled watcher sees
+        if self._pooled or data_version != self._data_version:
+            self._generation = self._watcher.execute("SELECT generation FROM catalog_generation").fetchone()[0]
+            self._data_version = data_version
+        return self._generation
+
+    def get(self, path: str | Path) -> CatalogSnapshot:
+        """Return the current catalog for ``path``, reloading it if it changed."""
+        with self._lock:
+            self._ensure_watcher(str(path))
+            generation = self._watch()
+            if self._snapshot is None or self._snapshot.stamp != (self._epoch, generation):
+                self._snapshot = self._load(self._watcher)
+            return self._snapshot
+
+    def stamp(self, path: str | Path) -> tuple[int, int]:
+        """Identify the catalog's current contents without loading them.
+
+        Changes whenever lunch_list is written (by any connection) or the
+        database is switched or replaced.
+        """
+        with self._lock:
+            self._ensure_watcher(str(path))
+            return self._epoch, self._watch()
+
+    def _load(self, conn: sqlite3.Connection) -> CatalogSnapshot:
+        # One read transaction so the rows match the generation they are stamped with
+        # (a pooled watcher may already be inside its thread's transaction)
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN")
+        try:
+            generation = conn.execute("SELECT generation FROM catalog_generation").fetchone()[0]
+            rows = conn.execute("SELECT restaurants, option, category FROM lunch_list ORDER BY restaurants").fetchall()
+        finally:
+            if own_transaction:
+                conn.execute("COMMIT")
+        by_category: dict[str, list[tuple[str, str]]] = {}
+        for name, option, category in rows:
+            by_category.setdefault(category, []).append((name, option))
+        self._version += 1
+        return CatalogSnapshot(
+            restaurants=tuple((name, option) for name, option, _ in rows),
+            by_category={category: tuple(items) for category, items in by_category.items()},
+            version=self._version,
+            stamp=(self._epoch, generation),
         )
-        ''')
 
-        # Check if lunch_list is empty
-        cursor.execute("SELECT COUNT(*) FROM lunch_list")
-        count = cursor.fetchone()[0]
+    def invalidate(self) -> None:
+        """Drop the snapshot after this process changed the catalog."""
+        with self._lock:
+            self._snapshot = None
+
+    def subscribe(self, listener: CatalogListener) -> None:
+        """Have ``listener`` receive the names added and removed by this process's catalog writes."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def record_change(
+        self, path: str | Path, before: int, after: int, added: Iterable[str] = (), removed: Iterable[str] = ()
+    ) -> None:
+        """Invalidate after a local write that moved catalog_generation from ``before`` to ``after``.
+
+        Subscribers get the write's stamps and names; a subscriber whose stamp is
+        not ``before`` has missed another change and should resync instead.
+        """
+        self.invalidate()
+        with self._lock:
+            if self._watcher is None or str(path) != self._path:
+                return
+            epoch = self._epoch
+            listeners = list(self._listeners)
+        added, removed = list(added), list(removed)
+        for listener in listeners:
+            listener((epoch, before), (epoch, after), added, removed)
+
+    def _close_watcher(self) -> None:
+        if self._watcher is not None and not self._pooled:
+            self._watcher.close()
+        self._watcher = None
+        self._pooled = False
+        self._snapshot = None
+
+    def close(self) -> None:
+        """Close the watcher connection and drop the snapshot."""
+        with self._lock:
+            self._close_watcher()
+
+
+catalog = CatalogCache()
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Get the cached catalog snapshot for the current database."""
+    return catalog.get(db_path)
+
+
+def check_storage_pragmas(path: str | Path | None = None) -> dict[str, dict]:
+    """Report which storage pragmas are actually in effect on the pooled connection.
+
+    Returns:
+        Mapping of pragma name to ``{"expected", "actual", "ok"}``. A pragma can
+        differ from the profile when SQLite ignores it (e.g. ``journal_mode`` on an
+        in-memory database, or ``mmap_size`` above the compile-time limit); pragmas
+        SQLite does not report at all come back as ``None``.
+    """
+    storage = get_storage_config()
+    expected = {
+        "journal_mode": storage.journal_mode,
+        "synchronous": _SYNCHRONOUS_LEVELS[storage.synchronous],
+        "mmap_size": storage.mmap_size,
+        "cache_size": storage.cache_size,
+        "temp_store": _TEMP_STORE_LEVELS[storage.temp_store],
+        "busy_timeout": storage.busy_timeout,
+    }
+    conn = get_connection(path)
+    report = {}
+    for pragma, want in expected.items():
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        actual = row[0] if row else None
+        report[pragma] = {"expected": want, "actual": actual, "ok": actual == want}
+    return report
+
+
+def init_db(path: str | Path | None = None) -> None:
+    """Startup hook: optionally point the module at ``path``, then create/seed tables."""
+    global db_path
+    if path is not None:
+        db_path = Path(path)
+    create_db_and_tables()
+    try:
+        for pragma, result in check_storage_pragmas().items():
+            if not result["ok"]:
+                print(f"Warning: PRAGMA {pragma} is {result['actual']!r}, expected {result['expected']!r}")
+    except Exception as e:
+        print(f"Error checking storage pragmas: {e}")
+
+
+def close_db() -> None:
+    """Shutdown hook: close all pooled connections and the catalog cache."""
+    catalog.close()
+    connections.close_all()
+
+
+def create_db_and_tables():
+    """Create database and tables if they don't exist.
+
+    On first launch the prebuilt seed database is installed if one is bundled.
+    Otherwise opening the connection creates or migrates the tables; a database
+    already at :data:`SCHEMA_VERSION` is only checked with one pragma read. The
+    restaurant list is seeded from CSV only when the schema was just bootstrapped.
+    """
+    try:
+        path = str(db_path)
+        if install_seed_db(path):
+            print(f"Installed seed database from {seed_db_path}")
+        conn = get_connection(path)
+        if path not in _unseeded:
+            return
+        _unseeded.discard(path)
+        count = conn.execute("SELECT COUNT(*) FROM lunch_list").fetchone()[0]
 
         # If table is empty, import data from CSV
         if count == 0 and restaurants_csv.exists():
-            with open(restaurants_csv) as f:
-                csv_reader = csv.DictReader(f)
-                for row in csv_reader:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO lunch_list VALUES (?, ?)",
-                        (row['restaurant'], row['option']),
-                    )
-
+            import_file(restaurants_csv, "lunch_list")
             print(f"Imported restaurants from {restaurants_csv}")
 
-        conn.commit()
-
     except Exception as e:
         print(f"Error creating database: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
 
 
 def get_all_restaurants():
     """Get all restaurants from the database"""
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT restaurants, option FROM lunch_list ORDER BY restaurants")
-        return cursor.fetchall()
+        return list(get_catalog().restaurants)
     except Exception as e:
         print(f"Error getting restaurants: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
 def get_restaurants(option):
     """Get restaurants filtered by option (cheap/Normal)"""
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT restaurants, option FROM lunch_list WHERE LOWER(option) = LOWER(?)",
-            (option,),
-        )
-        return cursor.fetchall()
+        return list(get_catalog().by_category.get(category_key(option), ()))
     except Exception as e:
         print(f"Error getting restaurants by option: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
-def rng_restaurant(option):
-    """Get a random restaurant with the specified option"""
-    restaurants = get_restaurants(option)
-    if not restaurants:
+# Snippet highlight markers (control characters never appear in stored text)
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+# bm25 column weights: name, option, address, hours, description
+_SEARCH_WEIGHTS = (10.0, 2.0, 1.0, 1.0, 1.0)
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and all terms must match, so user
+    input can never be parsed as FTS5 query syntax. Returns "" for blank input.
+    """
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", text))
+
+
+def search_restaurants(query: str, limit: int = 20) -> list[dict]:
+    """Full-text search over restaurant names, categories and enrichment data.
+
+    Args:
+        query: Free text, e.g. "ramen" or "open late"
+        limit: Maximum number of results
+
+    Returns:
+        Best matches first, as dicts with ``name``, ``option`` and ``snippet``; the
+        snippet marks matched terms with :data:`SNIPPET_START`/:data:`SNIPPET_END`.
+    """
+    match = fts_query(query)
+    if not match:
+        return []
+    try:
+        rows = (
+            get_connection()
+            .execute(
+                f'''
+            SELECT name, option, snippet(restaurant_search, -1, ?, ?, '…', 12)
+            FROM restaurant_search
+            WHERE restaurant_search MATCH ?
+            ORDER BY bm25(restaurant_search, {", ".join(map(str, _SEARCH_WEIGHTS))})
+            LIMIT ?
+            ''',
+                (SNIPPET_START, SNIPPET_END, match, limit),
+            )
+            .fetchall()
+        )
+        return [{"name": name, "option": option, "snippet": snippet} for name, option, snippet in rows]
+    except Exception as e:
+        print(f"Error searching restaurants: {e}")
+        return []
+
+
+_seeded_rng: tuple[int, random.Random] | None = None
+_seeded_rng_lock = threading.Lock()
+
+
+def get_rng(seed: int | None = None) -> random.Random | None:
+    """Random generator for selections; None means the global :mod:`random` functions.
+
+    An explicit ``seed`` (e.g. from a request) gives a fresh generator, so that
+    one call replays exactly. Otherwise SELECTION_SEED, when set, gives one
+    process-wide generator, so the sequence of rolls since startup replays.
+    """
+    from app.config import get_app_config
+
+    global _seeded_rng
+    if seed is not None:
+        return random.Random(seed)
+    seed = get_app_config()["selection_seed"]
+    if seed is None:
+        return None
+    with _seeded_rng_lock:
+        if _seeded_rng is None or _seeded_rng[0] != seed:
+            _seeded_rng = (seed, random.Random(seed))
+        return _seeded_rng[1]
+
+
+def _candidate_filter(option, exclude=()) -> tuple[str, tuple]:
+    """WHERE clause and parameters for restaurants in ``option`` not named in ``exclude``."""
+    where = "category = lower(trim(?))"
+    params: tuple = (option,)
+    if exclude:
+        where += " AND restaurants NOT IN (SELECT value FROM json_each(?))"
+        params += (json.dumps(list(exclude)),)
+    return where, params
+
+
+def _count_restaurants(conn: sqlite3.Connection, option, exclude=()) -> int:
+    """Count restaurants in ``option`` not named in ``exclude``.
+
+    The category size comes from ``category_stats``; only the excluded names
+    are looked up in the category index.
+    """
+    size = conn.execute("SELECT size FROM category_stats WHERE category = lower(trim(?))", (option,)).fetchone()
+    if not size or not exclude:
+        return size[0] if size else 0
+    where, params = _candidate_filter(option)
+    excluded = conn.execute(
+        f"SELECT COUNT(*) FROM lunch_list WHERE {where} AND restaurants IN (SELECT value FROM json_each(?))",
+        (*params, json.dumps(list(exclude))),
+    ).fetchone()[0]
+    return size[0] - excluded
+
+
+# Random ids tried by _sample_restaurant before it counts the category instead
+SAMPLE_PROBES = 32
+
+
+def _sample_restaurant(conn: sqlite3.Connection, option, exclude=(), rng: random.Random | None = None) -> tuple[str, str] | None:
+    """Pick a uniformly random restaurant in ``option`` whose name is not in ``exclude``.
+
+    Draws ids between the category's bounds (see ``category_stats``) and reads
+    each by primary key until one is a candidate; every candidate is equally
+    likely to be hit. A category too sparse in its id range for
+    :data:`SAMPLE_PROBES` draws to hit falls back to counting its index entries
+    and reading the row at a random offset, which is cheap for exactly such a
+    small category. Run in one transaction so the count and the offset see the
+    same rows.
+    """
+    rng = rng or random
+    where, params = _candidate_filter(option, exclude)
+    bounds = conn.execute(
+        "SELECT min_id, max_id FROM category_stats WHERE category = lower(trim(?)) AND size > 0", (option,)
+    ).fetchone()
+    if bounds is None:
+        return None
+    min_id, max_id = bounds
+    for _ in range(SAMPLE_PROBES):
+        row = conn.execute(
+            f"SELECT restaurants, option FROM lunch_list WHERE id = ? AND {where}",
+            (rng.randrange(min_id, max_id + 1), *params),
+        ).fetchone()
+        if row is not None:
+            return row
+    total = conn.execute(f"SELECT COUNT(*) FROM lunch_list WHERE {where}", params).fetchone()[0]
+    if total == 0:
+        return None
+    return conn.execute(
+        f"SELECT restaurants, option FROM lunch_list WHERE {where} ORDER BY restaurants LIMIT 1 OFFSET ?",
+        (*params, (rng or random).randrange(total)),
+    ).fetchone()
+
+
+def rng_restaurant(option, rng: random.Random | None = None):
+    """Get a random restaurant with the specified option (drawn with ``rng``, see :func:`get_rng`)"""
+    with transaction() as conn:
+        restaurant = _sample_restaurant(conn, option, rng=rng or get_rng())
+    if restaurant is None:
         raise ValueError(f"No restaurants found with option: {option}")
-    return random.choice(restaurants)
+    return restaurant
 
 
-def add_restaurant_to_db(name, option):
-    """Add a new restaurant to the database"""
-    conn = None
+def _insert_restaurant(conn: sqlite3.Connection, name, option) -> None:
+    """Insert a restaurant on the caller's connection, inside the caller's transaction."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO lunch_list VALUES (?, ?)", (name, option))
-        conn.commit()
-        return True
+        conn.execute("INSERT INTO lunch_list (restaurants, option) VALUES (?, ?)", (name, option))
     except sqlite3.IntegrityError:
-        raise ValueError(f"Restaurant '{name}' already exists")
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        raise e
-    finally:
-        if conn:
-            conn.close()
+        raise ValueError(f"Restaurant '{name}' already exists") from None
+
+
+def _delete_restaurant(conn: sqlite3.Connection, name) -> None:
+    """Delete a restaurant and its info on the caller's connection, inside the caller's transaction."""
+    conn.execute("DELETE FROM restaurant_info WHERE restaurant_name = ?", (name,))
+    cursor = conn.execute("DELETE FROM lunch_list WHERE restaurants = ?", (name,))
+    if cursor.rowcount == 0:
+        raise ValueError(f"Restaurant '{name}' not found")
+
+
+def set_restaurant_rating(name: str, rating: float | None) -> None:
+    """Set (or clear, with None) a restaurant's 0-5 rating."""
+    if rating is not None and not 0 <= rating <= 5:
+        raise ValueError(f"Rating must be between 0 and 5, got {rating}")
+    with transaction() as conn:
+        row = conn.execute("SELECT id FROM lunch_list WHERE restaurants = ?", (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"Restaurant '{name}' not found")
+        if rating is None:
+            conn.execute("DELETE FROM restaurant_rating WHERE restaurant_id = ?", row)
+        else:
+            conn.execute("INSERT OR REPLACE INTO restaurant_rating (restaurant_id, rating) VALUES (?, ?)", (row[0], rating))
+
+
+def _catalog_generation(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT generation FROM catalog_generation").fetchone()[0]
+
+
+def rating_generation(conn: sqlite3.Connection) -> int:
+    """Count of restaurant_rating writes so far, by any connection."""
+    return conn.execute("SELECT generation FROM rating_generation").fetchone()[0]
+
+
+def add_restaurant_to_db(name, option):
+    """Add a new restaurant to the database"""
+    with transaction(immediate=True) as conn:
+        before = _catalog_generation(conn)
+        _insert_restaurant(conn, name, option)
+        after = _catalog_generation(conn)
+    catalog.record_change(db_path, before, after, added=[name])
+    return True
 
 
 def delete_restaurant_from_db(name):
     """Delete a restaurant and its info from the database."""
-    conn = None
+    with transaction(immediate=True) as conn:
+        before = _catalog_generation(conn)
+        _delete_restaurant(conn, name)
+        after = _catalog_generation(conn)
+    catalog.record_change(db_path, before, after, removed=[name])
+    return True
+
+
+def apply_restaurant_batch(operations: Iterable[dict]) -> list[dict]:
+    """Apply many add/delete operations in a single transaction.
+
+    Each operation is ``{"op": "add", "name": ..., "option": ...}`` or
+    ``{"op": "delete", "name": ...}``. Every item runs in its own savepoint, so a
+    failing item (duplicate, missing, malformed) is rolled back and reported
+    without aborting the rest of the batch. The catalog cache is invalidated once.
+
+    Returns:
+        One ``{"op", "name", "ok", "error"}`` dict per operation, in order.
+    """
+    results = []
+    with transaction(immediate=True) as conn:
+        before = _catalog_generation(conn)
+        for index, operation in enumerate(operations):
+            op = operation.get("op") if isinstance(operation, dict) else None
+            name = operation.get("name") if isinstance(operation, dict) else None
+            result = {"op": op, "name": name, "ok": True, "error": None}
+            conn.execute("SAVEPOINT batch_item")
+            try:
+                if not name:
+                    raise ValueError(f"Operation {index} is missing a restaurant name")
+                if not isinstance(name, str):
+                    raise ValueError(f"Operation {index} has a restaurant name that is not a string")
+                if op == "add":
+                    option = operation.get("option") or "Normal"
+                    if not isinstance(option, str):
+                        raise ValueError(f"Operation {index} has an option that is not a string")
+                    _insert_restaurant(conn, name, option)
+                elif op == "delete":
+                    _delete_restaurant(conn, name)
+                else:
+                    raise ValueError(f"Unsupported operation '{op}'")
+            except ValueError as e:
+                conn.execute("ROLLBACK TO batch_item")
+                result.update(ok=False, error=str(e))
+            conn.execute("RELEASE batch_item")
+            results.append(result)
+        after = _catalog_generation(conn)
+
+    if any(result["ok"] for result in results):
+        catalog.record_change(
+            db_path,
+            before,
+            after,
+            added=[r["name"] for r in results if r["ok"] and r["op"] == "add"],
+            removed=[r["name"] for r in results if r["ok"] and r["op"] == "delete"],
+        )
+    return results
+
+
+def _trim_history(conn: sqlite3.Connection, max_entries: int, max_days: int) -> None:
+    """Apply history retention with index range deletes on ``recent_lunch.date``.
+
+    Keeps at most ``max_entries`` rows and nothing older than ``max_days``;
+    0 disables either limit.
+    """
+    if max_days > 0:
+        cutoff = (datetime.now() - timedelta(days=max_days)).isoformat()
+        conn.execute("DELETE FROM recent_lunch WHERE date < ?", (cutoff,))
+    if max_entries > 0:
+        conn.execute(
+            "DELETE FROM recent_lunch WHERE date < (SELECT date FROM recent_lunch ORDER BY date DESC LIMIT 1 OFFSET ?)",
+            (max_entries - 1,),
+        )
+
+
+def _record_lunches(conn: sqlite3.Connection, restaurant_names: Sequence[str]) -> None:
+    """Append picks to recent_lunch in order and apply the configured retention once.
+
+    Runs on the caller's connection inside the caller's transaction. Timestamps
+    step by a microsecond so picks made in one batch keep their order.
+    """
+    from app.config import get_app_config
+
+    app_config = get_app_config()
+    now = datetime.now()
+    conn.executemany(
+        "INSERT INTO recent_lunch (restaurants, date) VALUES (?, ?)",
+        [(name, (now + timedelta(microseconds=i)).isoformat()) for i, name in enumerate(restaurant_names)],
+    )
+    _trim_history(conn, app_config["history_max_entries"], app_config["history_days"])
+
+
+def _record_lunch(conn: sqlite3.Connection, restaurant_name: str) -> None:
+    """Append a pick to recent_lunch and apply the configured retention."""
+    _record_lunches(conn, [restaurant_name])
+
+
+def _last_lunch(conn: sqlite3.Connection) -> str | None:
+    """Most recently picked restaurant (newest entry of the date index)."""
+    row = conn.execute("SELECT restaurants FROM recent_lunch ORDER BY date DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+
+def get_recent_lunches(limit: int | None = None) -> list[tuple[str, str]]:
+    """Get (restaurant, date) history entries, newest first."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM restaurant_info WHERE restaurant_name = ?", (name,))
-        cursor.execute("DELETE FROM lunch_list WHERE restaurants = ?", (name,))
-        if cursor.rowcount == 0:
-            raise ValueError(f"Restaurant '{name}' not found")
-        conn.commit()
-        return True
+        conn = get_connection()
+        return conn.execute(
+            "SELECT restaurants, date FROM recent_lunch ORDER BY date DESC LIMIT ?",
+            (-1 if limit is None else limit,),
+        ).fetchall()
     except Exception as e:
-        if conn:
-            conn.rollback()
-        raise e
-    finally:
-        if conn:
-            conn.close()
+        print(f"Error getting recent lunches: {e}")
+        return []
 
 
-def add_to_recent_lunch(restaurant_name):
-    """Add a restaurant to the recent lunch list"""
-    conn = None
+def get_last_visit(restaurant_name: str) -> str | None:
+    """Get the date a restaurant was last picked, or None if it is not in the history window."""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Check if we have 14 or more recent lunches
-        cursor.execute("SELECT COUNT(*) FROM recent_lunch")
-        count = cursor.fetchone()[0]
-
-        if count >= 14:
-            # Delete the oldest entries
-            cursor.execute(
-                "DELETE FROM recent_lunch WHERE date IN (SELECT date FROM recent_lunch ORDER BY date ASC LIMIT ?)",
-                (count - 13,),  # Keep 14 entries
-            )
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT date FROM recent_lunch WHERE restaurants = ? ORDER BY date DESC LIMIT 1",
+            (restaurant_name,),
+        ).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Error getting last visit: {e}")
+        return None
 
-        # Add the new restaurant
-        now = datetime.now().isoformat()
-        cursor.execute("INSERT OR REPLACE INTO recent_lunch VALUES (?, ?)", (restaurant_name, now))
 
-        conn.commit()
+def add_to_recent_lunch(restaurant_name):
+    """Add a restaurant to the recent lunch list"""
+    try:
+        with transaction(immediate=True) as conn:
+            _record_lunch(conn, restaurant_name)
         return True
     except Exception as e:
-        if conn:
-            conn.rollback()
         print(f"Error adding to recent lunch: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 
-def calculate_lunch(option="Normal", session_rolled=None):
-    """Select a restaurant using round-robin logic within the session"""
-    conn = None
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+# Rotations not rolled for this many days are dropped when another bag is shuffled
+ROTATION_TTL_DAYS = 30
 
-        # Get all restaurants with the specified option
-        cursor.execute(
-            "SELECT restaurants, option FROM lunch_list WHERE LOWER(option) = LOWER(?)",
-            (option,),
+
+def _fill_rotation(conn: sqlite3.Connection, key: str, category: str, ids: list[int], max_id: int) -> None:
+    """Replace the bag for (key, category) with ``ids`` in order and rewind its cursor."""
+    conn.execute("DELETE FROM rotation_bag WHERE rotation_key = ? AND category = ?", (key, category))
+    conn.executemany(
+        "INSERT INTO rotation_bag (rotation_key, category, position, restaurant_id) VALUES (?, ?, ?, ?)",
+        [(key, category, position, restaurant_id) for position, restaurant_id in enumerate(ids)],
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO rotation_cursor (rotation_key, category, cursor, size, max_id, updated) "
+        "VALUES (?, ?, 0, ?, ?, ?)",
+        (key, category, len(ids), max_id, datetime.now().isoformat()),
+    )
+
+
+def _prune_rotations(conn: sqlite3.Connection) -> None:
+    """Drop rotations (e.g. of expired browser sessions) idle for :data:`ROTATION_TTL_DAYS`."""
+    cutoff = (datetime.now() - timedelta(days=ROTATION_TTL_DAYS)).isoformat()
+    conn.execute(
+        "DELETE FROM rotation_bag WHERE (rotation_key, category) IN "
+        "(SELECT rotation_key, category FROM rotation_cursor WHERE updated < ?)",
+        (cutoff,),
+    )
+    conn.execute("DELETE FROM rotation_cursor WHERE updated < ?", (cutoff,))
+
+
+def _shuffle_rotation(
+    conn: sqlite3.Connection, key: str, category: str, avoid: str | None, rng: random.Random | None = None
+) -> None:
+    """Start a new cycle: a fresh random permutation of the category.
+
+    ``avoid`` (the last pick) is moved off the first position so a new cycle
+    never repeats the pick that ended the previous one.
+    """
+    _prune_rotations(conn)
+    rows = conn.execute("SELECT id, restaurants FROM lunch_list WHERE category = ?", (category,)).fetchall()
+    rng = rng or random
+    rng.shuffle(rows)
+    if len(rows) > 1 and rows[0][1] == avoid:
+        swap = rng.randrange(1, len(rows))
+        rows[0], rows[swap] = rows[swap], rows[0]
+    _fill_rotation(conn, key, category, [row[0] for row in rows], max((row[0] for row in rows), default=0))
+
+
+def _start_rotation(
+    conn: sqlite3.Connection, key: str, category: str, avoid: str | None, rng: random.Random | None = None
+) -> None:
+    """Start a key's first cycle with a bag holding only its first pick.
+
+    Clients without a session cookie get a new key on every roll, so the
+    category is not shuffled until the key rolls again (see
+    :func:`_complete_rotation`). The cursor row's size is a placeholder until then.
+    """
+    _prune_rotations(conn)
+    first = _sample_restaurant(conn, category, [avoid] if avoid else (), rng) or _sample_restaurant(conn, category, rng=rng)
+    if first is None:
+        _fill_rotation(conn, key, category, [], 0)
+        return
+    (restaurant_id,) = conn.execute("SELECT id FROM lunch_list WHERE restaurants = ?", (first[0],)).fetchone()
+    _fill_rotation(conn, key, category, [restaurant_id], restaurant_id)
+    conn.execute("UPDATE rotation_cursor SET size = 2 WHERE rotation_key = ? AND category = ?", (key, category))
+
+
+def _rotation_pending(conn: sqlite3.Connection, key: str, category: str, cursor: int) -> bool:
+    """Whether the bag was started by :func:`_start_rotation` and is still waiting for its shuffle."""
+    return (
+        cursor <= 1
+        and conn.execute(
+            "SELECT 1 FROM rotation_bag WHERE rotation_key = ? AND category = ? AND position = 1", (key, category)
+        ).fetchone()
+        is None
+    )
+
+
+def _complete_rotation(conn: sqlite3.Connection, key: str, category: str, rng: random.Random | None = None) -> None:
+    """Shuffle the rest of the category in behind a started bag's first pick."""
+    (first,) = conn.execute(
+        "SELECT restaurant_id FROM rotation_bag WHERE rotation_key = ? AND category = ? AND position = 0", (key, category)
+    ).fetchone()
+    ids = [row[0] for row in conn.execute("SELECT id FROM lunch_list WHERE category = ? AND id != ?", (category, first))]
+    (rng or random).shuffle(ids)
+    conn.executemany(
+        "INSERT INTO rotation_bag (rotation_key, category, position, restaurant_id) VALUES (?, ?, ?, ?)",
+        [(key, category, position, restaurant_id) for position, restaurant_id in enumerate(ids, 1)],
+    )
+    conn.execute(
+        "UPDATE rotation_cursor SET size = ?, max_id = ? WHERE rotation_key = ? AND category = ?",
+        (len(ids) + 1, max([first, *ids]), key, category),
+    )
+
+
+def _merge_new_restaurants(
+    conn: sqlite3.Connection, key: str, category: str, cursor: int, max_id: int, rng: random.Random | None = None
+) -> None:
+    """Shuffle restaurants added since the bag was built into the rest of the current cycle.
+
+    New rows get ids above every existing one, so only rows past the bag's
+    ``max_id`` are read: ``+category`` keeps the planner off the category index
+    and on a rowid range scan, so when nothing was added this is a single probe.
+    """
+    new = [row[0] for row in conn.execute("SELECT id FROM lunch_list WHERE id > ? AND +category = ?", (max_id, category))]
+    if not new:
+        return
+    remaining = [
+        row[0]
+        for row in conn.execute(
+            "SELECT restaurant_id FROM rotation_bag WHERE rotation_key = ? AND category = ? AND position >= ? ORDER BY position",
+            (key, category, cursor),
         )
-        restaurants = cursor.fetchall()
+    ]
+    remaining += new
+    (rng or random).shuffle(remaining)
+    _fill_rotation(conn, key, category, remaining, max(new))
+
+
+def _swap_bag_entries(conn: sqlite3.Connection, key: str, category: str, i: int, j: int) -> None:
+    """Exchange the restaurants at two positions of a bag."""
+    where = "WHERE rotation_key = ? AND category = ? AND position = ?"
+    first = conn.execute(f"SELECT restaurant_id FROM rotation_bag {where}", (key, category, i)).fetchone()[0]
+    second = conn.execute(f"SELECT restaurant_id FROM rotation_bag {where}", (key, category, j)).fetchone()[0]
+    conn.execute(f"UPDATE rotation_bag SET restaurant_id = ? {where}", (second, key, category, i))
+    conn.execute(f"UPDATE rotation_bag SET restaurant_id = ? {where}", (first, key, category, j))
+
+
+def _rotation_next(
+    conn: sqlite3.Connection,
+    key: str,
+    option,
+    last: str | None,
+    avoid: Collection[str] = (),
+    rng: random.Random | None = None,
+) -> tuple[str, str, int] | None:
+    """Find the next restaurant of the persistent shuffle bag for (key, category).
+
+    Returns ``(name, option, position)`` without consuming it; see
+    :func:`_rotation_pick`. May reshuffle, merge or reorder the bag, but leaves
+    the cursor where it was.
+    """
+    category = category_key(option)
+    state = conn.execute(
+        "SELECT cursor, size, max_id FROM rotation_cursor WHERE rotation_key = ? AND category = ?", (key, category)
+    ).fetchone()
+    if state is not None and state[0] < state[1] and _rotation_pending(conn, key, category, state[0]):
+        _complete_rotation(conn, key, category, rng)
+        state = conn.execute(
+            "SELECT cursor, size, max_id FROM rotation_cursor WHERE rotation_key = ? AND category = ?", (key, category)
+        ).fetchone()
+    if state is None:
+        _start_rotation(conn, key, category, last, rng)
+    elif state[0] >= state[1]:
+        _shuffle_rotation(conn, key, category, last, rng)
+    else:
+        _merge_new_restaurants(conn, key, category, state[0], state[2], rng)
+
+    # A second pass covers a cycle whose remaining entries were all deleted
+    for _ in range(2):
+        cursor, size = conn.execute(
+            "SELECT cursor, size FROM rotation_cursor WHERE rotation_key = ? AND category = ?", (key, category)
+        ).fetchone()
+        while cursor < size:
+            name, restaurant_option = conn.execute(
+                "SELECT l.restaurants, l.option FROM rotation_bag b "
+                "LEFT JOIN lunch_list l ON l.id = b.restaurant_id AND l.category = b.category "
+                "WHERE b.rotation_key = ? AND b.category = ? AND b.position = ?",
+                (key, category, cursor),
+            ).fetchone()
+            if name is not None and (name == last or name in avoid):
+                later = [
+                    position
+                    for position, other in conn.execute(
+                        "SELECT b.position, l.restaurants FROM rotation_bag b "
+                        "JOIN lunch_list l ON l.id = b.restaurant_id AND l.category = b.category "
+                        "WHERE b.rotation_key = ? AND b.category = ? AND b.position > ?",
+                        (key, category, cursor),
+                    )
+                    if other != last and other not in avoid
+                ]
+                if later:
+                    _swap_bag_entries(conn, key, category, cursor, (rng or random).choice(later))
+                    continue
+            if name is not None:
+                return name, restaurant_option, cursor
+            cursor += 1
+        _shuffle_rotation(conn, key, category, last, rng)
+    return None
+
+
+def _rotation_pick(
+    conn: sqlite3.Connection,
+    key: str,
+    option,
+    last: str | None,
+    avoid: Collection[str] = (),
+    rng: random.Random | None = None,
+) -> tuple[str, str] | None:
+    """Pop the next restaurant from the persistent shuffle bag for (key, category).
+
+    Each pick reads one bag row by primary key and advances the cursor; the bag
+    is shuffled on the key's second roll and reshuffled only when a cycle is
+    exhausted, so every restaurant in the category is shown once before any
+    repeats. Deleted restaurants are skipped,
+    and restaurants added mid-cycle join the rest of the current cycle. If the
+    next entry is ``last`` (picked by another rotation), it trades places with
+    a random later entry so the same restaurant is not picked twice in a row;
+    names in ``avoid`` (earlier picks of a batch) are moved back the same way.
+    """
+    found = _rotation_next(conn, key, option, last, avoid, rng)
+    if found is None:
+        return None
+    name, restaurant_option, position = found
+    conn.execute(
+        "UPDATE rotation_cursor SET cursor = ?, updated = ? WHERE rotation_key = ? AND category = ?",
+        (position + 1, datetime.now().isoformat(), key, category_key(option)),
+    )
+    return name, restaurant_option
+
+
+def reset_rotation(rotation_key: str, option=None) -> None:
+    """Forget a rotation's progress for one category (or all of them)."""
+    with transaction(immediate=True) as conn:
+        where, params = "rotation_key = ?", [rotation_key]
+        if option is not None:
+            where += " AND category = ?"
+            params.append(category_key(option))
+        conn.execute(f"DELETE FROM rotation_bag WHERE {where}", params)
+        conn.execute(f"DELETE FROM rotation_cursor WHERE {where}", params)
+    with _prefetch_lock:
+        for prefetch_key in [k for k in _prefetched if k[1] == rotation_key and option in (None, k[2])]:
+            del _prefetched[prefetch_key]
+
+
+@dataclass(frozen=True)
+class PrefetchedPick:
+    """A rotation's next pick, found ahead of the roll that will consume it."""
+
+    name: str
+    option: str
+    position: int
+    # Rotation and catalog state the pick was computed against
+    cursor: int
+    updated: str
+    catalog_version: int
+
+
+# (database path, rotation key, category) -> next pick
+_prefetched: dict[tuple[str, str, str], PrefetchedPick] = {}
+_prefetch_lock = threading.Lock()
+
+
+def prefetch_next_pick(rotation_key: str, option="Normal", path: str | Path | None = None) -> PrefetchedPick | None:
+    """Find the next rotation pick for (rotation_key, option) ahead of time.
+
+    Run in the background after a roll: the bag is reshuffled, merged or
+    reordered now, so the next roll in this rotation only has to advance the
+    cursor and append the history row. Does nothing outside rotation mode or
+    when rolls are seeded, since a pick drawn early would change the sequence,
+    nor after a key's first roll, which may well be its only one.
+    """
+    from app.config import get_app_config
+
+    if get_app_config()["selection_mode"] != "rotation" or get_rng() is not None:
+        return None
+    path = str(path or db_path)
+    category = category_key(option)
+    catalog_version = catalog.get(path).version
+    with transaction(immediate=True, path=path) as conn:
+        state = conn.execute(
+            "SELECT cursor FROM rotation_cursor WHERE rotation_key = ? AND category = ?", (rotation_key, category)
+        ).fetchone()
+        if state is not None and _rotation_pending(conn, rotation_key, category, state[0]):
+            return None
+        found = _rotation_next(conn, rotation_key, option, _last_lunch(conn))
+        if found is None:
+            return None
+        cursor, updated = conn.execute(
+            "SELECT cursor, updated FROM rotation_cursor WHERE rotation_key = ? AND category = ?",
+            (rotation_key, category),
+        ).fetchone()
+    pick = PrefetchedPick(*found, cursor, updated, catalog_version)
+    with _prefetch_lock:
+        _prefetched[(path, rotation_key, category)] = pick
+    return pick
+
+
+def _take_prefetched(rotation_key: str, option) -> tuple[str, str] | None:
+    """Commit the prefetched pick for (rotation_key, option) if it is still valid.
+
+    It is dropped if the catalog changed, the rotation moved on (another roll
+    or a reset changed its cursor row) or it became the last lunch through
+    another rotation; the caller then rolls normally.
+    """
+    path = str(db_path)
+    category = category_key(option)
+    with _prefetch_lock:
+        pick = _prefetched.pop((path, rotation_key, category), None)
+    if pick is None or pick.catalog_version != catalog.get(path).version:
+        return None
+    with transaction(immediate=True) as conn:
+        if _last_lunch(conn) == pick.name:
+            return None
+        advanced = conn.execute(
+            "UPDATE rotation_cursor SET cursor = ?, updated = ? "
+            "WHERE rotation_key = ? AND category = ? AND cursor = ? AND updated = ?",
+            (pick.position + 1, datetime.now().isoformat(), rotation_key, category, pick.cursor, pick.updated),
+        ).rowcount
+        if not advanced:
+            return None
+        _record_lunches(conn, [pick.name])
+    return pick.name, pick.option
+
+
+# Roll strategies selectable with SELECTION_MODE
+SELECTION_MODES = ("rotation", "weighted", "recency")
+
+# Most picks one batch roll may draw (a month of weekdays and then some)
+MAX_BATCH_ROLLS = 31
+
+
+def _selection_mode(mode: str | None) -> str:
+    """Resolve ``mode`` (default: SELECTION_MODE), raising ConfigurationError if it is unknown."""
+    from app.config import ConfigurationError, get_app_config
+
+    mode = mode or get_app_config()["selection_mode"]
+    if mode not in SELECTION_MODES:
+        raise ConfigurationError(f"Invalid SELECTION_MODE '{mode}'. Valid options: {', '.join(SELECTION_MODES)}")
+    return mode
+
+
+def _recency_pick(conn: sqlite3.Connection, option, exclude=(), rng: random.Random | None = None) -> tuple[str, str] | None:
+    """Pick a restaurant in ``option`` with recent visits penalized.
+
+    One query weighs only the restaurants in the window: a window function
+    ranks the last RECENCY_WINDOW history rows (read newest first from the date
+    index), and each restaurant's most recent visit gives its age in picks
+    (1 = the last lunch). The RECENCY_EXCLUDE most recent picks get weight 0
+    and older ones recover linearly (age / (window + 1)). The same query returns
+    how many candidates lie outside the window, from ``category_stats``; each of
+    those weighs 1. A draw from ``rng`` then chooses a windowed restaurant or,
+    in proportion to their total, a uniform sample of the rest, so the category
+    is never scanned. Returns None when every candidate has weight 0.
+    """
+    from app.config import get_app_config
 
-        if not restaurants:
+    app_config = get_app_config()
+    window = app_config["recency_window"]
+    where, params = _candidate_filter(option, exclude)
+    rows = conn.execute(
+        f'''
+        WITH history AS (
+            SELECT restaurants, row_number() OVER (ORDER BY date DESC) AS age
+            FROM (SELECT restaurants, date FROM recent_lunch ORDER BY date DESC LIMIT ?)
+        ),
+        -- CROSS JOIN keeps the window outermost: one index probe per windowed name
+        windowed AS (
+            SELECT restaurants, option, CASE WHEN h.age <= ? THEN 0.0 ELSE h.age * 1.0 / (? + 1) END AS weight
+            FROM (SELECT restaurants AS name, min(age) AS age FROM history GROUP BY restaurants) h
+            CROSS JOIN lunch_list ON restaurants = h.name
+            WHERE {where}
+        )
+        SELECT restaurants, option, weight FROM windowed
+        UNION ALL
+        SELECT NULL, NULL, coalesce((SELECT size FROM category_stats WHERE category = lower(trim(?))), 0)
+            - (SELECT count(*) FROM lunch_list WHERE category = lower(trim(?))
+                AND restaurants IN (SELECT value FROM json_each(?)))
+            - (SELECT count(*) FROM windowed)
+        ''',
+        (window, app_config["recency_exclude"], window, *params, option, option, json.dumps(list(exclude))),
+    ).fetchall()
+    windowed = [row for row in rows if row[0] is not None]
+    rest = next(row[2] for row in rows if row[0] is None)
+    total = sum(weight for _, _, weight in windowed) + rest
+    if total <= 0:
+        return None
+    point = (rng or random).random() * total
+    for name, restaurant_option, weight in windowed:
+        if point < weight:
+            return name, restaurant_option
+        point -= weight
+    return _sample_restaurant(conn, option, [*exclude, *(name for name, _, _ in windowed)], rng)
+
+
+def _draw_lunches(
+    conn: sqlite3.Connection,
+    count: int,
+    option,
+    mode: str,
+    rotation_key: str | None,
+    rolled: list[str],
+    rng: random.Random | None = None,
+) -> list[tuple[str, str]]:
+    """Draw ``count`` picks in ``option`` without writing history.
+
+    Picks are sampled without replacement: each avoids the ones before it (and
+    the last recorded lunch) until the category runs out, then a new cycle
+    starts. ``rolled`` holds the names already picked this cycle in session,
+    weighted and recency modes and is updated in place; rotation mode keeps its
+    cycle in the shuffle bag instead.
+    """
+    last = _last_lunch(conn)
+    picks: list[tuple[str, str]] = []
+    for _ in range(count):
+        batch = [name for name, _ in picks]
+        if mode == "rotation" and rotation_key is not None:
+            chosen = _rotation_pick(conn, rotation_key, option, last, batch, rng)
+        else:
+            # If all restaurants have been rolled, start a new cycle, keeping
+            # this batch's picks out of it while anything else is left
+            if rolled and _count_restaurants(conn, option, rolled) == 0:
+                rolled[:] = batch if _count_restaurants(conn, option, batch) else []
+            avoid = rolled + ([last] if last else [])
+            if mode == "weighted":
+                from app.backend.weights import selector
+
+                chosen = selector.draw(conn, option, avoid, rng)
+            elif mode == "recency":
+                # The history query already penalizes the last lunch; earlier
+                # picks of this batch are not in the history yet
+                chosen = _recency_pick(conn, option, rolled, rng) or _sample_restaurant(conn, option, rolled, rng)
+            else:
+                # Sample from unrolled restaurants other than the last one; if
+                # only the last restaurant is left unrolled, we have to use it
+                chosen = _sample_restaurant(conn, option, avoid, rng) or _sample_restaurant(conn, option, rolled, rng)
+            if chosen is not None:
+                rolled.append(chosen[0])
+        if chosen is None:
             raise ValueError(f"No restaurants found with option: {option}")
+        picks.append(chosen)
+        last = chosen[0]
+    return picks
 
-        # Initialize session_rolled if not provided
-        if session_rolled is None:
-            session_rolled = set()
 
-        # Find restaurants not yet rolled in this session
-        unrolled = [r for r in restaurants if r[0] not in session_rolled]
+def calculate_lunches(
+    count: int, option="Normal", session_rolled=None, rotation_key=None, mode=None, rng: random.Random | None = None
+):
+    """Select ``count`` restaurants at once, e.g. a week's schedule.
 
-        # If all restaurants have been rolled, reset the session for this option
-        if not unrolled:
-            session_rolled.clear()
-            unrolled = restaurants
+    Follows the same rules as :func:`calculate_lunch` (see there for
+    ``session_rolled``, ``rotation_key``, ``mode`` and ``rng``), and picks are distinct
+    as long as the category has enough restaurants. All picks are drawn and
+    written to the history in one ``BEGIN IMMEDIATE`` transaction, so the
+    schedule is recorded in order or not at all.
+    """
+    if not 1 <= count <= MAX_BATCH_ROLLS:
+        raise ValueError(f"Can roll between 1 and {MAX_BATCH_ROLLS} lunches at once")
+    mode = _selection_mode(mode)
+    rng = rng or get_rng()
+
+    if count == 1 and mode == "rotation" and rotation_key is not None and rng is None:
+        prefetched = _take_prefetched(rotation_key, option)
+        if prefetched is not None:
+            return [prefetched]
+    uses_session = mode == "rotation" and rotation_key is None
+    rolled = list(session_rolled or ()) if uses_session else []
+
+    with transaction(immediate=True) as conn:
+        picks = _draw_lunches(conn, count, option, mode, rotation_key, rolled, rng)
+        _record_lunches(conn, [name for name, _ in picks])
+
+    # Session state is only updated once the picks have committed
+    if uses_session and session_rolled is not None:
+        session_rolled.clear()
+        session_rolled.update(rolled)
+    return picks
+
+
+def calculate_lunch(option="Normal", session_rolled=None, rotation_key=None, mode=None, rng=None):
+    """Select a restaurant using round-robin logic within the session.
+
+    With ``rotation_key`` (e.g. a user or browser session id) the round-robin
+    state is a persistent shuffle bag in SQLite, shared by every worker process
+    and kept across restarts; ``session_rolled`` is then ignored. Otherwise
+    ``session_rolled`` is an in-memory set of names already picked this cycle.
+
+    ``mode`` (default: SELECTION_MODE) set to "weighted" replaces the
+    round-robin with a draw weighted by SELECTION_WEIGHTS (see
+    :mod:`app.backend.weights`); "recency" draws with every visit in the last
+    RECENCY_WINDOW picks penalized (see :func:`_recency_pick`). Session state
+    is not used in either.
+
+    The candidate read, the last-pick check and the history write run in one
+    ``BEGIN IMMEDIATE`` transaction, so concurrent rolls are serialized and can
+    never both pass the "not the last restaurant" check with the same pick.
+    ``session_rolled`` is only updated once the roll has committed.
+
+    Every random choice is drawn from ``rng`` (default: :func:`get_rng`), so a
+    roll replays exactly given the same generator state and database.
+
+    A rotation pick readied by :func:`prefetch_next_pick` is committed directly
+    (one cursor update and one history insert) as long as it is still valid.
+    """
+    return calculate_lunches(1, option, session_rolled, rotation_key, mode, rng)[0]
 
-        # Get the most recently selected restaurant to avoid immediate repetition
-        cursor.execute("""
-            SELECT restaurants FROM recent_lunch 
-            ORDER BY date DESC 
-            LIMIT 1
-        """)
-        last_result = cursor.fetchone()
-        last_restaurant = last_result[0] if last_result else None
 
-        # Filter out the last restaurant from unrolled options
-        available = [r for r in unrolled if r[0] != last_restaurant]
+def _normalize_date(value):
+    """Normalize timestamps (e.g. ``2022-01-26 13:20:32``) to ISO format so they sort with app-written ones."""
+    if not value:
+        return value
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return value
+
+
+@dataclass(frozen=True)
+class ImportTable:
+    """How records map onto an importable table."""
+
+    columns: tuple[str, ...]
+    # Unique key "replace" upserts on; rows are updated in place so ids (and the
+    # ratings, rotation and group bits keyed on them) survive a re-import
+    key: tuple[str, ...] = ()
+    # Alternate field names accepted in files, e.g. the seed CSV's "restaurant"
+    aliases: dict[str, str] = field(default_factory=dict)
+    normalizers: dict[str, Callable] = field(default_factory=dict)
+
+
+IMPORT_TABLES: dict[str, ImportTable] = {
+    "lunch_list": ImportTable(columns=("restaurants", "option"), key=("restaurants",), aliases={"restaurant": "restaurants"}),
+    "recent_lunch": ImportTable(
+        columns=("restaurants", "date"),
+        key=("restaurants", "date"),
+        aliases={"restaurant": "restaurants"},
+        normalizers={"date": _normalize_date},
+    ),
+    "restaurant_info": ImportTable(
+        columns=("restaurant_name", "address", "phone", "hours", "website", "description", "last_updated"),
+        key=("restaurant_name",),
+        aliases={"restaurant": "restaurant_name", "restaurants": "restaurant_name"},
+        normalizers={"last_updated": _normalize_date},
+    ),
+}
+
+# Duplicate policy -> INSERT conflict clause ("replace" is an upsert on the table's key)
+DUPLICATE_POLICIES = {"ignore": "OR IGNORE", "replace": "", "error": ""}
+
+
+@dataclass
+class ImportResult:
+    """Row counts from a bulk import."""
+
+    read: int = 0
+    written: int = 0
+    skipped: int = 0
+
+
+def iter_records(path: str | Path) -> Iterator[dict]:
+    """Stream records from a ``.csv`` or ``.jsonl``/``.ndjson`` file one row at a time."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, newline="" if suffix == ".csv" else None, encoding="utf-8") as f:
+        if suffix == ".csv":
+            yield from csv.DictReader(f)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {path.suffix}")
 
-        # If only the last restaurant is left unrolled, we have to use it
-        if not available and unrolled:
-            available = unrolled
 
-        # If no restaurants available (shouldn't happen), use all
-        if not available:
-            available = restaurants
+def _import_sql(table: str, on_duplicate: str) -> str:
+    """INSERT statement for ``table`` with the duplicate policy's conflict clause.
 
-        # Select a random restaurant from available options
-        chosen = random.choice(available)
+    "replace" updates the conflicting row rather than using INSERT OR REPLACE,
+    whose delete would fire the ON DELETE triggers (dropping ratings and
+    releasing vetoed ids) and give the row a new id.
+    """
+    spec = IMPORT_TABLES[table]
+    sql = (
+        f"INSERT {DUPLICATE_POLICIES[on_duplicate]} INTO {table} ({', '.join(spec.columns)}) "
+        f"VALUES ({', '.join('?' for _ in spec.columns)})"
+    )
+    if on_duplicate == "replace" and spec.key:
+        updates = [f"{c} = excluded.{c}" for c in spec.columns if c not in spec.key]
+        sql += f" ON CONFLICT({', '.join(spec.key)}) " + (f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING")
+    return sql
+
+
+def _import_rows(table: str, records: Iterable[dict], result: ImportResult) -> Iterator[tuple]:
+    """Map records onto ``table``'s columns, counting rows read and skipped in ``result``."""
+    spec = IMPORT_TABLES[table]
+    for record in records:
+        result.read += 1
+        record = {spec.aliases.get(k, k): v for k, v in record.items()}
+        if not record.get(spec.columns[0]):
+            result.skipped += 1
+            continue
+        yield tuple(spec.normalizers.get(c, lambda v: v)(record.get(c)) for c in spec.columns)
+
+
+def import_records(
+    table: str,
+    records: Iterable[dict],
+    on_duplicate: str = "ignore",
+    batch_size: int = 1000,
+    progress: Callable[[ImportResult], None] | None = None,
+) -> ImportResult:
+    """Bulk insert records into ``table`` in bounded transactions.
+
+    Records are consumed lazily and written ``batch_size`` at a time with
+    ``executemany``, one transaction per batch, so memory use does not depend on
+    the size of the input. Records without a name are skipped.
 
-        # Add to session rolled set
-        session_rolled.add(chosen[0])
+    Args:
+        table: One of :data:`IMPORT_TABLES`
+        records: Iterable of dicts keyed by column name (or an accepted alias)
+        on_duplicate: "ignore" keeps existing rows, "replace" overwrites them,
+                      "error" raises ValueError (batches already committed stay)
+        batch_size: Rows per transaction
+        progress: Called with the running totals after each committed batch
 
-        # Add to recent lunches database
-        add_to_recent_lunch(chosen[0])
+    Returns:
+        ImportResult with rows read, written and skipped.
+    """
+    if table not in IMPORT_TABLES:
+        raise ValueError(f"Unsupported import table: {table}")
+    if on_duplicate not in DUPLICATE_POLICIES:
+        raise ValueError(f"Invalid duplicate policy '{on_duplicate}'. Valid options: {', '.join(DUPLICATE_POLICIES)}")
+
+    sql = _import_sql(table, on_duplicate)
+    result = ImportResult()
+    pending = _import_rows(table, records, result)
+    try:
+        while batch := list(itertools.islice(pending, batch_size)):
+            with transaction(immediate=True) as conn:
+                # rowcount excludes rows written by triggers (e.g. the search index)
+                result.written += conn.executemany(sql, batch).rowcount
+            if progress:
+                progress(result)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Duplicate row importing into {table}: {e}") from None
+    finally:
+        if table == "lunch_list" and result.written:
+            catalog.invalidate()
 
-        return chosen
-    except Exception as e:
-        print(f"Error calculating lunch: {e}")
-        # Re-raise if it's a ValueError about no restaurants
-        if isinstance(e, ValueError) and "No restaurants found" in str(e):
-            raise e
-        # Fallback to simple random selection
-        restaurants = get_restaurants(option)
-        if not restaurants:
-            raise ValueError(f"No restaurants found with option: {option}")
-        return random.choice(restaurants)
+    return result
+
+
+def import_file(path: str | Path, table: str, **kwargs) -> ImportResult:
+    """Stream a CSV or JSONL file into ``table``; see :func:`import_records` for options."""
+    return import_records(table, iter_records(path), **kwargs)
+
+
+def build_seed_db(output: str | Path, csv_path: str | Path | None = None) -> ImportResult:
+    """Build a compact seed database from the restaurant CSV (build-time step).
+
+    The result is at :data:`SCHEMA_VERSION` with every index in place, analyzed
+    and VACUUMed, and uses a rollback journal so it ships as a single file. It is
+    written next to ``output`` and moved into place once complete.
+    """
+    output = Path(output)
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    result = ImportResult()
+
+    conn = open_connection(tmp, replace(get_storage_config(), journal_mode="delete"))
+    try:
+        conn.execute("BEGIN")
+        result.written = conn.executemany(
+            _import_sql("lunch_list", "ignore"),
+            _import_rows("lunch_list", iter_records(csv_path or restaurants_csv), result),
+        ).rowcount
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    except BaseException:
+        conn.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp, output)
+    return result
+
+
+def install_seed_db(target: str | Path, seed: str | Path | None = None) -> bool:
+    """Copy the prebuilt seed database to ``target`` on first launch.
+
+    Uses the SQLite backup API into a temporary file that is then moved into
+    place, so a half-copied database is never opened. Does nothing if ``target``
+    already holds a database, the seed is missing, or the seed was built by a
+    newer schema than this release knows.
+
+    Returns:
+        True if the seed was installed.
+    """
+    seed = Path(seed) if seed is not None else seed_db_path
+    target_key = str(target)
+    if target_key == ":memory:" or target_key.startswith("file:") or not seed.exists():
+        return False
+    target = Path(target)
+    if target.exists() and target.stat().st_size > 0:
+        return False
+
+    tmp = target.with_name(target.name + ".seed-tmp")
+    src = sqlite3.connect(f"{seed.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        if src.execute("PRAGMA user_version").fetchone()[0] > SCHEMA_VERSION:
+            return False
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(tmp, target)
+    return True
+
+
+# Export name -> query; columns match IMPORT_TABLES so exports re-import cleanly
+EXPORT_QUERIES = {
+    "lunch_list": "SELECT restaurants, option FROM lunch_list ORDER BY restaurants",
+    "recent_lunch": "SELECT restaurants, date FROM recent_lunch ORDER BY date",
+    "restaurant_info": (
+        "SELECT restaurant_name, address, phone, hours, website, description, last_updated "
+        "FROM restaurant_info ORDER BY restaurant_name"
+    ),
+}
+
+# Export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "msgpack": ("application/x-msgpack", "msgpack"),
+}
+
+
+def _encode_csv(columns, rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(columns, rows, header: bool) -> bytes:
+    return "".join(json.dumps(dict(zip(columns, row, strict=True))) + "\n" for row in rows).encode()
+
+
+def _encode_msgpack(columns, rows, header: bool) -> bytes:
+    # A stream of concatenated maps, readable with msgpack.Unpacker
+    packer = msgpack.Packer()
+    return b"".join(packer.pack(dict(zip(columns, row, strict=True))) for row in rows)
+
+
+_EXPORT_ENCODERS = {"csv": _encode_csv, "ndjson": _encode_ndjson, "msgpack": _encode_msgpack}
+
+
+def export_table(table: str = "lunch_list", fmt: str = "csv", chunk_size: int = 500) -> Iterator[bytes]:
+    """Stream a table as CSV, NDJSON or msgpack.
+
+    Arguments are validated immediately; the returned iterator then reads the
+    table ``chunk_size`` rows at a time from a dedicated connection (closed when
+    the iterator finishes or is closed), so large exports are never held in
+    memory and do not tie up a pooled connection.
+
+    Raises:
+        ValueError: If the table or format is not supported.
+    """
+    if table not in EXPORT_QUERIES:
+        raise ValueError(f"Unsupported export table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Valid options: {', '.join(EXPORT_FORMATS)}")
+    return _iter_export(db_path, EXPORT_QUERIES[table], _EXPORT_ENCODERS[fmt], chunk_size)
+
+
+def _iter_export(path, query: str, encode, chunk_size: int) -> Iterator[bytes]:
+    conn = open_connection(path)
+    try:
+        cursor = conn.execute(query)
+        columns = [d[0] for d in cursor.description]
+        header = True
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows and not header:
+                break
+            yield encode(columns, rows, header)
+            header = False
     finally:
-        if conn:
-            conn.close()
+        conn.close()
 
 
 def get_restaurant_info(restaurant_name: str, max_age_days: int | None = None) -> dict | None:
@@ -314,20 +1931,16 @@ def get_restaurant_info(restaurant_name: str, max_age_days: int | None = None) -
         Restaurant info dict if found and not stale, None otherwise.
     """
     from app.config import get_app_config
-    from datetime import timedelta
 
     if max_age_days is None:
         max_age_days = get_app_config()["cache_ttl_days"]
 
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
+        conn = get_connection()
+        row = conn.execute(
             "SELECT address, phone, hours, website, description, last_updated FROM restaurant_info WHERE restaurant_name = ?",
             (restaurant_name,),
-        )
-        row = cursor.fetchone()
+        ).fetchone()
 
         if row:
             last_updated = row[5]
@@ -349,9 +1962,53 @@ def get_restaurant_info(restaurant_name: str, max_age_days: int | None = None) -
     except Exception as e:
         print(f"Error getting restaurant info: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+
+def get_restaurants_needing_info(max_age_days: int | None = None, limit: int | None = None) -> list[str]:
+    """Names of restaurants whose info is missing or older than ``max_age_days``, in one query.
+
+    Restaurants with no info come first, then the stalest. ``max_age_days``
+    defaults to CACHE_TTL_DAYS, like :func:`get_restaurant_info`.
+    """
+    from app.config import get_app_config
+
+    if max_age_days is None:
+        max_age_days = get_app_config()["cache_ttl_days"]
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+
+    try:
+        conn = get_connection()
+        rows = conn.execute(
+            '''
+            SELECT l.restaurants
+            FROM lunch_list l
+            LEFT JOIN restaurant_info i ON i.restaurant_name = l.restaurants
+            WHERE i.last_updated IS NULL OR i.last_updated < ?
+            ORDER BY i.last_updated IS NOT NULL, i.last_updated, l.restaurants
+            LIMIT ?
+            ''',
+            (cutoff, -1 if limit is None else limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+    except Exception as e:
+        print(f"Error finding restaurants needing info: {e}")
+        return []
+
+
+_SAVE_INFO_SQL = '''
+    INSERT INTO restaurant_info
+        (restaurant_name, address, phone, hours, website, description, last_updated)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(restaurant_name) DO UPDATE SET
+        address = excluded.address,
+        phone = excluded.phone,
+        hours = excluded.hours,
+        website = excluded.website,
+        description = excluded.description,
+        last_updated = excluded.last_updated
+'''
+
+INFO_FIELDS = ("address", "phone", "hours", "website", "description")
 
 
 def save_restaurant_info(
@@ -363,54 +2020,51 @@ def save_restaurant_info(
     description: str | None = None,
 ) -> None:
     """Save or update restaurant info."""
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
         now = datetime.now().isoformat()
 
-        cursor.execute(
-            '''
-            INSERT INTO restaurant_info
-                (restaurant_name, address, phone, hours, website, description, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(restaurant_name) DO UPDATE SET
-                address = excluded.address,
-                phone = excluded.phone,
-                hours = excluded.hours,
-                website = excluded.website,
-                description = excluded.description,
-                last_updated = excluded.last_updated
-        ''',
-            (restaurant_name, address, phone, hours, website, description, now),
-        )
-
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(_SAVE_INFO_SQL, (restaurant_name, address, phone, hours, website, description, now))
     except Exception as e:
         print(f"Error saving restaurant info: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
+
+
+def save_restaurant_infos(infos: Sequence[dict]) -> int:
+    """Save or update info for many restaurants in one transaction.
+
+    Each dict has a ``restaurant_name`` plus any of :data:`INFO_FIELDS`.
+    Restaurants deleted since their lookup started are skipped. Returns the
+    number of rows saved; errors are raised so a lost batch is never silent.
+    The write lock is taken up front, so a commit from another connection
+    between the read and the write waits on busy_timeout instead of failing.
+    """
+    if not infos:
+        return 0
+    now = datetime.now().isoformat()
+    with transaction(immediate=True) as conn:
+        names = {
+            row[0]
+            for row in conn.execute(
+                "SELECT restaurants FROM lunch_list WHERE restaurants IN (SELECT value FROM json_each(?))",
+                (json.dumps([info["restaurant_name"] for info in infos]),),
+            )
+        }
+        rows = [
+            (info["restaurant_name"], *(info.get(field) for field in INFO_FIELDS), now)
+            for info in infos
+            if info["restaurant_name"] in names
+        ]
+        conn.executemany(_SAVE_INFO_SQL, rows)
+    return len(rows)
 
 
 def delete_restaurant_info(restaurant_name: str) -> None:
     """Delete restaurant info by name."""
-    conn = None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM restaurant_info WHERE restaurant_name = ?", (restaurant_name,))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("DELETE FROM restaurant_info WHERE restaurant_name = ?", (restaurant_name,))
     except Exception as e:
         print(f"Error deleting restaurant info: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
 
 
 if __name__ == "__main__":
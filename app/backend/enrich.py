@@ -0,0 +1,216 @@
+"""
+Bulk restaurant info enrichment.
+
+Backfills restaurant_info for every restaurant whose info is missing or stale.
+Candidates come from one query; lookups run on a pool of asyncio workers (the
+concurrency limit), each waiting on a shared rate limiter before calling the
+blocking lookup on a thread. Results are written in batched transactions by a
+single writer, and progress is reported after every lookup.
+
+Run as a command:
+
+    python -m app.backend.enrich [--limit N] [--concurrency N] [--rate R]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+# Add project root to path for direct execution
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.backend.db import INFO_FIELDS
+from app.backend.logging import start_action
+from app.config import get_app_config
+from eliot import log_message
+
+
+@dataclass
+class EnrichmentProgress:
+    """Running totals for a bulk enrichment."""
+
+    total: int
+    done: int = 0
+    found: int = 0
+    failed: int = 0  # lookups that raised (connection, HTTP or configuration errors)
+    saved: int = 0
+    unsaved: int = 0  # found results lost because their batch failed to write
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Lookups finished per second so far."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.done}/{self.total} looked up, {self.found} found, {self.failed} failed, "
+            f"{self.saved} saved" + (f", {self.unsaved} unsaved" if self.unsaved else "") + f" ({self.rate:.1f}/s)"
+        )
+
+
+ProgressCallback = Callable[[EnrichmentProgress], None]
+
+
+class RateLimiter:
+    """Space calls at least ``1 / rate`` seconds apart across all workers (rate <= 0: unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        # Reserve the next slot before sleeping so concurrent waiters queue up behind it
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def _info_row(name: str, info) -> dict:
+    return {"restaurant_name": name, **{f: getattr(info, f, None) for f in INFO_FIELDS}}
+
+
+async def enrich_restaurants(
+    db_manager,
+    names: Sequence[str] | None = None,
+    *,
+    lookup: Callable | None = None,
+    concurrency: int | None = None,
+    rate: float | None = None,
+    batch_size: int | None = None,
+    max_age_days: int | None = None,
+    limit: int | None = None,
+    on_progress: ProgressCallback | None = None,
+) -> EnrichmentProgress:
+    """Look up and save info for ``names``, or for every restaurant with missing or stale info.
+
+    ``lookup`` takes a restaurant name and returns an object with the info
+    fields, or None when nothing was found, and raises on failure (default:
+    the agent lookup with ``raise_errors``). The concurrency, rate (lookups per
+    second) and batch size default to ENRICH_CONCURRENCY, ENRICH_RATE and
+    ENRICH_BATCH_SIZE. A failed lookup or batch write is counted and logged,
+    and does not stop the run.
+    """
+    if lookup is None:
+        from app.backend.agent import lookup_restaurant_info
+
+        lookup = partial(lookup_restaurant_info, raise_errors=True)
+
+    app_config = get_app_config()
+    concurrency = max(concurrency or app_config["enrich_concurrency"], 1)
+    rate = app_config["enrich_rate"] if rate is None else rate
+    batch_size = max(batch_size or app_config["enrich_batch_size"], 1)
+    if names is None:
+        names = db_manager.get_restaurants_needing_info(max_age_days, limit)
+
+    progress = EnrichmentProgress(total=len(names))
+    if not names:
+        return progress
+
+    loop = asyncio.get_running_loop()
+    limiter = RateLimiter(rate)
+    todo: asyncio.Queue[str] = asyncio.Queue()
+    for name in names:
+        todo.put_nowait(name)
+    results: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    async def worker(executor: ThreadPoolExecutor) -> None:
+        while True:
+            try:
+                name = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.wait()
+            try:
+                info = await loop.run_in_executor(executor, lookup, name)
+            except Exception as e:
+                progress.failed += 1
+                log_message(message_type="enrich_lookup_error", restaurant=name, error=str(e))
+            else:
+                if info:
+                    progress.found += 1
+                    await results.put(_info_row(name, info))
+            progress.done += 1
+            if on_progress:
+                on_progress(progress)
+
+    async def writer() -> None:
+        batch: list[dict] = []
+        finished = False
+        while not finished:
+            row = await results.get()
+            if row is None:
+                finished = True
+            else:
+                batch.append(row)
+            if batch and (finished or len(batch) >= batch_size):
+                try:
+                    progress.saved += await asyncio.to_thread(db_manager.save_restaurant_infos, batch)
+                    log_message(message_type="enrich_batch_saved", count=len(batch))
+                except Exception as e:
+                    progress.unsaved += len(batch)
+                    log_message(message_type="enrich_batch_error", count=len(batch), error=str(e))
+                batch = []
+
+    with start_action(action_type="enrich_restaurants", total=len(names), concurrency=concurrency) as action:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="enrich") as executor:
+            writing = asyncio.create_task(writer())
+            try:
+                await asyncio.gather(*(worker(executor) for _ in range(min(concurrency, len(names)))))
+            finally:
+                await results.put(None)
+                await writing
+        action.add_success_fields(found=progress.found, failed=progress.failed, saved=progress.saved, unsaved=progress.unsaved)
+    return progress
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Command-line entry point: enrich every restaurant with missing or stale info."""
+    parser = argparse.ArgumentParser(description="Look up info for restaurants with missing or stale info.")
+    parser.add_argument("--limit", type=int, help="enrich at most N restaurants")
+    parser.add_argument("--max-age-days", type=int, help="refresh info older than this (default: CACHE_TTL_DAYS)")
+    parser.add_argument("--concurrency", type=int, help="concurrent lookups (default: ENRICH_CONCURRENCY)")
+    parser.add_argument("--rate", type=float, help="lookups per second, 0 for no limit (default: ENRICH_RATE)")
+    parser.add_argument("--batch-size", type=int, help="results per write transaction (default: ENRICH_BATCH_SIZE)")
+    args = parser.parse_args(argv)
+
+    from app.backend import db
+    from app.backend.service import RestaurantService
+
+    service = RestaurantService(db)
+    service.initialize()
+
+    def report(progress: EnrichmentProgress) -> None:
+        print(f"\r{progress}", end="", flush=True)
+
+    progress = asyncio.run(
+        service.enrich_all(
+            max_age_days=args.max_age_days,
+            limit=args.limit,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            batch_size=args.batch_size,
+            on_progress=report,
+        )
+    )
+    print(f"\r{progress}")
+    return 1 if progress.failed or progress.unsaved else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
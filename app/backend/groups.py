@@ -0,0 +1,252 @@
+"""
+Group rolls.
+
+A group room holds each member's vetoes and likes as bitsets over lunch_list
+ids (bit ``i`` set = restaurant with id ``i``), stored as little-endian BLOBs
+and handled as Python ints. The restaurants a group can go to are computed with
+whole-set bitwise operations: the category's bitset minus the union of every
+member's vetoes. Likes are soft preferences: restaurants everyone who stated
+likes agrees on come first, then ones anybody likes, then the rest.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+from app.backend import db
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+# Random bit positions tried before counting through the bitset for a pick
+MAX_PROBES = 64
+
+
+def to_bitset(ids: Iterable[int]) -> int:
+    """Bitset with the bits of ``ids`` set."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        data[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(data, "little")
+
+
+def from_bitset(mask: int) -> list[int]:
+    """Ids of the set bits of ``mask``, ascending."""
+    ids = []
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for offset, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            ids.append(offset * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def encode_bitset(mask: int) -> bytes:
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+def decode_bitset(data: bytes | None) -> int:
+    return int.from_bytes(data or b"", "little")
+
+
+def random_bit(mask: int, rng: random.Random | None = None) -> int:
+    """Uniformly random set bit of a non-zero ``mask``.
+
+    Probes random positions first, which finds a bit quickly unless the set is
+    sparse; otherwise counts through 64-bit words to the k-th set bit.
+    """
+    if mask <= 0:
+        raise ValueError("Cannot pick from an empty bitset")
+    rng = rng or random
+    top = mask.bit_length()
+    for _ in range(MAX_PROBES):
+        i = rng.randrange(top)
+        if mask >> i & 1:
+            return i
+    k = rng.randrange(mask.bit_count())
+    data = encode_bitset(mask)
+    data += bytes(-len(data) % 8)
+    for offset, word in enumerate(memoryview(data).cast("Q")):
+        count = word.bit_count()
+        if k < count:
+            for _ in range(k):
+                word &= word - 1
+            return offset * 64 + (word & -word).bit_length() - 1
+        k -= count
+    raise AssertionError("bit count mismatch")
+
+
+class CategoryBitsets:
+    """Bitset of lunch_list ids per category, rebuilt per category when the catalog changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._masks: dict[str, int] = {}
+
+    def get(self, conn: sqlite3.Connection, category: str) -> int:
+        version = db.get_catalog().version
+        with self._lock:
+            if version != self._version:
+                self._masks.clear()
+                self._version = version
+            if category not in self._masks:
+                # Index-only scan: the category index carries the rowid (id)
+                ids = [row[0] for row in conn.execute("SELECT id FROM lunch_list WHERE category = ?", (category,))]
+                self._masks[category] = to_bitset(ids)
+            return self._masks[category]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version = None
+            self._masks.clear()
+
+
+categories = CategoryBitsets()
+
+
+@dataclass(frozen=True)
+class GroupMasks:
+    """Combined preferences of a room's members."""
+
+    members: int
+    vetoes: int  # vetoed by anyone
+    liked_by_all: int  # liked by every member who likes anything
+    liked_by_any: int
+
+
+def _release_deleted_ids(conn: sqlite3.Connection) -> None:
+    """Clear the bits of deleted restaurants from every member before their ids are reused."""
+    released = [row[0] for row in conn.execute("SELECT restaurant_id FROM group_released_id")]
+    if not released:
+        return
+    keep = ~to_bitset(released)
+    rows = conn.execute("SELECT room_id, member, vetoes, likes FROM group_member").fetchall()
+    conn.executemany(
+        "UPDATE group_member SET vetoes = ?, likes = ? WHERE room_id = ? AND member = ?",
+        [
+            (encode_bitset(decode_bitset(vetoes) & keep), encode_bitset(decode_bitset(likes) & keep), room_id, member)
+            for room_id, member, vetoes, likes in rows
+        ],
+    )
+    conn.execute("DELETE FROM group_released_id")
+
+
+def _room_id(conn: sqlite3.Connection, room: str, create: bool = False) -> int:
+    row = conn.execute("SELECT id FROM group_room WHERE name = ?", (room,)).fetchone()
+    if row:
+        return row[0]
+    if not create:
+        raise ValueError(f"Group '{room}' not found")
+    return conn.execute("INSERT INTO group_room (name, created) VALUES (?, ?)", (room, datetime.now().isoformat())).lastrowid
+
+
+def _restaurant_ids(conn: sqlite3.Connection, names: Iterable[str]) -> list[int]:
+    names = list(names)
+    if not all(isinstance(name, str) for name in names):
+        raise ValueError("Restaurant names must be strings")
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    found = dict(
+        conn.execute(
+            "SELECT restaurants, id FROM lunch_list WHERE restaurants IN (SELECT value FROM json_each(?))",
+            (json.dumps(names),),
+        )
+    )
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise ValueError(f"Restaurant '{missing[0]}' not found")
+    return [found[name] for name in names]
+
+
+def set_member(room: str, member: str, vetoes: Iterable[str] = (), likes: Iterable[str] = ()) -> None:
+    """Set a member's vetoes and likes (restaurant names), creating the room if needed."""
+    with db.transaction(immediate=True) as conn:
+        _release_deleted_ids(conn)
+        room_id = _room_id(conn, room, create=True)
+        conn.execute(
+            "INSERT OR REPLACE INTO group_member (room_id, member, vetoes, likes) VALUES (?, ?, ?, ?)",
+            (
+                room_id,
+                member,
+                encode_bitset(to_bitset(_restaurant_ids(conn, vetoes))),
+                encode_bitset(to_bitset(_restaurant_ids(conn, likes))),
+            ),
+        )
+
+
+def remove_member(room: str, member: str) -> None:
+    """Remove a member from a room."""
+    with db.transaction(immediate=True) as conn:
+        cursor = conn.execute("DELETE FROM group_member WHERE room_id = ? AND member = ?", (_room_id(conn, room), member))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Member '{member}' not found in group '{room}'")
+
+
+def delete_room(room: str) -> None:
+    """Delete a room and its members."""
+    with db.transaction(immediate=True) as conn:
+        room_id = _room_id(conn, room)
+        conn.execute("DELETE FROM group_member WHERE room_id = ?", (room_id,))
+        conn.execute("DELETE FROM group_room WHERE id = ?", (room_id,))
+
+
+def _room_masks(conn: sqlite3.Connection, room_id: int) -> GroupMasks:
+    members = vetoes = liked_by_any = 0
+    liked_by_all = -1  # all bits set until a member with likes narrows it
+    for veto_blob, like_blob in conn.execute("SELECT vetoes, likes FROM group_member WHERE room_id = ?", (room_id,)):
+        members += 1
+        vetoes |= decode_bitset(veto_blob)
+        likes = decode_bitset(like_blob)
+        if likes:
+            liked_by_all &= likes
+            liked_by_any |= likes
+    return GroupMasks(members, vetoes, liked_by_all if liked_by_any else 0, liked_by_any)
+
+
+def _eligible(conn: sqlite3.Connection, room: str, option) -> tuple[int, GroupMasks]:
+    _release_deleted_ids(conn)
+    masks = _room_masks(conn, _room_id(conn, room))
+    return categories.get(conn, db.category_key(option)) & ~masks.vetoes, masks
+
+
+def _names(conn: sqlite3.Connection, ids: list[int]) -> list[tuple[str, str]]:
+    return conn.execute(
+        "SELECT restaurants, option FROM lunch_list WHERE id IN (SELECT value FROM json_each(?)) ORDER BY restaurants",
+        (json.dumps(ids),),
+    ).fetchall()
+
+
+def eligible_restaurants(room: str, option="Normal") -> list[tuple[str, str]]:
+    """Restaurants in ``option`` that no member of ``room`` has vetoed."""
+    with db.transaction(immediate=True) as conn:
+        eligible, _ = _eligible(conn, room, option)
+        return _names(conn, from_bitset(eligible))
+
+
+def roll_group(room: str, option="Normal", rng: random.Random | None = None) -> tuple[str, str]:
+    """Pick a restaurant in ``option`` for everyone in ``room`` and record it.
+
+    Never picks a vetoed restaurant; prefers ones every member with likes likes,
+    then ones anybody likes, and avoids repeating the last lunch when possible.
+    """
+    with db.transaction(immediate=True) as conn:
+        eligible, masks = _eligible(conn, room, option)
+        if not eligible:
+            raise ValueError(f"No {option} restaurant is left that nobody in '{room}' has vetoed")
+        last = conn.execute(
+            "SELECT l.id FROM recent_lunch h JOIN lunch_list l ON l.restaurants = h.restaurants ORDER BY h.date DESC LIMIT 1"
+        ).fetchone()
+        not_last = ~(1 << last[0]) if last else -1
+        tiers = (masks.liked_by_all, masks.liked_by_any, -1)
+        candidates = next(c for c in (eligible & tier & mask for mask in (not_last, -1) for tier in tiers) if c)
+        name, restaurant_option = conn.execute(
+            "SELECT restaurants, option FROM lunch_list WHERE id = ?", (random_bit(candidates, rng or db.get_rng()),)
+        ).fetchone()
+        db._record_lunch(conn, name)
+    return name, restaurant_option
@@ -0,0 +1,77 @@
+"""
+Shared outbound HTTP client.
+
+One pooled, keep-alive httpx.Client serves the Ollama, OpenRouter and
+DuckDuckGo calls, so repeated lookups reuse open connections instead of paying
+a TCP and TLS handshake each time. httpx.Client is thread-safe; concurrent
+requests to any one host are additionally capped at HTTP_MAX_PER_HOST so a
+batch of lookups cannot monopolize the pool.
+"""
+
+import httpx
+import threading
+from app.config import get_app_config
+from urllib.parse import urlsplit
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+
+
+def get_client() -> httpx.Client:
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                app_config = get_app_config()
+                _client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=app_config["http_max_connections"],
+                        max_keepalive_connections=app_config["http_max_connections"],
+                        keepalive_expiry=app_config["http_keepalive_seconds"],
+                    ),
+                    timeout=httpx.Timeout(app_config["http_timeout"], connect=app_config["http_connect_timeout"]),
+                    follow_redirects=True,
+                )
+    return _client
+
+
+def close_client() -> None:
+    """Shutdown hook: close pooled connections (a new client is created on next use)."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+        _host_slots.clear()
+    if client is not None:
+        client.close()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _client_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(get_app_config()["http_max_per_host"])
+        return _host_slots[host]
+
+
+def request(method: str, url: str, *, timeout: float | None = None, **kwargs) -> httpx.Response:
+    """Send a request on the shared client.
+
+    ``timeout`` (seconds) overrides HTTP_TIMEOUT for reading the response; the
+    connect timeout is always HTTP_CONNECT_TIMEOUT. Other arguments are passed
+    to :meth:`httpx.Client.request` (``params``, ``json``, ``headers``, ...).
+    """
+    client = get_client()
+    if timeout is not None:
+        kwargs["timeout"] = httpx.Timeout(timeout, connect=get_app_config()["http_connect_timeout"])
+    with _host_slot(url):
+        return client.request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> httpx.Response:
+    return request("POST", url, **kwargs)
@@ -57,17 +57,22 @@ class RestaurantService:
             except Exception as e:
                 raise Exception(f"Error adding restaurant: {str(e)}") from e
 
-    async def lookup_info_async(self, restaurant_name: str) -> None:
-        """Async restaurant info lookup using threading to avoid event loop conflicts."""
-        import concurrent.futures
+    def apply_batch(self, operations: list[dict]) -> list[dict]:
+        """
+        Apply a batch of add/delete operations in one transaction.
+        Returns the per-item results from the database layer.
+        """
+        with start_action(action_type="apply_batch", count=len(operations)) as action:
+            results = self.db.apply_restaurant_batch(operations)
+            action.add_success_fields(failed=sum(1 for r in results if not r["ok"]))
+            return results
 
-        def run_lookup():
-            self.lookup_info_sync(restaurant_name)
+    async def lookup_info_async(self, restaurant_name: str) -> None:
+        """Async restaurant info lookup using threading to avoid event loop conflicts.
 
-        # Run the sync lookup in a thread pool
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            await asyncio.wrap_future(executor.submit(run_lookup))
+        Runs on the event loop's shared default executor rather than a pool per call.
+        """
+        await asyncio.to_thread(self.lookup_info_sync, restaurant_name)
 
     def lookup_info_sync(self, restaurant_name: str) -> None:
         """Sync restaurant info lookup."""
@@ -93,6 +98,32 @@ class RestaurantService:
             except Exception as e:
                 log_message(message_type="bg_lookup_error", error=str(e))
 
+    async def enrich_all(
+        self,
+        max_age_days: int | None = None,
+        limit: int | None = None,
+        concurrency: int | None = None,
+        rate: float | None = None,
+        batch_size: int | None = None,
+        on_progress=None,
+    ):
+        """
+        Look up info for every restaurant whose info is missing or stale (e.g. after an import).
+        Lookups run concurrently and rate limited; results are saved in batches.
+        Returns the final EnrichmentProgress.
+        """
+        from app.backend.enrich import enrich_restaurants
+
+        return await enrich_restaurants(
+            self.db,
+            concurrency=concurrency,
+            rate=rate,
+            batch_size=batch_size,
+            max_age_days=max_age_days,
+            limit=limit,
+            on_progress=on_progress,
+        )
+
     def _lookup_info_background(self, restaurant_name: str) -> None:
         """Legacy sync background lookup (e.g., for tests)."""
         from app.backend.agent import lookup_restaurant_info
@@ -157,6 +188,27 @@ class RestaurantService:
             except Exception as e:
                 raise Exception(f"Error selecting restaurant: {str(e)}") from e
 
+    def select_restaurants(self, count: int, category: str = "Normal") -> list[tuple[str, str]]:
+        """
+        Select ``count`` distinct restaurants (e.g. a week's schedule) in one call.
+        Uses the same round-robin session as select_restaurant and records all picks at once.
+        """
+        with start_action(action_type="roll_lunches", category=category, count=count) as action:
+            try:
+                if category not in self.session_rolled_restaurants:
+                    self.session_rolled_restaurants[category] = set()
+
+                restaurants = self.db.calculate_lunches(count, category, self.session_rolled_restaurants[category])
+                action.add_success_fields(selected=[name for name, _ in restaurants])
+                return restaurants
+            except ValueError as e:
+                if "No restaurants found" in str(e):
+                    raise ValueError(f"No {category.lower()} restaurants available. Add some restaurants first!") from None
+                else:
+                    raise
+            except Exception as e:
+                raise Exception(f"Error selecting restaurants: {str(e)}") from e
+
     def get_random_restaurant(self, category: str) -> tuple[str, str]:
         """Get a random restaurant with the specified category."""
         try:
@@ -0,0 +1,48 @@
+"""
+Startup timing report.
+
+Breaks time-to-first-request into phases (module imports, database init, first
+request) so slow launches of the dev server or the Tauri sidecar can be traced.
+Each phase is logged through eliot as it completes.
+"""
+
+import threading
+import time
+from eliot import log_message
+
+
+class StartupTimer:
+    """Record the duration of consecutive startup phases.
+
+    Each :meth:`mark` closes the phase that began at the previous mark (or at
+    ``started``). Phases are recorded once; later marks of the same name are ignored.
+    """
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self._lock = threading.Lock()
+        self.phases: dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        """End ``phase`` now and log its duration."""
+        with self._lock:
+            if phase in self.phases:
+                return
+            now = time.perf_counter()
+            self.phases[phase] = now - self._last
+            self._last = now
+            elapsed = now - self.started
+        log_message(
+            message_type="startup_phase",
+            phase=phase,
+            duration_ms=round(self.phases[phase] * 1000, 2),
+            elapsed_ms=round(elapsed * 1000, 2),
+        )
+
+    def report(self) -> dict:
+        """Phase durations and the running total, in milliseconds."""
+        with self._lock:
+            phases = {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+            total = round((self._last - self.started) * 1000, 2)
+        return {"phases": phases, "total_ms": total}
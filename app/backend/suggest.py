@@ -0,0 +1,214 @@
+"""
+In-memory name index for the Add form.
+
+Prefix autocomplete and near-duplicate detection over normalized restaurant
+names, so "Bubba's", "Bubbas" and "bubba's" are recognized as the same place.
+Adds and deletes made by this process are applied to the index in place as
+they commit; only changes it did not see (other processes, imports) cost a
+diff against the catalog snapshot in app.backend.db.
+"""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from app.backend import db
+from dataclasses import dataclass, field
+
+# Minimum Dice similarity of trigram sets to report a near-duplicate
+DUPLICATE_THRESHOLD = 0.7
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"[\s_]+")
+
+
+def normalize_name(name: str) -> str:
+    """Casefold, strip accents and punctuation, and collapse whitespace."""
+    if name.isascii():
+        text = name.casefold()
+    else:
+        text = unicodedata.normalize("NFKD", name)
+        text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return _SPACES.sub(" ", _NON_WORD.sub("", text)).strip()
+
+
+def name_key(name: str) -> str:
+    """Spacing-insensitive identity of a name: "Burger King" and "burgerking" share a key."""
+    return normalize_name(name).replace(" ", "")
+
+
+def trigrams(key: str) -> frozenset[str]:
+    """Padded character trigrams of a name key."""
+    padded = f"  {key} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass
+class Suggestions:
+    """Autocomplete matches and near-duplicate warnings for a typed name."""
+
+    matches: list[str] = field(default_factory=list)
+    # (existing name, similarity); 1.0 means the names normalize identically
+    duplicates: list[tuple[str, float]] = field(default_factory=list)
+
+
+class NameIndex:
+    """Prefix and trigram index over restaurant names.
+
+    Prefix lookups bisect a sorted list holding every word-suffix of each
+    normalized name ("burger king" and "king"), so a query matches the start of
+    any word. Near-duplicates come from an inverted trigram index; candidates
+    are drawn only from the query's rarest trigrams (any name similar enough
+    must contain one of them) and then scored exactly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stamp: tuple[int, int] | None = None
+        self._names: set[str] = set()
+        self._prefixes: list[tuple[str, str]] = []
+        self._postings: dict[str, set[str]] = {}
+        self._grams: dict[str, frozenset[str]] = {}
+        self._keys: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def sync(self, snapshot: db.CatalogSnapshot) -> None:
+        """Bring the index up to date with a catalog snapshot by diffing the names."""
+        with self._lock:
+            if snapshot.stamp is not None and snapshot.stamp == self.stamp:
+                return
+            current = {name for name, _ in snapshot.restaurants}
+            for name in self._names - current:
+                self._remove(name)
+            added = current - self._names
+            if len(added) > len(current) // 2:
+                # Mostly new (first build): sort once instead of inserting one by one
+                for name in added:
+                    self._prefixes.extend(self._index(name))
+                self._prefixes.sort()
+            else:
+                for name in added:
+                    for entry in self._index(name):
+                        bisect.insort(self._prefixes, entry)
+            self.stamp = snapshot.stamp
+
+    def apply_change(self, before: tuple[int, int], after: tuple[int, int], added: list[str], removed: list[str]) -> None:
+        """Apply a local catalog write in place (a :data:`db.CatalogListener`).
+
+        Ignored unless the index was current up to the write; the next lookup
+        then resyncs from the catalog instead.
+        """
+        with self._lock:
+            if self.stamp is None or self.stamp != before:
+                return
+            for name in removed:
+                if name in self._names:
+                    self._remove(name)
+            for name in added:
+                if name not in self._names:
+                    for entry in self._index(name):
+                        bisect.insort(self._prefixes, entry)
+            self.stamp = after
+
+    @staticmethod
+    def _prefix_entries(normalized: str, name: str) -> list[tuple[str, str]]:
+        words = normalized.split(" ")
+        return [(" ".join(words[i:]), name) for i in range(len(words)) if words[i]]
+
+    def _index(self, name: str) -> list[tuple[str, str]]:
+        """Add ``name`` to the trigram and key maps; return its prefix entries for the caller to place."""
+        normalized = normalize_name(name)
+        key = normalized.replace(" ", "")
+        grams = trigrams(key)
+        self._names.add(name)
+        self._grams[name] = grams
+        self._keys.setdefault(key, set()).add(name)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+        return self._prefix_entries(normalized, name)
+
+    def _remove(self, name: str) -> None:
+        for entry in self._prefix_entries(normalize_name(name), name):
+            i = bisect.bisect_left(self._prefixes, entry)
+            if i < len(self._prefixes) and self._prefixes[i] == entry:
+                del self._prefixes[i]
+        key = name_key(name)
+        self._keys[key].discard(name)
+        if not self._keys[key]:
+            del self._keys[key]
+        for gram in self._grams.pop(name):
+            self._postings[gram].discard(name)
+            if not self._postings[gram]:
+                del self._postings[gram]
+        self._names.discard(name)
+
+    def prefix(self, query: str, limit: int = 8) -> list[str]:
+        """Names with a word starting with ``query``, in alphabetical order of the matched text."""
+        text = normalize_name(query)
+        if not text:
+            return []
+        with self._lock:
+            matches: list[str] = []
+            seen = set()
+            i = bisect.bisect_left(self._prefixes, (text,))
+            while i < len(self._prefixes) and len(matches) < limit:
+                suffix, name = self._prefixes[i]
+                if not suffix.startswith(text):
+                    break
+                if name not in seen:
+                    seen.add(name)
+                    matches.append(name)
+                i += 1
+            return matches
+
+    def near_duplicates(self, name: str, threshold: float = DUPLICATE_THRESHOLD, limit: int = 5) -> list[tuple[str, float]]:
+        """Existing names similar to ``name``, most similar first."""
+        key = name_key(name)
+        if not key:
+            return []
+        grams = trigrams(key)
+        with self._lock:
+            exact = sorted(self._keys.get(key, ()))
+            # Dice >= threshold implies at least this many shared trigrams
+            needed = math.ceil(threshold * len(grams) / (2 - threshold))
+            rarest = sorted(grams, key=lambda g: len(self._postings.get(g, ())))[: len(grams) - needed + 1]
+            candidates = set().union(*(self._postings.get(gram, ()) for gram in rarest))
+
+            scored = []
+            for candidate in candidates:
+                if candidate in exact:
+                    continue
+                other = self._grams[candidate]
+                score = 2 * len(grams & other) / (len(grams) + len(other))
+                if score >= threshold:
+                    scored.append((candidate, round(score, 3)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return ([(match, 1.0) for match in exact] + scored)[:limit]
+
+    def suggest(self, query: str, limit: int = 8) -> Suggestions:
+        """Autocomplete matches and near-duplicates for a name being typed."""
+        return Suggestions(matches=self.prefix(query, limit), duplicates=self.near_duplicates(query))
+
+
+names = NameIndex()
+db.catalog.subscribe(names.apply_change)
+
+
+def get_name_index() -> NameIndex:
+    """Get the name index, synced with the current catalog."""
+    if names.stamp != db.catalog.stamp(db.db_path):
+        names.sync(db.get_catalog())
+    return names
+
+
+def suggest_names(query: str, limit: int = 8) -> Suggestions:
+    """Suggestions for the Add form's name input."""
+    return get_name_index().suggest(query, limit)
+
+
+def find_near_duplicates(name: str) -> list[tuple[str, float]]:
+    """Existing restaurants that ``name`` is likely a variant of."""
+    return get_name_index().near_duplicates(name)
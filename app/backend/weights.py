@@ -0,0 +1,345 @@
+"""
+Weighted restaurant selection.
+
+Rolls in "weighted" selection mode draw from a Walker alias table per category,
+so a draw costs O(1) however large the catalog is. Each restaurant's weight is
+the product of the weight functions named in SELECTION_WEIGHTS, computed from
+its rating and its visits in the history window.
+
+History changes with every roll, so weights that read it and declare an upper
+bound (recency, novelty) stay out of the tables: a drawn restaurant is accepted
+with probability weight / bound, computed from visit counts that are updated
+from the history rows added since the last draw. Tables are rebuilt lazily,
+only when the catalog, ratings or configuration change, and only for
+categories whose weights actually changed.
+"""
+
+import math
+import random
+import sqlite3
+import threading
+from app.backend import db
+from app.config import ConfigurationError, get_app_config
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime
+
+# Rating assumed for restaurants nobody has rated (ratings run 0-5)
+DEFAULT_RATING = 3.0
+
+# Draws rejected for hitting an excluded restaurant before falling back to a filtered table
+MAX_REJECTIONS = 32
+
+
+@dataclass(frozen=True)
+class RestaurantStats:
+    """Inputs to the weight functions for one restaurant."""
+
+    name: str
+    option: str
+    rating: float | None
+    visits: int
+    days_since_visit: int | None
+
+
+WeightFunction = Callable[[RestaurantStats, dict], float]
+
+WEIGHT_FUNCTIONS: dict[str, WeightFunction] = {}
+# Weights that read history -> upper bound of their value (None: unbounded)
+WEIGHT_BOUNDS: dict[str, float | None] = {}
+
+
+def register_weight(name: str, history: bool = False, bound: float | None = None) -> Callable[[WeightFunction], WeightFunction]:
+    """Register a weight function under ``name`` for use in SELECTION_WEIGHTS.
+
+    Functions reading ``visits`` or ``days_since_visit`` pass ``history=True``
+    and, if they have one, a ``bound`` on their value. Bounded history weights
+    are applied by rejection at draw time; the rest are baked into the alias
+    tables, which then have to be rebuilt whenever history changes.
+    """
+
+    def decorator(func: WeightFunction) -> WeightFunction:
+        WEIGHT_FUNCTIONS[name] = func
+        if history:
+            WEIGHT_BOUNDS[name] = bound
+        return func
+
+    return decorator
+
+
+@register_weight("uniform")
+def uniform_weight(stats: RestaurantStats, app_config: dict) -> float:
+    return 1.0
+
+
+@register_weight("rating")
+def rating_weight(stats: RestaurantStats, app_config: dict) -> float:
+    """Proportional to the rating; unrated restaurants count as :data:`DEFAULT_RATING`."""
+    return DEFAULT_RATING if stats.rating is None else max(stats.rating, 0.0)
+
+
+@register_weight("recency", history=True, bound=1.0)
+def recency_weight(stats: RestaurantStats, app_config: dict) -> float:
+    """Penalize recent visits; the penalty halves every RECENCY_HALF_LIFE_DAYS days."""
+    if stats.days_since_visit is None:
+        return 1.0
+    return 1.0 - 0.5 ** ((stats.days_since_visit + 1) / app_config["recency_half_life_days"])
+
+
+@register_weight("frequency", history=True)
+def frequency_weight(stats: RestaurantStats, app_config: dict) -> float:
+    """Favor regulars: proportional to visits in the history window (plus one)."""
+    return 1.0 + stats.visits
+
+
+@register_weight("novelty", history=True, bound=1.0)
+def novelty_weight(stats: RestaurantStats, app_config: dict) -> float:
+    """Favor variety: inversely proportional to visits in the history window (plus one)."""
+    return 1.0 / (1.0 + stats.visits)
+
+
+def get_weight_functions(names: Sequence[str]) -> list[WeightFunction]:
+    """Resolve configured weight names, raising ConfigurationError for unknown ones."""
+    unknown = [name for name in names if name not in WEIGHT_FUNCTIONS]
+    if unknown:
+        raise ConfigurationError(
+            f"Invalid SELECTION_WEIGHTS '{', '.join(unknown)}'. Valid options: {', '.join(WEIGHT_FUNCTIONS)}"
+        )
+    return [WEIGHT_FUNCTIONS[name] for name in names]
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        n = len(items)
+        total = math.fsum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+        self.items = tuple(items)
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1 up to rounding error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def draw(self, rng: random.Random | None = None):
+        """Draw one item with probability proportional to its weight."""
+        rng = rng or random
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+def _days_since(last_visit: str | None, today: date) -> int | None:
+    if not last_visit:
+        return None
+    try:
+        return max((today - datetime.fromisoformat(last_visit).date()).days, 0)
+    except ValueError:
+        return None
+
+
+def load_stats(conn: sqlite3.Connection, today: date | None = None) -> dict[str, list[RestaurantStats]]:
+    """Per-category restaurant stats in one pass over lunch_list and the history window."""
+    today = today or date.today()
+    rows = conn.execute(
+        '''
+        SELECT l.category, l.restaurants, l.option, r.rating, count(h.id), max(h.date)
+        FROM lunch_list l
+        LEFT JOIN restaurant_rating r ON r.restaurant_id = l.id
+        LEFT JOIN recent_lunch h ON h.restaurants = l.restaurants
+        GROUP BY l.id
+        ORDER BY l.category, l.restaurants
+        '''
+    ).fetchall()
+    stats: dict[str, list[RestaurantStats]] = {}
+    for category, name, option, rating, visits, last_visit in rows:
+        stats.setdefault(category, []).append(RestaurantStats(name, option, rating, visits, _days_since(last_visit, today)))
+    return stats
+
+
+class HistoryStats:
+    """Visits and last visit per restaurant, kept current from the history rows added since the last refresh.
+
+    recent_lunch ids only grow, so new rows are those past the last ``max(id)``.
+    If the row count shows that rows were also deleted (retention, resets), the
+    aggregates are reloaded from history, which is bounded by retention.
+    """
+
+    def __init__(self):
+        self.visits: dict[str, int] = {}
+        self.last_visit: dict[str, str] = {}
+        self._max_id: int | None = None
+        self._count = 0
+
+    def refresh(self, conn: sqlite3.Connection) -> tuple[int | None, int]:
+        """Bring the aggregates up to date; returns the (max id, row count) they reflect."""
+        max_id, count = conn.execute("SELECT max(id), count(*) FROM recent_lunch").fetchone()
+        if (max_id, count) == (self._max_id, self._count):
+            return max_id, count
+        added = []
+        if self._max_id is not None and max_id is not None and max_id > self._max_id:
+            added = conn.execute(
+                "SELECT restaurants, date FROM recent_lunch WHERE id > ? ORDER BY id", (self._max_id,)
+            ).fetchall()
+        if self._max_id is not None and self._count + len(added) == count:
+            for name, visit in added:
+                self.visits[name] = self.visits.get(name, 0) + 1
+                if visit > self.last_visit.get(name, ""):
+                    self.last_visit[name] = visit
+        else:
+            self.visits.clear()
+            self.last_visit.clear()
+            for name, visits, last_visit in conn.execute(
+                "SELECT restaurants, count(*), max(date) FROM recent_lunch GROUP BY restaurants"
+            ):
+                self.visits[name] = visits
+                self.last_visit[name] = last_visit
+        self._max_id, self._count = max_id, count
+        return max_id, count
+
+    def stats(self, name: str, option: str, rating: float | None, today: date) -> RestaurantStats:
+        return RestaurantStats(name, option, rating, self.visits.get(name, 0), _days_since(self.last_visit.get(name), today))
+
+
+class WeightedSelector:
+    """Alias tables per category over the weights that do not change with every roll.
+
+    Bounded history weights (see :func:`register_weight`) are applied per draw
+    by rejection, so rolls only update :class:`HistoryStats`. Tables are rebuilt
+    when the catalog, ratings or config change (or, with an unbounded history
+    weight such as frequency, the history or the day), and only for categories
+    whose weight vector differs from the one the table was built from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._history = HistoryStats()
+        self._epoch: int | None = None
+        self._weights: dict[str, tuple[tuple[str, ...], tuple[float, ...]]] = {}
+        self._tables: dict[str, AliasTable | None] = {}
+        self._options: dict[str, dict[str, str]] = {}
+        self._ratings: dict[str, dict[str, float | None]] = {}
+        # Weights applied per draw, and the product of their bounds
+        self._per_draw: list[WeightFunction] = []
+        self._bound = 1.0
+        self._app_config: dict = {}
+        self.rebuilds = 0
+
+    def refresh(self, conn: sqlite3.Connection) -> None:
+        """Bring the tables and history stats up to date with the data visible on ``conn``."""
+        app_config = get_app_config()
+        weight_names = app_config["selection_weights"]
+        functions = get_weight_functions(weight_names)
+        per_draw = [name for name in weight_names if WEIGHT_BOUNDS.get(name) is not None]
+        baked = [f for name, f in zip(weight_names, functions, strict=True) if name not in per_draw]
+        baked_history = any(name in WEIGHT_BOUNDS and name not in per_draw for name in weight_names)
+        with self._lock:
+            snapshot = db.get_catalog()
+            if snapshot.stamp is None or self._epoch != snapshot.stamp[0]:
+                # Another database (or a replaced file): its history ids mean nothing to the old stats
+                self._history = HistoryStats()
+                self._epoch = snapshot.stamp and snapshot.stamp[0]
+            history = self._history.refresh(conn)
+            signature = (
+                snapshot.version,
+                db.rating_generation(conn),
+                weight_names,
+                app_config["recency_half_life_days"],
+                (history, date.today()) if baked_history else None,
+            )
+            self._per_draw = [WEIGHT_FUNCTIONS[name] for name in per_draw]
+            self._bound = math.prod(WEIGHT_BOUNDS[name] for name in per_draw)
+            self._app_config = app_config
+            if signature == self._signature:
+                return
+            stats = load_stats(conn)
+            for category in set(self._weights) - set(stats):
+                del self._weights[category], self._tables[category], self._options[category], self._ratings[category]
+            for category, rows in stats.items():
+                names = tuple(row.name for row in rows)
+                weights = tuple(math.prod(f(row, app_config) for f in baked) for row in rows)
+                self._ratings[category] = {row.name: row.rating for row in rows}
+                if self._weights.get(category) == (names, weights):
+                    continue
+                self._weights[category] = (names, weights)
+                self._options[category] = {row.name: row.option for row in rows}
+                self._tables[category] = AliasTable(names, weights) if math.fsum(weights) > 0 else None
+                self.rebuilds += 1
+            self._signature = signature
+
+    def _per_draw_weight(self, category: str, name: str, today: date) -> float:
+        stats = self._history.stats(name, self._options[category][name], self._ratings[category][name], today)
+        return math.prod(f(stats, self._app_config) for f in self._per_draw)
+
+    def draw(
+        self, conn: sqlite3.Connection, option: str, exclude: Sequence[str] = (), rng: random.Random | None = None
+    ) -> tuple[str, str] | None:
+        """Weighted pick of a restaurant in ``option``, avoiding names in ``exclude`` when possible.
+
+        A table draw is accepted with probability (per-draw weight / bound);
+        excluded names are rejected too. After :data:`MAX_REJECTIONS` misses a
+        one-off table with the full weights of the allowed names is used. If
+        every restaurant is excluded (or has zero weight) the exclusion, then
+        the weights, are dropped.
+        """
+        self.refresh(conn)
+        category = db.category_key(option)
+        rng = rng or random
+        excluded = set(exclude)
+        today = date.today()
+        with self._lock:
+            if category not in self._weights:
+                return None
+            names, weights = self._weights[category]
+            table = self._tables[category]
+            options = self._options[category]
+
+            if table is not None:
+                for _ in range(MAX_REJECTIONS):
+                    name = table.draw(rng)
+                    if name in excluded:
+                        continue
+                    if not self._per_draw or rng.random() * self._bound < self._per_draw_weight(category, name, today):
+                        return name, options[name]
+                allowed = [
+                    (n, w * self._per_draw_weight(category, n, today))
+                    for n, w in zip(names, weights, strict=True)
+                    if n not in excluded and w > 0
+                ]
+                allowed = [(n, w) for n, w in allowed if w > 0]
+                if allowed:
+                    name = AliasTable(*zip(*allowed, strict=True)).draw(rng)
+                    return name, options[name]
+        # Nothing positive outside the exclusion: fall back to uniform
+        candidates = [n for n in names if n not in excluded] or list(names)
+        name = rng.choice(candidates)
+        return name, options[name]
+
+    def clear(self) -> None:
+        """Drop all tables (e.g. when switching databases)."""
+        with self._lock:
+            self._signature = None
+            self._history = HistoryStats()
+            self._epoch = None
+            self._weights.clear()
+            self._tables.clear()
+            self._options.clear()
+            self._ratings.clear()
+
+
+selector = WeightedSelector()
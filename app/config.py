@@ -14,9 +14,32 @@ Environment Variables:
     OLLAMA_HOST: Ollama server URL (default: "http://localhost:11434")
     OPENROUTER_API_KEY: API key for OpenRouter (required if using openrouter)
     OPENROUTER_BASE_URL: Custom OpenRouter base URL (optional)
+
+    SQLITE_PROFILE: Storage profile ("balanced", "durable" or "fast", default: "balanced")
+    SQLITE_JOURNAL_MODE: Override the profile's journal_mode (e.g. "wal")
+    SQLITE_SYNCHRONOUS: Override the profile's synchronous level ("off", "normal", "full", "extra")
+    SQLITE_MMAP_SIZE: Override the profile's mmap_size in bytes
+    SQLITE_CACHE_SIZE: Override the profile's cache_size (negative = KiB, positive = pages)
+    SQLITE_TEMP_STORE: Override the profile's temp_store ("default", "file", "memory")
+    SQLITE_BUSY_TIMEOUT: Override the profile's busy_timeout in milliseconds
+
+    SELECTION_MODE: How rolls pick a restaurant ("rotation", "weighted" or "recency", default: "rotation")
+    SELECTION_WEIGHTS: Comma-separated weight functions for weighted mode (default: "rating,recency")
+    RECENCY_HALF_LIFE_DAYS: Days for a recent visit's penalty to halve in the "recency" weight (default: 7)
+    RECENCY_WINDOW: Most recent picks penalized in "recency" mode (default: 14)
+    RECENCY_EXCLUDE: Most recent picks never repeated in "recency" mode (default: 1)
+    HTTP_TIMEOUT: Seconds to wait for an outbound HTTP response (default: 30)
+    HTTP_CONNECT_TIMEOUT: Seconds to wait for an outbound connection (default: 5)
+    HTTP_MAX_CONNECTIONS: Pooled keep-alive connections for outbound HTTP (default: 20)
+    HTTP_MAX_PER_HOST: Concurrent outbound requests per host (default: 8)
+    HTTP_KEEPALIVE_SECONDS: Seconds an idle pooled connection is kept open (default: 60)
+    ENRICH_CONCURRENCY: Concurrent lookups during bulk enrichment (default: 4)
+    ENRICH_RATE: Bulk enrichment lookups per second, 0 for no limit (default: 2)
+    ENRICH_BATCH_SIZE: Lookup results saved per transaction during bulk enrichment (default: 25)
+    SELECTION_SEED: Integer seed making the sequence of rolls reproducible, e.g. for benchmarks (default: unset)
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from decouple import config
 from typing import Literal
 
@@ -36,7 +59,7 @@ DEFAULT_TIMEOUT: int = 30
 
 
 class ConfigurationError(Exception):
-    """Raised when LLM configuration is invalid."""
+    """Raised when LLM, storage or selection configuration is invalid."""
 
     pass
 
@@ -144,9 +167,133 @@ def get_app_config() -> dict:
     Get application configuration.
 
     Returns:
-        dict: Application configuration including zip_code, cache_ttl_days
+        dict: Application configuration including zip_code, cache_ttl_days,
+            history_max_entries and history_days (0 disables a retention limit),
+            db_executor_workers (threads serving the async database layer), and
+            the roll selection_mode, selection_weights, recency_half_life_days,
+            recency_window, recency_exclude and selection_seed (None unless
+            SELECTION_SEED is set), the outbound http_* client settings, and the
+            bulk enrich_concurrency, enrich_rate and enrich_batch_size
     """
+    seed = config("SELECTION_SEED", default="").strip()
+    try:
+        selection_seed = int(seed) if seed else None
+    except ValueError:
+        raise ConfigurationError(f"Invalid SELECTION_SEED '{seed}'. Must be an integer") from None
     return {
         "zip_code": config("RESTAURANT_ZIP_CODE", default="73107"),
         "cache_ttl_days": config("CACHE_TTL_DAYS", default=7, cast=int),
+        "history_max_entries": config("HISTORY_MAX_ENTRIES", default=14, cast=int),
+        "history_days": config("HISTORY_DAYS", default=14, cast=int),
+        "db_executor_workers": config("DB_EXECUTOR_WORKERS", default=4, cast=int),
+        "selection_mode": config("SELECTION_MODE", default="rotation").strip().lower(),
+        "selection_weights": tuple(
+            name.strip().lower() for name in config("SELECTION_WEIGHTS", default="rating,recency").split(",") if name.strip()
+        ),
+        "recency_half_life_days": config("RECENCY_HALF_LIFE_DAYS", default=7.0, cast=float),
+        "recency_window": config("RECENCY_WINDOW", default=14, cast=int),
+        "recency_exclude": config("RECENCY_EXCLUDE", default=1, cast=int),
+        "selection_seed": selection_seed,
+        "http_timeout": config("HTTP_TIMEOUT", default=30.0, cast=float),
+        "http_connect_timeout": config("HTTP_CONNECT_TIMEOUT", default=5.0, cast=float),
+        "http_max_connections": config("HTTP_MAX_CONNECTIONS", default=20, cast=int),
+        "http_max_per_host": config("HTTP_MAX_PER_HOST", default=8, cast=int),
+        "http_keepalive_seconds": config("HTTP_KEEPALIVE_SECONDS", default=60.0, cast=float),
+        "enrich_concurrency": config("ENRICH_CONCURRENCY", default=4, cast=int),
+        "enrich_rate": config("ENRICH_RATE", default=2.0, cast=float),
+        "enrich_batch_size": config("ENRICH_BATCH_SIZE", default=25, cast=int),
     }
+
+
+@dataclass(frozen=True)
+class StorageConfig:
+    """SQLite pragmas applied to every connection when it is opened."""
+
+    profile: str
+    journal_mode: str
+    synchronous: str
+    mmap_size: int
+    cache_size: int
+    temp_store: str
+    busy_timeout: int
+
+
+# Storage module-level constants
+STORAGE_PROFILES: dict[str, StorageConfig] = {
+    # WAL readers never block on the writer; NORMAL sync is durable across app crashes
+    "balanced": StorageConfig(
+        profile="balanced",
+        journal_mode="wal",
+        synchronous="normal",
+        mmap_size=64 * 1024 * 1024,
+        cache_size=-16000,
+        temp_store="memory",
+        busy_timeout=5000,
+    ),
+    # fsync on every commit, no memory mapping
+    "durable": StorageConfig(
+        profile="durable",
+        journal_mode="wal",
+        synchronous="full",
+        mmap_size=0,
+        cache_size=-8000,
+        temp_store="default",
+        busy_timeout=10000,
+    ),
+    # No fsync; for throwaway databases, benchmarks and bulk loads
+    "fast": StorageConfig(
+        profile="fast",
+        journal_mode="wal",
+        synchronous="off",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64000,
+        temp_store="memory",
+        busy_timeout=5000,
+    ),
+}
+DEFAULT_STORAGE_PROFILE: str = "balanced"
+VALID_SYNCHRONOUS: tuple[str, ...] = ("off", "normal", "full", "extra")
+VALID_TEMP_STORE: tuple[str, ...] = ("default", "file", "memory")
+VALID_JOURNAL_MODES: tuple[str, ...] = ("delete", "truncate", "persist", "memory", "wal", "off")
+
+
+def get_storage_config() -> StorageConfig:
+    """
+    Load the SQLite storage profile from environment variables.
+
+    SQLITE_PROFILE selects a named profile; individual SQLITE_* variables
+    override single pragmas of that profile.
+
+    Returns:
+        StorageConfig: Pragmas to apply on connection open.
+
+    Raises:
+        ConfigurationError: When the profile name or an override is invalid.
+    """
+    name = config("SQLITE_PROFILE", default=DEFAULT_STORAGE_PROFILE).lower()
+    if name not in STORAGE_PROFILES:
+        raise ConfigurationError(f"Invalid SQLITE_PROFILE '{name}'. Valid options: {', '.join(STORAGE_PROFILES)}")
+    base = STORAGE_PROFILES[name]
+
+    cfg = replace(
+        base,
+        journal_mode=config("SQLITE_JOURNAL_MODE", default=base.journal_mode).lower(),
+        synchronous=config("SQLITE_SYNCHRONOUS", default=base.synchronous).lower(),
+        mmap_size=config("SQLITE_MMAP_SIZE", default=base.mmap_size, cast=int),
+        cache_size=config("SQLITE_CACHE_SIZE", default=base.cache_size, cast=int),
+        temp_store=config("SQLITE_TEMP_STORE", default=base.temp_store).lower(),
+        busy_timeout=config("SQLITE_BUSY_TIMEOUT", default=base.busy_timeout, cast=int),
+    )
+
+    if cfg.journal_mode not in VALID_JOURNAL_MODES:
+        raise ConfigurationError(f"Invalid SQLITE_JOURNAL_MODE '{cfg.journal_mode}'")
+    if cfg.synchronous not in VALID_SYNCHRONOUS:
+        raise ConfigurationError(f"Invalid SQLITE_SYNCHRONOUS '{cfg.synchronous}'")
+    if cfg.temp_store not in VALID_TEMP_STORE:
+        raise ConfigurationError(f"Invalid SQLITE_TEMP_STORE '{cfg.temp_store}'")
+    if cfg.mmap_size < 0:
+        raise ConfigurationError(f"SQLITE_MMAP_SIZE must be >= 0, got {cfg.mmap_size}")
+    if cfg.busy_timeout < 0:
+        raise ConfigurationError(f"SQLITE_BUSY_TIMEOUT must be >= 0, got {cfg.busy_timeout}")
+
+    return cfg
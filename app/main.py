@@ -4,9 +4,13 @@
 
 import contextlib
 import os
+import secrets
 import sys
+import time
 from pathlib import Path
 
+_import_started = time.perf_counter()
+
 
 def get_base_path() -> Path:
     """Get the base path for the application.
@@ -30,17 +34,19 @@ if not is_frozen():
     project_root = Path(__file__).parent.parent
     sys.path.insert(0, str(project_root))
 
-from app.backend.db import (
-    add_restaurant_to_db,
-    calculate_lunch,
-    create_db_and_tables,
-    delete_restaurant_from_db,
-    get_all_restaurants,
-)
+from app.backend import async_db, groups
+from app.backend.async_db import shutdown_executor
+from app.backend.db import EXPORT_FORMATS, SNIPPET_END, SNIPPET_START, close_db, export_table, get_rng, init_db
+from app.backend.http_client import close_client
+from app.backend.startup import StartupTimer
+from app.backend.suggest import find_near_duplicates, suggest_names
 from decouple import config
 from fasthtml.common import *
 from urllib.parse import quote
 
+startup_timer = StartupTimer(_import_started)
+startup_timer.mark("import")
+
 PORT = config('PORT', default=8080, cast=int)
 RELOAD = config('RELOAD', default=True, cast=bool) and not is_frozen()
 
@@ -59,11 +65,27 @@ hdrs = (
 # Static directory: use _MEIPASS when frozen, otherwise relative to source
 static_dir = get_base_path() / "app" / "static"
 
+
+def startup_db():
+    """Startup hook: initialize the database, timing server boot and db init separately."""
+    startup_timer.mark("server_start")
+    init_db()
+    startup_timer.mark("db_init")
+
+
+def mark_first_request(req):
+    """Beforeware: record when the first request arrives."""
+    startup_timer.mark("first_request")
+
+
 application, rt = fast_app(
     static_path=str(static_dir),
     hdrs=hdrs,
     pico=False,
     secret_key='lunch-app-secret',
+    before=Beforeware(mark_first_request),
+    on_startup=[startup_db],
+    on_shutdown=[shutdown_executor, close_client, close_db],
 )
 
 
@@ -206,6 +228,14 @@ def home_view(result=None):
             cls="btn",
             style="display: block; margin: 0 auto;",
         ),
+        Button(
+            "Roll Week",
+            hx_post="/roll/week",
+            hx_include="[name='option']",
+            hx_target="#result",
+            cls="btn btn-secondary",
+            style="display: block; margin: 0.5rem auto 0;",
+        ),
         Div(result or "", id="result", cls="text-center text-xl font-semibold"),
         cls="text-center home-content",
     )
@@ -220,8 +250,14 @@ def add_view(message=None):
                 placeholder="",
                 required=True,
                 autofocus=True,
+                autocomplete="off",
                 cls="form-input",
+                hx_get="/add/suggest",
+                hx_trigger="input changed delay:150ms",
+                hx_target="#add-suggestions",
+                hx_swap="outerHTML",
             ),
+            name_suggestions(None),
             Div(
                 Label(
                     Input(type="radio", name="option", value="cheap", id="add-cheap"),
@@ -247,8 +283,26 @@ def add_view(message=None):
     )
 
 
-def list_view():
-    restaurants = get_all_restaurants()
+def name_suggestions(suggestions):
+    """Autocomplete matches and near-duplicate warnings under the Add form's name input."""
+    if suggestions is None or not (suggestions.matches or suggestions.duplicates):
+        return Div(id="add-suggestions")
+    warning = None
+    if suggestions.duplicates:
+        warning = P(
+            I(cls="fas fa-triangle-exclamation"),
+            " Similar to: ",
+            ", ".join(name for name, _ in suggestions.duplicates),
+            cls="text-sm text-destructive",
+        )
+    return Div(
+        warning,
+        Ul(*[Li(name) for name in suggestions.matches], cls="text-sm text-muted") if suggestions.matches else None,
+        id="add-suggestions",
+    )
+
+
+def list_view(restaurants):
     return Div(
         H1("All Restaurants", cls="text-2xl font-bold text-center mb-6"),
         Div(
@@ -259,7 +313,55 @@ def list_view():
     )
 
 
-def restaurant_card(name, option):
+def search_box():
+    return Div(
+        Input(
+            type="search",
+            name="q",
+            placeholder="Search restaurants, hours, descriptions...",
+            cls="input w-full",
+            hx_get="/search",
+            hx_trigger="input changed delay:200ms, search",
+            hx_target="#search-results",
+            hx_swap="outerHTML",
+        ),
+        search_results([]),
+        cls="mb-4",
+    )
+
+
+def search_results(results, query=""):
+    if not results:
+        message = P(f"No matches for \u201c{query}\u201d", cls="text-center text-muted") if query else None
+        return Div(message, id="search-results")
+    return Div(
+        *[search_result_card(result) for result in results],
+        cls="card",
+        id="search-results",
+    )
+
+
+def highlight(snippet):
+    """Render an FTS snippet with matched terms wrapped in Mark (text stays escaped)."""
+    parts = []
+    for i, chunk in enumerate(snippet.split(SNIPPET_START)):
+        if i == 0:
+            parts.append(chunk)
+            continue
+        matched, _, rest = chunk.partition(SNIPPET_END)
+        parts.extend([Mark(matched), rest])
+    return [part for part in parts if part != ""]
+
+
+def search_result_card(result):
+    snippet = result["snippet"] or ""
+    # Skip the snippet when it only repeats the matched name
+    if snippet.replace(SNIPPET_START, "").replace(SNIPPET_END, "") == result["name"]:
+        snippet = ""
+    return restaurant_card(result["name"], result["option"], detail=highlight(snippet) if snippet else None)
+
+
+def restaurant_card(name, option, detail=None):
     price = "$" if option.lower() == "cheap" else "$$"
     return Div(
         Span(name, cls="flex-1"),
@@ -272,6 +374,7 @@ def restaurant_card(name, option):
             hx_target="#restaurant-list",
             hx_swap="outerHTML",
         ),
+        P(*detail, cls="search-snippet text-sm text-muted") if detail else None,
         cls="restaurant-card",
     )
 
@@ -329,9 +432,36 @@ def get_add():
     return Layout(add_view(), active_tab="add")
 
 
+@rt('/add/suggest')
+async def get_add_suggest(name: str = ""):
+    """Existing names matching what is typed in the Add form, plus near-duplicate warnings."""
+    return name_suggestions(await async_db.run_db(suggest_names, name))
+
+
 @rt('/list')
-def get_list():
-    return Layout(list_view(), active_tab="list")
+async def get_list():
+    return Layout(Div(search_box(), list_view(await async_db.get_all_restaurants())), active_tab="list")
+
+
+@rt('/search')
+async def get_search(q: str = ""):
+    """Ranked full-text search results as an HTMX fragment."""
+    return search_results(await async_db.search_restaurants(q), q.strip())
+
+
+@rt('/export')
+def get_export(table: str = "lunch_list", fmt: str = "csv"):
+    """Stream a table download (CSV, NDJSON or msgpack) without buffering it."""
+    try:
+        chunks = export_table(table, fmt)
+    except ValueError as e:
+        return Response(str(e), status_code=400)
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'},
+    )
 
 
 @rt('/settings')
@@ -339,10 +469,25 @@ def get_settings():
     return Layout(settings_view(), active_tab="settings")
 
 
+def rotation_key(session) -> str:
+    """Per-browser rotation id, kept in the signed session cookie."""
+    if "rotation_key" not in session:
+        session["rotation_key"] = secrets.token_hex(16)
+    return session["rotation_key"]
+
+
 @rt('/roll')
-def post_roll(option: str):
+async def post_roll(option: str, session, seed: int | None = None):
+    """Roll one lunch; an explicit ``seed`` replays the same draw.
+
+    Afterwards the rotation's next pick is prefetched in the background, so
+    the following roll only has to commit it.
+    """
+    key = rotation_key(session)
     try:
-        restaurant = calculate_lunch(option)
+        restaurant = await async_db.calculate_lunch(option, rotation_key=key, rng=get_rng(seed))
+        if seed is None:
+            async_db.schedule_prefetch(key, option)
         if restaurant:
             # calculate_lunch returns (name, option) tuple
             return Span(restaurant[0], cls="text-xl font-semibold")
@@ -351,10 +496,29 @@ def post_roll(option: str):
     return Span("No restaurants found!", cls="text-destructive")
 
 
+@rt('/roll/week')
+async def post_roll_week(option: str, session, days: int = 5, seed: int | None = None):
+    """Roll a schedule of ``days`` distinct lunches at once."""
+    try:
+        restaurants = await async_db.calculate_lunches(days, option, rotation_key=rotation_key(session), rng=get_rng(seed))
+    except ValueError as e:
+        if "No restaurants found" in str(e):
+            return Span("No restaurants found!", cls="text-destructive")
+        return Span(str(e), cls="text-destructive")
+    return Ol(
+        *[Li(Span(f"Day {day}: ", cls="text-muted"), name) for day, (name, _) in enumerate(restaurants, 1)],
+        cls="schedule-list",
+    )
+
+
 @rt('/add', methods=['POST'])
-def post_add(name: str, option: str):
+async def post_add(name: str, option: str):
+    duplicates = await async_db.run_db(find_near_duplicates, name)
+    same = [existing for existing, score in duplicates if score == 1.0 and existing != name]
+    if same:
+        return Span(f"Restaurant '{name}' already exists as '{same[0]}'!", cls="text-destructive")
     try:
-        add_restaurant_to_db(name, option)
+        await async_db.add_restaurant_to_db(name, option)
         return Span(
             f"Added restaurant: {name} ({option.title()})",
             id="add-success-msg",
@@ -365,10 +529,60 @@ def post_add(name: str, option: str):
         return Span(f"Restaurant '{name}' already exists!", cls="text-destructive")
 
 @rt('/delete')
-def post_delete(name: str):
+async def post_delete(name: str):
     with contextlib.suppress(ValueError):
-        delete_restaurant_from_db(name)
-    return list_view()
+        await async_db.delete_restaurant_from_db(name)
+    return list_view(await async_db.get_all_restaurants())
+
+
+@rt('/api/restaurants/batch', methods=['POST'])
+async def post_batch(req):
+    """Apply many add/delete operations in one transaction.
+
+    Body: {"operations": [{"op": "add", "name": ..., "option": ...}, {"op": "delete", "name": ...}]}
+    Returns a per-item result list in the same order.
+    """
+    try:
+        payload = await req.json()
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    operations = payload.get("operations") if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return JSONResponse({"error": "Expected an 'operations' list"}, status_code=400)
+    results = await async_db.apply_restaurant_batch(operations)
+    return JSONResponse({"results": results})
+
+
+@rt('/api/groups/{room}/members', methods=['POST'])
+async def post_group_member(room: str, req):
+    """Set one member's vetoes and likes, creating the group room if needed.
+
+    Body: {"member": ..., "vetoes": [restaurant names], "likes": [restaurant names]}
+    """
+    try:
+        payload = await req.json()
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    if not isinstance(payload, dict) or not isinstance(payload.get("member"), str):
+        return JSONResponse({"error": "Expected a 'member' name"}, status_code=400)
+    vetoes, likes = payload.get("vetoes", []), payload.get("likes", [])
+    if not isinstance(vetoes, list) or not isinstance(likes, list):
+        return JSONResponse({"error": "Expected 'vetoes' and 'likes' lists"}, status_code=400)
+    try:
+        await async_db.run_db(groups.set_member, room, payload["member"], vetoes, likes)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse({"room": room, "member": payload["member"]})
+
+
+@rt('/api/groups/{room}/roll', methods=['POST'])
+async def post_group_roll(room: str, option: str = "Normal", seed: int | None = None):
+    """Roll one restaurant nobody in the room has vetoed."""
+    try:
+        name, restaurant_option = await async_db.run_db(groups.roll_group, room, option, get_rng(seed))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+    return JSONResponse({"name": name, "option": restaurant_option})
 
 
 @rt('/shutdown', methods=['POST'])
@@ -380,6 +594,12 @@ def post_shutdown():
     os._exit(0)
 
 
+@rt('/api/startup', methods=['GET'])
+def get_startup():
+    """Startup timing report: milliseconds spent in each phase up to the first request."""
+    return JSONResponse(startup_timer.report())
+
+
 @rt('/api/theme', methods=['GET'])
 def get_theme():
     """Return current theme for Tauri window sync."""
@@ -395,8 +615,6 @@ def set_theme(theme: str):
     return current_theme
 
 
-create_db_and_tables()
-
 # * serve() is only called when this module runs as __main__ (direct execution)
 # * When uvicorn imports app.main:application for reload, it skips this
 if __name__ == '__main__':
@@ -6,6 +6,15 @@ from pathlib import Path
 from unittest.mock import Mock
 
 
+@pytest.fixture(autouse=True)
+def close_pooled_connections():
+    """Close pooled SQLite connections and caches after each test so temp databases are released."""
+    yield
+    from app.backend.db import close_db
+
+    close_db()
+
+
 @pytest.fixture
 def temp_db():
     """Create a temporary database for testing."""
@@ -15,9 +24,13 @@ def temp_db():
 
     yield temp_path
 
-    # Cleanup
-    if temp_path.exists():
-        temp_path.unlink()
+    # Cleanup (including WAL sidecar files)
+    from app.backend.db import close_db
+
+    close_db()
+    for path in (temp_path, temp_path.with_name(temp_path.name + "-wal"), temp_path.with_name(temp_path.name + "-shm")):
+        if path.exists():
+            path.unlink()
 
 
 @pytest.fixture
@@ -154,10 +154,69 @@ class TestRestaurantSearchAgent:
         assert result.address == "456 Oak Ave"
 
 
+class TestAgentRegistry:
+    """Tests for the shared agent registry."""
+
+    @staticmethod
+    def config(model="qwen3:8b"):
+        return LLMConfig(provider="ollama", model=model, temperature=0.7, timeout=30, ollama_host="http://localhost:11434")
+
+    @patch("app.backend.agent.Agent")
+    @patch("app.backend.agent.create_model_from_config")
+    def test_reuses_agents_and_models(self, mock_create_model, mock_agent_class):
+        """Test agents are built once per (config, zip) and models once per config."""
+        from app.backend.agent import AgentRegistry
+
+        registry = AgentRegistry()
+        first = registry.get("73107", self.config())
+        assert registry.get("73107", self.config()) is first
+        other_zip = registry.get("10001", self.config())
+        assert other_zip is not first
+        assert mock_agent_class.call_count == 2
+        mock_create_model.assert_called_once()
+
+    @patch("app.backend.agent.Agent")
+    @patch("app.backend.agent.create_model_from_config")
+    def test_rebuilds_when_config_changes(self, mock_create_model, mock_agent_class):
+        """Test a changed LLMConfig gets a new model and agent."""
+        from app.backend.agent import AgentRegistry
+
+        registry = AgentRegistry()
+        first = registry.get("73107", self.config())
+        second = registry.get("73107", self.config(model="llama3"))
+        assert second is not first
+        assert mock_create_model.call_count == 2
+
+    @patch("app.backend.agent.Agent")
+    @patch("app.backend.agent.create_model_from_config")
+    def test_evicts_oldest_agents(self, mock_create_model, mock_agent_class):
+        """Test the registry keeps at most max_agents agents and drops unused models."""
+        from app.backend.agent import AgentRegistry
+
+        registry = AgentRegistry(max_agents=2)
+        first = registry.get("73107", self.config("a"))
+        registry.get("73107", self.config("b"))
+        registry.get("73107", self.config("c"))
+        assert len(registry._agents) == 2
+        assert len(registry._models) == 2
+        assert registry.get("73107", self.config("a")) is not first
+
+    @patch("app.backend.agent.agents")
+    async def test_async_lookup_uses_shared_agent(self, mock_agents):
+        """Test lookup_restaurant_info_async goes through the registry."""
+        from app.backend.agent import lookup_restaurant_info_async
+
+        mock_agents.get.return_value.search_async = AsyncMock(return_value=None)
+        await lookup_restaurant_info_async("Test Restaurant")
+        await lookup_restaurant_info_async("Other Restaurant")
+        assert mock_agents.get.call_count == 2
+        mock_agents.get.return_value.search_async.assert_awaited_with("Other Restaurant")
+
+
 class TestLookupRestaurantInfo:
     """Tests for convenience lookup functions."""
 
-    @patch("requests.post")
+    @patch("app.backend.http_client.post")
     @patch("app.backend.agent.get_llm_config")
     @patch("app.backend.agent.get_app_config")
     def test_lookup_restaurant_info_uses_default_config(self, mock_get_app_config, mock_get_llm_config, mock_post):
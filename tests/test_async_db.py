@@ -0,0 +1,73 @@
+"""
+Tests for the async data-access layer.
+Tests that awaitable db functions run on the shared executor.
+"""
+
+import asyncio
+import pytest
+import threading
+import time
+from app.backend import async_db
+from unittest.mock import patch
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    """Start and finish each test without a shared executor."""
+    async_db.shutdown_executor()
+    yield
+    async_db.shutdown_executor()
+
+
+class TestAsyncDatabase:
+    """Test cases for the async database API."""
+
+    async def test_reads_and_writes(self, setup_test_db):
+        """Test async wrappers return the same results as the sync API."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            await async_db.add_restaurant_to_db("Async Place", "cheap")
+            restaurants = await async_db.get_restaurants("cheap")
+            assert ("Async Place", "cheap") in restaurants
+
+            chosen = await async_db.calculate_lunch("cheap")
+            assert chosen[1] == "cheap"
+            assert (await async_db.get_recent_lunches(limit=1))[0][0] == chosen[0]
+
+    async def test_errors_propagate(self, setup_test_db):
+        """Test exceptions raised on the executor surface to the awaiting caller."""
+        with patch('app.backend.db.db_path', setup_test_db), pytest.raises(ValueError, match="already exists"):
+            await async_db.add_restaurant_to_db("McDonald's", "cheap")
+
+    async def test_runs_on_shared_bounded_executor(self, setup_test_db):
+        """Test calls run on the named executor threads, which are reused."""
+        names = set()
+
+        def record_thread():
+            names.add(threading.current_thread().name)
+            time.sleep(0.01)
+
+        with patch.dict("os.environ", {"DB_EXECUTOR_WORKERS": "2"}):
+            await asyncio.gather(*(async_db.run_db(record_thread) for _ in range(10)))
+
+        assert async_db.get_executor()._max_workers == 2
+        assert len(names) <= 2
+        assert all(name.startswith("lunch-db") for name in names)
+
+    async def test_event_loop_stays_responsive(self):
+        """Test a slow blocking call does not stall other coroutines."""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(async_db.run_db(time.sleep, 0.2), ticker())
+        assert ticks == 5
+
+    async def test_scheduled_prefetch_serves_next_roll(self, setup_test_db):
+        """Test a background prefetch readies the pick the next roll commits."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            pick = await asyncio.wrap_future(async_db.schedule_prefetch("alice", "cheap"))
+            assert (await async_db.calculate_lunch("cheap", rotation_key="alice"))[0] == pick.name
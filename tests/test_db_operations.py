@@ -3,23 +3,56 @@ Unit tests for database operations.
 Tests database layer functionality with real SQLite operations.
 """
 
+import io
 import pytest
+import random
+import shutil
 import sqlite3
 from app.backend.db import (
+    SCHEMA_VERSION,
+    SNIPPET_END,
+    SNIPPET_START,
     add_restaurant_to_db,
     add_to_recent_lunch,
+    apply_restaurant_batch,
+    build_seed_db,
     calculate_lunch,
+    calculate_lunches,
+    category_key,
+    close_db,
+    connections,
     create_db_and_tables,
     delete_restaurant_from_db,
     delete_restaurant_info,
+    export_table,
     get_all_restaurants,
+    get_catalog,
+    get_connection,
+    get_last_visit,
+    get_recent_lunches,
     get_restaurant_info,
     get_restaurants,
+    get_restaurants_needing_info,
+    get_rng,
+    import_file,
+    import_records,
+    init_db,
+    install_seed_db,
+    migrate,
+    open_connection,
+    prefetch_next_pick,
+    reset_rotation,
     rng_restaurant,
     save_restaurant_info,
+    save_restaurant_infos,
+    search_restaurants,
+    transaction,
 )
+from app.config import ConfigurationError
+from collections import Counter
 from datetime import datetime, timedelta
 from pathlib import Path
+from threading import Thread
 from unittest.mock import patch
 
 
@@ -196,6 +229,33 @@ class TestDatabaseOperations:
             with pytest.raises(ValueError, match="No restaurants found with option: expensive"):
                 rng_restaurant("expensive")
 
+    def test_rng_restaurant_is_uniform_without_counting(self, setup_test_db):
+        """Test sampling probes ids instead of counting the category, and stays uniform."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            delete_restaurant_from_db("Burger King")
+            add_restaurant_to_db("Taco Bell", "cheap")
+            conn = get_connection()
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                rng = random.Random(5)
+                counts = Counter(rng_restaurant("cheap", rng=rng)[0] for _ in range(3000))
+            finally:
+                conn.set_trace_callback(None)
+            assert not any("COUNT" in statement for statement in statements)
+            assert set(counts) == {"McDonald's", "Subway", "Taco Bell"}
+            assert all(count / 3000 == pytest.approx(1 / 3, abs=0.04) for count in counts.values())
+
+    def test_category_stats_follow_writes(self, setup_test_db):
+        """Test category sizes track adds, deletes and option changes."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_restaurant_to_db("Taco Bell", "Cheap ")
+            delete_restaurant_from_db("Subway")
+            conn = get_connection()
+            conn.execute("UPDATE lunch_list SET option = 'Normal' WHERE restaurants = 'Burger King'")
+            sizes = dict(conn.execute("SELECT category, size FROM category_stats"))
+            assert sizes == {"cheap": 2, "normal": 4}
+
     def test_calculate_lunch_basic(self, setup_test_db):
         """Test basic lunch calculation."""
         with patch('app.backend.db.db_path', setup_test_db):
@@ -258,6 +318,57 @@ class TestDatabaseOperations:
                 unique_selections = set(selections)
                 assert len(unique_selections) > 1 or "McDonald's" not in unique_selections
 
+    def test_calculate_lunch_failure_records_nothing(self, setup_test_db):
+        """Test a failed roll leaves neither history nor session state behind."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            session_rolled = {"McDonald's"}
+            with patch('app.backend.db.random.randrange', side_effect=RuntimeError("boom")), pytest.raises(RuntimeError):
+                calculate_lunch("cheap", session_rolled)
+
+            assert session_rolled == {"McDonald's"}
+            assert get_connection().execute("SELECT COUNT(*) FROM recent_lunch").fetchone()[0] == 0
+
+    def test_calculate_lunch_concurrent_rolls_never_repeat_last(self, setup_test_db):
+        """Test concurrent rolls are serialized so none repeats the previous pick."""
+        import app.backend.db as db
+
+        picks = []
+        record = db._record_lunches
+
+        def spy(conn, names):
+            picks.extend(names)
+            record(conn, names)
+
+        with patch('app.backend.db.db_path', setup_test_db), patch('app.backend.db._record_lunches', spy):
+            delete_restaurant_from_db("Subway")  # two cheap restaurants left
+
+            def roll_many():
+                for _ in range(10):
+                    calculate_lunch("cheap", set())
+
+            threads = [Thread(target=roll_many) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(picks) == 40
+        assert all(a != b for a, b in zip(picks, picks[1:], strict=False))
+
+    def test_calculate_lunch_excludes_rolled_and_last(self, setup_test_db):
+        """Test sampling skips session-rolled and last-picked restaurants."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_to_recent_lunch("Subway")
+            assert calculate_lunch("cheap", {"McDonald's"})[0] == "Burger King"
+            # Burger King is now the last pick, leaving Subway
+            assert calculate_lunch("cheap", {"McDonald's"})[0] == "Subway"
+
+    def test_rng_restaurant_covers_category(self, setup_test_db):
+        """Test SQL-side sampling can return every restaurant in the category."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            seen = {rng_restaurant("cheap")[0] for _ in range(200)}
+            assert seen == {"McDonald's", "Burger King", "Subway"}
+
     def test_database_error_handling(self, temp_db):
         """Test database error handling."""
         # Test with invalid database path
@@ -301,6 +412,874 @@ class TestDatabaseOperations:
             assert "The Ritz" in restaurant_names
 
 
+class TestConnectionManager:
+    """Test cases for pooled connection handling."""
+
+    def test_connection_reused_within_thread(self, setup_test_db):
+        """Test repeated calls on one thread share a single connection."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert get_connection() is get_connection()
+            get_all_restaurants()
+            get_restaurants("cheap")
+            assert len(connections) == 1
+
+    def test_connection_per_thread(self, setup_test_db):
+        """Test each thread gets its own connection."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            main_conn = get_connection()
+            other = []
+            thread = Thread(target=lambda: other.append(get_connection()))
+            thread.start()
+            thread.join()
+            assert other[0] is not main_conn
+
+    def test_connection_reopened_when_file_replaced(self, setup_test_db, tmp_path):
+        """Test a replaced database file is not served from a stale connection."""
+        replacement = tmp_path / "replacement.db"
+        sqlite3.connect(replacement).close()
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = get_connection()
+            replacement.replace(setup_test_db)
+            assert get_connection() is not first
+
+    def test_transaction_rolls_back_on_error(self, setup_test_db):
+        """Test failed transactions leave the pooled connection clean."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(RuntimeError), transaction() as conn:
+                conn.execute("INSERT INTO lunch_list (restaurants, option) VALUES (?, ?)", ("Rolled Back", "cheap"))
+                raise RuntimeError("boom")
+
+            assert not get_connection().in_transaction
+            assert ("Rolled Back", "cheap") not in get_all_restaurants()
+
+    def test_init_db_injects_path(self, temp_db):
+        """Test init_db points all functions at the given database."""
+        with (
+            patch('app.backend.db.db_path', Path('/nonexistent/lunch.db')),
+            patch('app.backend.db.restaurants_csv', Path('/nonexistent/path.csv')),
+        ):
+            init_db(temp_db)
+            add_restaurant_to_db("Injected", "cheap")
+            assert get_all_restaurants() == [("Injected", "cheap")]
+
+    def test_close_db_closes_connections(self, setup_test_db):
+        """Test close_db releases all pooled connections."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            close_db()
+            assert len(connections) == 0
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class TestCatalogCache:
+    """Test cases for the in-memory catalog cache."""
+
+    def test_snapshot_reused_until_changed(self, setup_test_db):
+        """Test repeated reads are served from the same snapshot."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = get_catalog()
+            assert get_catalog() is first
+            assert len(first.restaurants) == 6
+            assert len(first.by_category["cheap"]) == 3
+
+    def test_watcher_is_read_only(self, setup_test_db):
+        """Test the data_version watcher connection cannot write to the database."""
+        from app.backend.db import catalog
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            get_catalog()
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                catalog._watcher.execute("DELETE FROM lunch_list")
+            assert len(get_catalog().restaurants) == 6
+
+    def test_memory_database_reads_pooled_connection(self):
+        """Test a :memory: database's catalog reflects writes made on it."""
+        with patch('app.backend.db.db_path', ":memory:"):
+            create_db_and_tables()
+            add_restaurant_to_db("Memory Diner", "Normal")
+            add_restaurant_to_db("Memory Cafe", "cheap")
+            assert ("Memory Diner", "Normal") in get_all_restaurants()
+            assert ("Memory Diner", "Normal") in get_restaurants("Normal")
+            assert ("Memory Cafe", "cheap") in get_restaurants("cheap")
+
+    def test_local_writes_invalidate(self, setup_test_db):
+        """Test add/delete in this process refresh the snapshot."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            before = get_catalog()
+            add_restaurant_to_db("Cache Test", "cheap")
+            after = get_catalog()
+            assert after is not before
+            assert after.version > before.version
+            assert ("Cache Test", "cheap") in get_restaurants("cheap")
+
+            delete_restaurant_from_db("Cache Test")
+            assert ("Cache Test", "cheap") not in get_all_restaurants()
+
+    def test_external_writes_detected_via_data_version(self, setup_test_db):
+        """Test writes from another connection are picked up without invalidation."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert len(get_all_restaurants()) == 6
+
+            conn = sqlite3.connect(setup_test_db)
+            conn.execute("INSERT INTO lunch_list (restaurants, option) VALUES (?, ?)", ("Other Process", "Normal"))
+            conn.commit()
+            conn.close()
+
+            assert ("Other Process", "Normal") in get_all_restaurants()
+            assert ("Other Process", "Normal") in get_restaurants("normal")
+
+    def test_history_writes_keep_snapshot(self, setup_test_db):
+        """Test commits that do not touch lunch_list do not reload the catalog."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            before = get_catalog()
+            calculate_lunch("cheap")
+            assert get_catalog() is before
+
+    def test_category_key_matches_sqlite(self, setup_test_db):
+        """Test the Python category key folds case like SQLite's lower(trim())."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            for option in (" Cheap ", "NORMAL", "Ünïcode"):
+                assert category_key(option) == conn.execute("SELECT lower(trim(?))", (option,)).fetchone()[0]
+
+
+class TestRotation:
+    """Test cases for the persistent shuffle-bag rotation."""
+
+    def test_cycle_shows_every_restaurant_once(self, setup_test_db):
+        """Test a rotation picks each restaurant once before repeating."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = [calculate_lunch("cheap", rotation_key="alice")[0] for _ in range(3)]
+            second = [calculate_lunch("cheap", rotation_key="alice")[0] for _ in range(3)]
+            assert sorted(first) == sorted(second) == ["Burger King", "McDonald's", "Subway"]
+            assert first[-1] != second[0]
+
+    def test_new_restaurant_check_is_a_rowid_range_scan(self, setup_test_db):
+        """Test looking for restaurants added since the bag was built does not scan the category."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            calculate_lunch("cheap", rotation_key="alice")
+            conn = get_connection()
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                calculate_lunch("cheap", rotation_key="alice")
+            finally:
+                conn.set_trace_callback(None)
+            probe = next(sql for sql in statements if "FROM lunch_list WHERE id >" in sql)
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {probe}"))
+            assert "INTEGER PRIMARY KEY (rowid>?)" in plan
+
+    def test_rotation_survives_restart(self, setup_test_db):
+        """Test the cursor persists across connections (restarts, other workers)."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            picked = {calculate_lunch("cheap", rotation_key="alice")[0] for _ in range(2)}
+            close_db()
+            picked.add(calculate_lunch("cheap", rotation_key="alice")[0])
+            assert picked == {"Burger King", "McDonald's", "Subway"}
+
+    def test_rotations_are_independent(self, setup_test_db):
+        """Test each key and category keeps its own bag."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            calculate_lunch("cheap", rotation_key="alice")
+            calculate_lunch("Normal", rotation_key="alice")
+            calculate_lunch("cheap", rotation_key="bob")
+            rows = dict(get_connection().execute("SELECT rotation_key || '/' || category, cursor FROM rotation_cursor"))
+            assert rows == {"alice/cheap": 1, "alice/normal": 1, "bob/cheap": 1}
+
+    def test_deleted_restaurant_is_skipped(self, setup_test_db):
+        """Test restaurants deleted mid-cycle are never picked."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = calculate_lunch("cheap", rotation_key="alice")[0]
+            remaining = {"Burger King", "McDonald's", "Subway"} - {first}
+            gone = remaining.pop()
+            delete_restaurant_from_db(gone)
+            assert calculate_lunch("cheap", rotation_key="alice")[0] == remaining.pop()
+
+    def test_added_restaurant_joins_current_cycle(self, setup_test_db):
+        """Test restaurants added mid-cycle are picked before the cycle ends."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = calculate_lunch("cheap", rotation_key="alice")[0]
+            add_restaurant_to_db("Taco Bell", "cheap")
+            rest = {calculate_lunch("cheap", rotation_key="alice")[0] for _ in range(3)}
+            assert rest | {first} == {"Burger King", "McDonald's", "Subway", "Taco Bell"}
+
+    def test_never_repeats_last_pick(self, setup_test_db):
+        """Test the next pick is never the restaurant picked last, even by another rotation."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            for _ in range(20):
+                last = get_recent_lunches(limit=1)
+                chosen = calculate_lunch("cheap", rotation_key="alice")[0]
+                assert not last or chosen != last[0][0]
+                calculate_lunch("cheap", rotation_key="bob")
+
+    def test_first_roll_does_not_shuffle_category(self, setup_test_db):
+        """Test a key that rolled once (e.g. a client without a session cookie) stores one bag row."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            for key in ("alice", "bob", "carol"):
+                before = conn.execute("SELECT COUNT(*) FROM rotation_bag").fetchone()[0]
+                calculate_lunch("cheap", rotation_key=key)
+                assert conn.execute("SELECT COUNT(*) FROM rotation_bag").fetchone()[0] == before + 1
+
+    def test_single_restaurant_category_repeats(self, setup_test_db):
+        """Test a one-restaurant category keeps rolling that restaurant."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_restaurant_to_db("Chez Only", "expensive")
+            assert [calculate_lunch("expensive", rotation_key="alice")[0] for _ in range(3)] == ["Chez Only"] * 3
+
+    def test_reset_rotation(self, setup_test_db):
+        """Test resetting forgets the cycle progress."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            calculate_lunch("cheap", rotation_key="alice")
+            reset_rotation("alice", "cheap")
+            assert get_connection().execute("SELECT COUNT(*) FROM rotation_bag").fetchone()[0] == 0
+
+    def test_empty_category_raises(self, setup_test_db):
+        """Test rolling an empty category raises and records nothing."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(ValueError, match="No restaurants found"):
+                calculate_lunch("expensive", rotation_key="alice")
+            assert get_recent_lunches() == []
+
+
+class TestPrefetch:
+    """Test cases for prefetched rotation picks."""
+
+    def test_roll_commits_prefetched_pick(self, setup_test_db):
+        """Test a roll after a prefetch returns that pick without touching the bag."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            picked = [calculate_lunch("cheap", rotation_key="alice")[0] for _ in range(2)]
+            for _ in range(4):
+                pick = prefetch_next_pick("alice", "cheap")
+                conn = get_connection()
+                statements = []
+                conn.set_trace_callback(statements.append)
+                try:
+                    picked.append(calculate_lunch("cheap", rotation_key="alice")[0])
+                finally:
+                    conn.set_trace_callback(None)
+                assert picked[-1] == pick.name
+                assert not any("rotation_bag" in statement for statement in statements)
+            assert sorted(picked) == sorted(["Burger King", "McDonald's", "Subway"] * 2)
+
+    def test_first_roll_is_not_prefetched(self, setup_test_db):
+        """Test a key's first roll does not shuffle its bag in the background."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            calculate_lunch("cheap", rotation_key="alice")
+            assert prefetch_next_pick("alice", "cheap") is None
+            assert get_connection().execute("SELECT COUNT(*) FROM rotation_bag").fetchone()[0] == 1
+
+    def test_catalog_change_invalidates_prefetch(self, setup_test_db):
+        """Test a prefetched restaurant deleted before the roll is not picked."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            pick = prefetch_next_pick("alice", "cheap")
+            delete_restaurant_from_db(pick.name)
+            assert calculate_lunch("cheap", rotation_key="alice")[0] != pick.name
+
+    def test_prefetch_never_repeats_last_lunch(self, setup_test_db):
+        """Test a prefetched pick that another rotation just rolled is dropped."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            pick = prefetch_next_pick("alice", "cheap")
+            add_to_recent_lunch(pick.name)
+            assert calculate_lunch("cheap", rotation_key="alice")[0] != pick.name
+
+    def test_rotation_moved_on_invalidates_prefetch(self, setup_test_db):
+        """Test a reset or a roll that bypassed the prefetch makes it stale."""
+        import app.backend.db as db
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            prefetch_next_pick("alice", "cheap")
+            reset_rotation("alice")
+            assert not db._prefetched
+
+            pick = prefetch_next_pick("alice", "cheap")
+            calculate_lunch("cheap", rotation_key="alice", rng=random.Random(1))
+            db._prefetched[(str(setup_test_db), "alice", "cheap")] = pick
+            assert db._take_prefetched("alice", "cheap") is None
+
+    @patch.dict("os.environ", {"SELECTION_SEED": "3"})
+    def test_seeded_rolls_are_not_prefetched(self, setup_test_db):
+        """Test prefetching is skipped when rolls must replay a seeded sequence."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert prefetch_next_pick("alice", "cheap") is None
+
+
+class TestBatchRoll:
+    """Test cases for rolling several lunches in one call."""
+
+    def test_picks_are_distinct_and_recorded_in_order(self, setup_test_db):
+        """Test a batch samples without replacement and writes the history in pick order."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            session_rolled = set()
+            picks = calculate_lunches(3, "Normal", session_rolled)
+            names = [name for name, _ in picks]
+            assert sorted(names) == ["Fine Dining", "Steakhouse", "The Ritz"]
+            assert session_rolled == set(names)
+            assert [name for name, _ in get_recent_lunches(limit=3)] == names[::-1]
+
+    def test_new_cycle_keeps_batch_distinct(self, setup_test_db):
+        """Test a session cycle ending mid-batch does not repeat the batch's own picks."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            picks = calculate_lunches(3, "cheap", {"McDonald's", "Burger King"})
+            assert picks[0][0] == "Subway"
+            assert sorted(name for name, _ in picks) == ["Burger King", "McDonald's", "Subway"]
+
+    def test_rotation_batch_spans_cycles_without_repeats(self, setup_test_db):
+        """Test a batch crossing a shuffle-bag cycle boundary still picks distinct restaurants."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            for _ in range(2):
+                calculate_lunch("cheap", rotation_key="alice")
+            picks = calculate_lunches(3, "cheap", rotation_key="alice")
+            assert sorted(name for name, _ in picks) == ["Burger King", "McDonald's", "Subway"]
+
+    def test_longer_than_category_never_repeats_consecutively(self, setup_test_db):
+        """Test a batch longer than the category starts a new cycle without back-to-back repeats."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            names = [name for name, _ in calculate_lunches(7, "cheap")]
+            assert len(set(names[:3])) == 3
+            assert all(a != b for a, b in zip(names, names[1:], strict=False))
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "uniform"})
+    def test_weighted_batch_is_distinct(self, setup_test_db):
+        """Test weighted mode samples a batch without replacement."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            picks = calculate_lunches(3, "cheap", mode="weighted")
+            assert sorted(name for name, _ in picks) == ["Burger King", "McDonald's", "Subway"]
+
+    def test_invalid_count_raises_error(self, setup_test_db):
+        """Test batch sizes outside 1..MAX_BATCH_ROLLS are rejected before touching the database."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            for count in (0, 100):
+                with pytest.raises(ValueError, match="Can roll between"):
+                    calculate_lunches(count, "cheap")
+            assert get_recent_lunches() == []
+
+
+class TestRecencySelection:
+    """Test cases for the SQL-side recency-decay selection mode."""
+
+    def test_recent_visits_are_penalized(self, setup_test_db):
+        """Test the last pick is excluded and older visits are less likely than unvisited places."""
+        import app.backend.db as db
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_to_recent_lunch("Burger King")
+            add_to_recent_lunch("Subway")
+            rng = random.Random(99)
+            with transaction() as conn:
+                picks = Counter(db._recency_pick(conn, "cheap", rng=rng)[0] for _ in range(600))
+            assert "Subway" not in picks
+            # Burger King (2 picks ago) weighs 2/15 against McDonald's 1
+            assert picks["Burger King"] / 600 == pytest.approx(2 / 17, abs=0.04)
+
+    def test_only_windowed_restaurants_are_weighed(self, setup_test_db):
+        """Test the recency query probes the index per windowed name instead of scanning the category."""
+        import app.backend.db as db
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_to_recent_lunch("Burger King")
+            with transaction() as conn:
+                statements = []
+                conn.set_trace_callback(statements.append)
+                try:
+                    db._recency_pick(conn, "cheap", ["Subway"], random.Random(1))
+                finally:
+                    conn.set_trace_callback(None)
+                query = next(sql for sql in statements if "WITH history" in sql)
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+            assert not any(
+                detail.startswith("SCAN lunch_list") or detail.endswith("idx_lunch_list_category (category=?)") for detail in plan
+            )
+
+    @patch.dict("os.environ", {"SELECTION_MODE": "recency", "RECENCY_EXCLUDE": "2"})
+    def test_excluded_picks_never_repeat(self, setup_test_db):
+        """Test the RECENCY_EXCLUDE most recent picks are never drawn."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            names = [calculate_lunch("cheap")[0] for _ in range(12)]
+            assert all(len(set(names[i : i + 3])) == 3 for i in range(len(names) - 2))
+
+    @patch.dict("os.environ", {"RECENCY_EXCLUDE": "5"})
+    def test_falls_back_when_everything_is_excluded(self, setup_test_db):
+        """Test a roll still succeeds when the whole category is inside the exclusion."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            for name in ("McDonald's", "Burger King", "Subway"):
+                add_to_recent_lunch(name)
+            assert calculate_lunch("cheap", mode="recency")[1] == "cheap"
+
+    def test_batch_is_distinct(self, setup_test_db):
+        """Test a recency-mode batch does not repeat its own picks."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            picks = calculate_lunches(3, "Normal", mode="recency")
+            assert sorted(name for name, _ in picks) == ["Fine Dining", "Steakhouse", "The Ritz"]
+
+
+class TestSeededSelection:
+    """Test cases for replaying rolls with a seeded generator."""
+
+    @pytest.mark.parametrize("mode", ["rotation", "weighted"])
+    def test_same_seed_replays_rolls(self, setup_test_db, tmp_path, mode):
+        """Test identical databases and seeds give identical roll sequences."""
+        replay_db = tmp_path / "replay.db"
+        shutil.copyfile(setup_test_db, replay_db)
+        runs = []
+        for path in (setup_test_db, replay_db):
+            with patch('app.backend.db.db_path', path):
+                rng = random.Random(1234)
+                picks = [calculate_lunch("cheap", rotation_key="alice", mode=mode, rng=rng) for _ in range(4)]
+                picks += calculate_lunches(3, "Normal", set(), mode=mode, rng=rng)
+                runs.append(picks)
+        assert runs[0] == runs[1]
+
+    def test_rng_restaurant_replays(self, setup_test_db):
+        """Test a per-call seed fixes rng_restaurant's draws."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            first = [rng_restaurant("cheap", get_rng(7)) for _ in range(5)]
+            assert [rng_restaurant("cheap", get_rng(7)) for _ in range(5)] == first
+
+    def test_config_seed_gives_one_process_generator(self):
+        """Test SELECTION_SEED yields a shared generator that restarts when the seed changes."""
+        assert get_rng() is None
+        with patch.dict("os.environ", {"SELECTION_SEED": "42"}):
+            rng = get_rng()
+            assert rng is get_rng()
+            assert rng.random() == random.Random(42).random()
+        with patch.dict("os.environ", {"SELECTION_SEED": "43"}):
+            assert get_rng() is not rng
+
+    def test_invalid_config_seed_raises_error(self):
+        """Test a non-integer SELECTION_SEED is rejected."""
+        with patch.dict("os.environ", {"SELECTION_SEED": "abc"}), pytest.raises(ConfigurationError):
+            get_rng()
+
+
+class TestBulkImport:
+    """Test cases for streaming bulk imports."""
+
+    def test_import_csv_in_batches(self, setup_test_db, tmp_path):
+        """Test CSV rows are written in batches with progress reported per batch."""
+        source = tmp_path / "catalog.csv"
+        source.write_text("restaurant,option\n" + "".join(f"Place {i},cheap\n" for i in range(25)))
+        updates = []
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            result = import_file(source, "lunch_list", batch_size=10, progress=lambda r: updates.append(r.written))
+            assert (result.read, result.written, result.skipped) == (25, 25, 0)
+            assert updates == [10, 20, 25]
+            assert len(get_restaurants("cheap")) == 28
+
+    def test_import_jsonl_history_normalizes_dates(self, setup_test_db, tmp_path):
+        """Test JSONL history exports import with ISO-normalized dates."""
+        source = tmp_path / "history.jsonl"
+        source.write_text('{"restaurant": "Subway", "date": "2022-01-26 13:20:32.205639"}\n\n')
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            result = import_file(source, "recent_lunch")
+            assert result.written == 1
+            row = get_connection().execute("SELECT restaurants, date FROM recent_lunch").fetchone()
+            assert row == ("Subway", "2022-01-26T13:20:32.205639")
+
+    def test_duplicate_policies(self, setup_test_db):
+        """Test ignore keeps, replace overwrites and error rejects duplicates."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            rows = [{"restaurants": "Subway", "option": "Normal"}]
+
+            assert import_records("lunch_list", rows, on_duplicate="ignore").written == 0
+            assert ("Subway", "cheap") in get_all_restaurants()
+
+            assert import_records("lunch_list", rows, on_duplicate="replace").written == 1
+            assert ("Subway", "Normal") in get_all_restaurants()
+
+            with pytest.raises(ValueError, match="Duplicate row"):
+                import_records("lunch_list", rows, on_duplicate="error")
+
+    def test_history_reimport_is_not_double_counted(self, setup_test_db):
+        """Test importing the same history twice keeps one row per visit under every policy."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            rows = [
+                {"restaurant": "Subway", "date": "2024-03-01T12:00:00"},
+                {"restaurant": "Subway", "date": "2024-03-08T12:00:00"},
+            ]
+            assert import_records("recent_lunch", rows).written == 2
+
+            assert import_records("recent_lunch", rows, on_duplicate="ignore").written == 0
+            import_records("recent_lunch", rows, on_duplicate="replace")
+            with pytest.raises(ValueError, match="Duplicate row"):
+                import_records("recent_lunch", rows, on_duplicate="error")
+
+            count = (
+                get_connection()
+                .execute("SELECT count(*) FROM recent_lunch WHERE restaurants = 'Subway' AND date LIKE '2024-03-%'")
+                .fetchone()[0]
+            )
+            assert count == 2
+
+    def test_records_without_name_are_skipped(self, setup_test_db):
+        """Test records missing the name column are counted as skipped."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            result = import_records("restaurant_info", [{"restaurant_name": "", "address": "x"}, {"restaurant": "Subway"}])
+            assert (result.read, result.written, result.skipped) == (2, 1, 1)
+
+    def test_invalid_table_or_policy(self, setup_test_db):
+        """Test unknown tables and policies are rejected."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(ValueError, match="Unsupported import table"):
+                import_records("sqlite_master", [])
+            with pytest.raises(ValueError, match="Invalid duplicate policy"):
+                import_records("lunch_list", [], on_duplicate="merge")
+
+
+class TestRollHistory:
+    """Test cases for the append-only roll history."""
+
+    def test_repeat_visits_are_recorded(self, setup_test_db):
+        """Test the same restaurant can appear in history more than once."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_to_recent_lunch("Subway")
+            add_to_recent_lunch("The Ritz")
+            add_to_recent_lunch("Subway")
+
+            assert [name for name, _ in get_recent_lunches()] == ["Subway", "The Ritz", "Subway"]
+            assert get_last_visit("Subway") == get_recent_lunches(limit=1)[0][1]
+            assert get_last_visit("Steakhouse") is None
+
+    @patch.dict("os.environ", {"HISTORY_MAX_ENTRIES": "3", "HISTORY_DAYS": "0"})
+    def test_retention_by_count(self, setup_test_db):
+        """Test HISTORY_MAX_ENTRIES bounds the history length."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            for i in range(5):
+                add_to_recent_lunch(f"Restaurant {i}")
+            assert [name for name, _ in get_recent_lunches()] == ["Restaurant 4", "Restaurant 3", "Restaurant 2"]
+
+    @patch.dict("os.environ", {"HISTORY_MAX_ENTRIES": "0", "HISTORY_DAYS": "14"})
+    def test_retention_by_days(self, setup_test_db):
+        """Test entries older than HISTORY_DAYS are trimmed on the next roll."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            old = (datetime.now() - timedelta(days=20)).isoformat()
+            recent = (datetime.now() - timedelta(days=2)).isoformat()
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES (?, ?), (?, ?)", ("Old", old, "Recent", recent))
+
+            add_to_recent_lunch("Today")
+            assert {name for name, _ in get_recent_lunches()} == {"Recent", "Today"}
+
+    def test_history_lookups_use_indexes(self, setup_test_db):
+        """Test recency lookups and trimming search indexes instead of scanning."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            for query, params in (
+                ("SELECT restaurants FROM recent_lunch ORDER BY date DESC LIMIT 1", ()),
+                ("SELECT date FROM recent_lunch WHERE restaurants = ? ORDER BY date DESC LIMIT 1", ("Subway",)),
+                ("DELETE FROM recent_lunch WHERE date < ?", ("2020-01-01",)),
+            ):
+                detail = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+                assert "INDEX idx_recent_lunch" in detail
+
+    def test_legacy_history_is_preserved(self, temp_db):
+        """Test the history migration keeps rows from the old keyed table."""
+        conn = sqlite3.connect(temp_db)
+        conn.execute("CREATE TABLE recent_lunch (restaurants TEXT PRIMARY KEY, date TEXT)")
+        conn.execute("INSERT INTO recent_lunch VALUES ('Teds', '2022-01-26T18:01:23')")
+        conn.commit()
+        conn.close()
+
+        with patch('app.backend.db.db_path', temp_db):
+            assert get_recent_lunches() == [("Teds", "2022-01-26T18:01:23")]
+
+
+class TestBatchOperations:
+    """Test cases for batch add/delete."""
+
+    def test_batch_applies_and_reports_per_item(self, setup_test_db):
+        """Test a mixed batch commits good items and reports failures."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            results = apply_restaurant_batch(
+                [
+                    {"op": "add", "name": "Batch One", "option": "cheap"},
+                    {"op": "add", "name": "McDonald's", "option": "cheap"},
+                    {"op": "delete", "name": "Subway"},
+                    {"op": "delete", "name": "NonExistent"},
+                    {"op": "rename", "name": "The Ritz"},
+                    {"op": "add"},
+                ]
+            )
+
+            assert [r["ok"] for r in results] == [True, False, True, False, False, False]
+            assert "already exists" in results[1]["error"]
+            assert "not found" in results[3]["error"]
+            assert "Unsupported operation" in results[4]["error"]
+
+            names = {name for name, _ in get_all_restaurants()}
+            assert "Batch One" in names
+            assert "Subway" not in names
+            assert "The Ritz" in names
+
+    def test_batch_invalidates_cache_once(self, setup_test_db):
+        """Test the catalog cache is invalidated once per batch, not per item."""
+        from app.backend.db import catalog
+
+        with patch('app.backend.db.db_path', setup_test_db), patch.object(catalog, "invalidate") as invalidate:
+            apply_restaurant_batch([{"op": "add", "name": f"Bulk {i}", "option": "Normal"} for i in range(50)])
+            invalidate.assert_called_once()
+
+    def test_failed_delete_item_rolls_back_its_changes(self, setup_test_db):
+        """Test a failing item leaves no partial writes behind."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Ghost", address="nowhere")
+            results = apply_restaurant_batch([{"op": "delete", "name": "Ghost"}])
+            assert results[0]["ok"] is False
+            # The restaurant_info delete ran before the lunch_list miss and was rolled back
+            assert get_restaurant_info("Ghost")["address"] == "nowhere"
+
+
+class TestExport:
+    """Test cases for streaming exports."""
+
+    def test_csv_export_round_trips_through_import(self, setup_test_db, tmp_path):
+        """Test a CSV export can be imported into another database."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            exported = b"".join(export_table("lunch_list", "csv", chunk_size=2))
+
+        target = tmp_path / "copy.db"
+        with patch('app.backend.db.db_path', target), patch('app.backend.db.restaurants_csv', Path('/nonexistent/path.csv')):
+            source = tmp_path / "lunch_list.csv"
+            source.write_bytes(exported)
+            assert import_file(source, "lunch_list").written == 6
+            assert ("McDonald's", "cheap") in get_all_restaurants()
+
+    def test_ndjson_and_msgpack_exports(self, setup_test_db):
+        """Test NDJSON and msgpack exports produce one record per row."""
+        import json
+        import msgpack
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Subway", address="1 Main St")
+            lines = b"".join(export_table("restaurant_info", "ndjson")).splitlines()
+            packed = b"".join(export_table("lunch_list", "msgpack", chunk_size=4))
+
+        assert json.loads(lines[0])["address"] == "1 Main St"
+        records = list(msgpack.Unpacker(io.BytesIO(packed)))
+        assert len(records) == 6
+        assert {"restaurants", "option"} == set(records[0])
+
+    def test_export_is_lazy_and_validated_eagerly(self, setup_test_db):
+        """Test bad arguments fail immediately and nothing is read until iterated."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(ValueError, match="Unsupported export table"):
+                export_table("sqlite_master")
+            with pytest.raises(ValueError, match="Unsupported export format"):
+                export_table("lunch_list", "xml")
+
+            chunks = export_table("lunch_list", "csv", chunk_size=1)
+            assert next(chunks).startswith(b"restaurants,option")
+            chunks.close()
+
+
+class TestSchemaMigrations:
+    """Test cases for versioned schema migrations."""
+
+    def test_legacy_database_is_migrated(self, setup_test_db):
+        """Test an unversioned lunch.db gains the category key and index."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(lunch_list)")}
+            assert "category" in columns
+            categories = dict(conn.execute("SELECT restaurants, category FROM lunch_list"))
+            assert categories["The Ritz"] == "normal"
+
+    def test_duplicate_history_is_collapsed(self, setup_test_db):
+        """Test the history key migration drops doubled visits left by earlier re-imports."""
+        conn = open_connection(setup_test_db)
+        migrate(conn)
+        conn.executescript('''
+            DROP INDEX idx_recent_lunch_visit;
+            DROP TABLE rating_generation;
+            DROP TRIGGER restaurant_rating_generation_insert;
+            DROP TRIGGER restaurant_rating_generation_update;
+            DROP TRIGGER restaurant_rating_generation_delete;
+            DROP TABLE category_stats;
+            DROP TRIGGER lunch_list_stats_insert;
+            DROP TRIGGER lunch_list_stats_delete;
+            DROP TRIGGER lunch_list_stats_update;
+            PRAGMA user_version = 7;
+            INSERT INTO recent_lunch (restaurants, date) VALUES
+                ('Subway', '2024-03-01T12:00:00'), ('Subway', '2024-03-01T12:00:00'), ('Subway', '2024-03-08T12:00:00');
+        ''')
+        assert migrate(conn) == 7
+        assert conn.execute("SELECT count(*) FROM recent_lunch").fetchone()[0] == 2
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES ('Subway', '2024-03-08T12:00:00')")
+        conn.close()
+
+    def test_category_filter_uses_covering_index(self, setup_test_db):
+        """Test category lookups search the index instead of scanning the table."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            plan = (
+                get_connection()
+                .execute(
+                    "EXPLAIN QUERY PLAN SELECT restaurants, option FROM lunch_list WHERE category = lower(trim(?))",
+                    ("cheap",),
+                )
+                .fetchall()
+            )
+            detail = " ".join(row[3] for row in plan)
+            assert "COVERING INDEX idx_lunch_list_category" in detail
+
+    def test_current_database_is_not_reseeded(self, temp_db):
+        """Test only a freshly bootstrapped database is seeded from CSV."""
+        with patch('app.backend.db.db_path', temp_db):
+            create_db_and_tables()
+            seeded = get_all_restaurants()
+            assert seeded
+            for name, _ in seeded:
+                delete_restaurant_from_db(name)
+            close_db()
+
+            # Restart: the schema is current, so the emptied list stays empty
+            create_db_and_tables()
+            assert get_all_restaurants() == []
+
+    def test_current_database_skips_bootstrap(self, temp_db):
+        """Test reopening a current database only reads the schema version."""
+        with patch('app.backend.db.db_path', temp_db):
+            create_db_and_tables()
+            close_db()
+
+            statements = []
+            conn = open_connection(temp_db)
+            conn.set_trace_callback(statements.append)
+            assert migrate(conn) == SCHEMA_VERSION
+            conn.close()
+            assert statements == ["PRAGMA user_version"]
+
+    def test_category_key_normalizes_whitespace_and_case(self, setup_test_db):
+        """Test categories match regardless of case or surrounding whitespace."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            add_restaurant_to_db("Padded", " Cheap ")
+            assert ("Padded", " Cheap ") in get_restaurants("cheap")
+
+
+class TestSearch:
+    """Test cases for full-text search."""
+
+    def test_search_by_name_prefix(self, setup_test_db):
+        """Test names match on word prefixes, case-insensitively."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            results = search_restaurants("burg")
+            assert [r["name"] for r in results] == ["Burger King"]
+            assert results[0]["option"] == "cheap"
+
+    def test_search_enrichment_data(self, setup_test_db):
+        """Test restaurant_info fields are searchable and stay in sync."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Subway", hours="Open late, until 2am", description="Sandwiches")
+            results = search_restaurants("open late")
+            assert [r["name"] for r in results] == ["Subway"]
+            assert SNIPPET_START + "late" + SNIPPET_END in results[0]["snippet"]
+
+            save_restaurant_info("Subway", hours="Lunch only")
+            assert search_restaurants("late") == []
+
+            delete_restaurant_info("Subway")
+            assert search_restaurants("lunch") == []
+
+    def test_search_info_saved_before_restaurant(self, setup_test_db):
+        """Test info saved before the restaurant is added is indexed on insert."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Ramen Bar", description="Tonkotsu noodles")
+            add_restaurant_to_db("Ramen Bar", "Normal")
+            assert [r["name"] for r in search_restaurants("tonkotsu")] == ["Ramen Bar"]
+
+    def test_deleted_restaurant_leaves_index(self, setup_test_db):
+        """Test deleting a restaurant removes it from search."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            delete_restaurant_from_db("Subway")
+            assert search_restaurants("subway") == []
+
+    def test_replace_import_keeps_one_entry(self, setup_test_db):
+        """Test rows replaced on import are not left behind in the index."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            import_records("lunch_list", [{"restaurant": "Subway", "option": "Normal"}], on_duplicate="replace")
+            results = search_restaurants("subway")
+            assert [(r["name"], r["option"]) for r in results] == [("Subway", "Normal")]
+
+    def test_name_matches_rank_first(self, setup_test_db):
+        """Test a name match outranks a description match."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Steakhouse", description="Better than any fine dining spot")
+            results = search_restaurants("fine dining")
+            assert [r["name"] for r in results] == ["Fine Dining", "Steakhouse"]
+
+    def test_query_syntax_is_escaped(self, setup_test_db):
+        """Test FTS5 operators in user input are treated as plain words."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert search_restaurants('"McDonald\'s" OR NEAR(') == []
+            assert [r["name"] for r in search_restaurants("mcdonald")] == ["McDonald's"]
+            assert search_restaurants("  ") == []
+
+    def test_index_survives_vacuum(self, setup_test_db):
+        """Test search ids stay aligned with lunch_list after VACUUM."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            delete_restaurant_from_db("Burger King")
+            get_connection().execute("VACUUM")
+            save_restaurant_info("The Ritz", description="Afternoon tea")
+            assert [r["name"] for r in search_restaurants("tea")] == ["The Ritz"]
+
+
+class TestSeedDatabase:
+    """Test cases for the prebuilt seed database."""
+
+    def test_build_seed_db(self, tmp_path):
+        """Test the seed is a single, current, fully loaded database file."""
+        csv_path = tmp_path / "lunch_list.csv"
+        csv_path.write_text("restaurant,option\nSeeded Diner,cheap\nSeeded Bistro,Normal\n")
+        seed = tmp_path / "seed.db"
+
+        result = build_seed_db(seed, csv_path)
+
+        assert result.written == 2
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["lunch_list.csv", "seed.db"]
+        conn = sqlite3.connect(seed)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert conn.execute("SELECT COUNT(*) FROM lunch_list").fetchone()[0] == 2
+        conn.close()
+
+    def test_first_launch_installs_seed(self, temp_db, tmp_path):
+        """Test a new database is copied from the seed instead of imported from CSV."""
+        csv_path = tmp_path / "lunch_list.csv"
+        csv_path.write_text("restaurant,option\nSeeded Diner,cheap\n")
+        seed = tmp_path / "seed.db"
+        build_seed_db(seed, csv_path)
+
+        with (
+            patch('app.backend.db.db_path', temp_db),
+            patch('app.backend.db.seed_db_path', seed),
+            patch('app.backend.db.import_file') as mock_import,
+        ):
+            create_db_and_tables()
+            assert get_all_restaurants() == [("Seeded Diner", "cheap")]
+            mock_import.assert_not_called()
+
+    def test_existing_database_is_kept(self, setup_test_db, tmp_path):
+        """Test the seed never overwrites an existing database."""
+        csv_path = tmp_path / "lunch_list.csv"
+        csv_path.write_text("restaurant,option\nSeeded Diner,cheap\n")
+        seed = tmp_path / "seed.db"
+        build_seed_db(seed, csv_path)
+
+        assert install_seed_db(setup_test_db, seed) is False
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert len(get_all_restaurants()) == 6
+
+    def test_missing_seed_is_ignored(self, temp_db, tmp_path):
+        """Test a missing seed leaves the target untouched."""
+        assert install_seed_db(temp_db, tmp_path / "missing.db") is False
+        assert temp_db.stat().st_size == 0
+
+
 class TestRestaurantInfoOperations:
     """Test cases for restaurant_info table operations."""
 
@@ -418,6 +1397,44 @@ class TestRestaurantInfoOperations:
             info = get_restaurant_info("McDonald's")
             assert info is None
 
+    def test_get_restaurants_needing_info(self, setup_test_db):
+        """Test missing info is listed first, then stale info, and fresh info is skipped."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Subway", address="1 Main St")
+            conn = sqlite3.connect(setup_test_db)
+            conn.execute(
+                "INSERT INTO restaurant_info (restaurant_name, address, last_updated) VALUES (?, ?, ?)",
+                ("McDonald's", "123 Main St", (datetime.now() - timedelta(days=10)).isoformat()),
+            )
+            conn.commit()
+            conn.close()
+
+            names = get_restaurants_needing_info(max_age_days=7)
+            assert "Subway" not in names
+            assert names[-1] == "McDonald's"
+            assert len(names) == len(get_all_restaurants()) - 1
+            assert get_restaurants_needing_info(max_age_days=7, limit=2) == names[:2]
+            assert "McDonald's" not in get_restaurants_needing_info(max_age_days=30)
+
+    def test_save_restaurant_infos(self, setup_test_db):
+        """Test batched saves upsert in one call and skip restaurants that no longer exist."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            save_restaurant_info("Subway", address="old", phone="555-0000")
+            saved = save_restaurant_infos(
+                [
+                    {"restaurant_name": "Subway", "address": "1 Main St"},
+                    {"restaurant_name": "McDonald's", "hours": "24h"},
+                    {"restaurant_name": "Gone", "address": "nowhere"},
+                ]
+            )
+
+            assert saved == 2
+            assert get_restaurant_info("Subway")["address"] == "1 Main St"
+            assert get_restaurant_info("Subway")["phone"] is None
+            assert get_restaurant_info("McDonald's")["hours"] == "24h"
+            assert get_restaurant_info("Gone") is None
+            assert save_restaurant_infos([]) == 0
+
     def test_get_restaurant_info_no_last_updated(self, setup_test_db):
         """Test cache with missing last_updated still returns data."""
         with patch('app.backend.db.db_path', setup_test_db):
@@ -0,0 +1,151 @@
+"""
+Tests for bulk restaurant info enrichment.
+Tests the lookup pipeline's concurrency limit, rate limiting, batching and progress.
+"""
+
+import asyncio
+import httpx
+import pytest
+import sqlite3
+import threading
+import time
+from app.backend import db
+from app.backend.enrich import EnrichmentProgress, RateLimiter, enrich_restaurants, main
+from app.backend.service import RestaurantService
+from app.config import LLMConfig
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+
+def fake_info(name):
+    return SimpleNamespace(address=f"{name} St", phone=None, hours="9-5", website=None, description=name)
+
+
+class TestEnrichPipeline:
+    """Test cases for the enrichment pipeline."""
+
+    async def test_enriches_missing_restaurants(self, setup_test_db):
+        """Test every restaurant without info is looked up and saved."""
+        with patch('app.backend.db.db_path', setup_test_db):
+            db.save_restaurant_info("Subway", address="1 Main St")
+            lookup = Mock(side_effect=fake_info)
+
+            progress = await enrich_restaurants(db, lookup=lookup, rate=0, batch_size=2)
+
+            looked_up = {call.args[0] for call in lookup.call_args_list}
+            assert "Subway" not in looked_up
+            assert len(looked_up) == progress.total == progress.done == progress.found == progress.saved
+            assert progress.failed == 0
+            assert db.get_restaurants_needing_info() == []
+            assert db.get_restaurant_info("McDonald's")["address"] == "McDonald's St"
+
+    async def test_concurrency_limit(self):
+        """Test no more than ``concurrency`` lookups run at once."""
+        lock = threading.Lock()
+        running = peak = 0
+
+        def lookup(name):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return fake_info(name)
+
+        manager = Mock(save_restaurant_infos=Mock(side_effect=len))
+        names = [f"Place {i}" for i in range(12)]
+        progress = await enrich_restaurants(manager, names, lookup=lookup, concurrency=3, rate=0, batch_size=5)
+
+        assert peak == 3
+        assert progress.saved == 12
+        assert [len(call.args[0]) for call in manager.save_restaurant_infos.call_args_list] == [5, 5, 2]
+
+    async def test_failures_and_progress(self):
+        """Test failed and empty lookups are counted and progress is reported after each one."""
+
+        def lookup(name):
+            if name == "Broken":
+                raise RuntimeError("timeout")
+            return None if name == "Unknown" else fake_info(name)
+
+        manager = Mock(save_restaurant_infos=Mock(side_effect=len))
+        reports = []
+        progress = await enrich_restaurants(
+            manager,
+            ["Broken", "Unknown", "Known"],
+            lookup=lookup,
+            rate=0,
+            on_progress=lambda p: reports.append(p.done),
+        )
+
+        assert (progress.done, progress.found, progress.failed, progress.saved) == (3, 1, 1, 1)
+        assert sorted(reports) == [1, 2, 3]
+        assert manager.save_restaurant_infos.call_args.args[0][0]["restaurant_name"] == "Known"
+
+    async def test_failed_batch_is_counted(self):
+        """Test a batch that fails to write is reported as unsaved rather than lost silently."""
+        manager = Mock(save_restaurant_infos=Mock(side_effect=sqlite3.OperationalError("database is locked")))
+        progress = await enrich_restaurants(manager, ["A", "B", "C"], lookup=fake_info, rate=0, batch_size=2)
+
+        assert (progress.found, progress.saved, progress.unsaved) == (3, 0, 3)
+        assert "3 unsaved" in str(progress)
+
+    async def test_nothing_to_enrich(self):
+        """Test an empty candidate list returns without looking anything up."""
+        manager = Mock(get_restaurants_needing_info=Mock(return_value=[]))
+        lookup = Mock()
+        progress = await enrich_restaurants(manager, lookup=lookup, limit=5)
+
+        manager.get_restaurants_needing_info.assert_called_once_with(None, 5)
+        lookup.assert_not_called()
+        assert progress.total == 0
+
+    async def test_rate_limiter_spaces_calls(self):
+        """Test concurrent waiters are released one interval apart."""
+        limiter = RateLimiter(50)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(5)))
+        assert time.monotonic() - started >= 4 / 50 - 0.005
+
+        unlimited = RateLimiter(0)
+        started = time.monotonic()
+        await asyncio.gather(*(unlimited.wait() for _ in range(100)))
+        assert time.monotonic() - started < 0.05
+
+
+class TestEnrichCommand:
+    """Test cases for the service method and command."""
+
+    async def test_service_enrich_all(self, mock_db_manager):
+        """Test the service passes its database manager and options through."""
+        service = RestaurantService(mock_db_manager)
+        with patch('app.backend.enrich.enrich_restaurants', return_value=EnrichmentProgress(total=0)) as enrich:
+            await service.enrich_all(limit=10, concurrency=2)
+        enrich.assert_called_once()
+        assert enrich.call_args.args == (mock_db_manager,)
+        assert enrich.call_args.kwargs["limit"] == 10
+        assert enrich.call_args.kwargs["concurrency"] == 2
+
+    def test_main(self, setup_test_db, capsys):
+        """Test the command enriches the database and prints a summary."""
+        with (
+            patch('app.backend.db.db_path', setup_test_db),
+            patch('app.backend.agent.lookup_restaurant_info', side_effect=lambda name, **kwargs: fake_info(name)),
+        ):
+            assert main(["--limit", "2", "--rate", "0"]) == 0
+            assert len(db.get_restaurants_needing_info()) == len(db.get_all_restaurants()) - 2
+        assert "2/2 looked up, 2 found, 0 failed, 2 saved" in capsys.readouterr().out
+
+    def test_main_counts_unreachable_llm_as_failed(self, setup_test_db, capsys):
+        """Test connection errors from the default lookup fail the run instead of reading as "not found"."""
+        llm_config = LLMConfig(provider="ollama", model="m", temperature=0.7, timeout=5, ollama_host="http://localhost:1")
+        with (
+            patch('app.backend.db.db_path', setup_test_db),
+            patch('app.backend.agent.get_llm_config', return_value=llm_config),
+            patch('app.backend.http_client.post', side_effect=httpx.ConnectError("connection refused")),
+        ):
+            assert main(["--limit", "2", "--rate", "0"]) == 1
+            assert len(db.get_restaurants_needing_info()) == len(db.get_all_restaurants())
+        assert "2/2 looked up, 0 found, 2 failed, 0 saved" in capsys.readouterr().out
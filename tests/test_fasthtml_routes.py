@@ -124,6 +124,31 @@ class TestRollRoute:
         # Should return one of the cheap restaurants
         assert any(name in content for name in ["McDonald's", "Burger King", "Subway"])
 
+    def test_roll_rotates_through_category(self, client):
+        """Consecutive rolls in one browser session should cover the category before repeating."""
+        cheap = ["McDonald's", "Burger King", "Subway"]
+        rolled = set()
+        for _ in range(3):
+            content = client.post("/roll", data={"option": "cheap"}).text
+            rolled.update(name for name in cheap if name in content)
+        assert rolled == set(cheap)
+
+    def test_roll_week_returns_distinct_schedule(self, client):
+        """Rolling a week should list one distinct restaurant per day while the category lasts."""
+        content = client.post("/roll/week", data={"option": "cheap", "days": 3}).text
+        assert content.count("<li>") == 3
+        assert all(name in content for name in ["McDonald", "Burger King", "Subway"])
+
+    def test_roll_accepts_seed(self, client):
+        """A per-request seed should be accepted and still return a restaurant."""
+        content = client.post("/roll", data={"option": "cheap", "seed": "7"}).text
+        assert any(name in content for name in ["McDonald", "Burger King", "Subway"])
+
+    def test_roll_week_rejects_invalid_days(self, client):
+        """Out-of-range schedule lengths should show an error."""
+        response = client.post("/roll/week", data={"option": "cheap", "days": 0})
+        assert "Can roll between" in response.text
+
     def test_roll_empty_category_returns_error(self, test_db_path):
         """Rolling from empty category should show error message."""
         # Create empty database
@@ -141,6 +166,32 @@ class TestRollRoute:
                 assert b"No restaurants found" in response.content
 
 
+class TestGroupRoutes:
+    """Tests for the group room API."""
+
+    def test_member_vetoes_apply_to_group_roll(self, client):
+        """A vetoed restaurant should never come back from a group roll."""
+        for member, vetoes in [("ana", ["McDonald's"]), ("bo", ["Subway"])]:
+            response = client.post("/api/groups/team/members", json={"member": member, "vetoes": vetoes})
+            assert response.status_code == 200
+        response = client.post("/api/groups/team/roll", data={"option": "cheap"})
+        assert response.json() == {"name": "Burger King", "option": "cheap"}
+
+    def test_invalid_member_payload_returns_400(self, client):
+        """Malformed member bodies and unknown restaurants should be rejected."""
+        assert client.post("/api/groups/team/members", json={"vetoes": []}).status_code == 400
+        response = client.post("/api/groups/team/members", json={"member": "ana", "vetoes": ["Nowhere"]})
+        assert response.status_code == 400
+        assert "not found" in response.json()["error"]
+
+    def test_non_string_restaurant_names_return_400(self, client):
+        """Lists or objects among the vetoes and likes should be rejected, not crash."""
+        for body in ({"vetoes": [["x"]]}, {"vetoes": [{"x": 1}]}, {"likes": ["Subway", 3]}):
+            response = client.post("/api/groups/team/members", json={"member": "ana", **body})
+            assert response.status_code == 400
+            assert "must be strings" in response.json()["error"]
+
+
 class TestAddRoute:
     """Tests for the add restaurant routes."""
 
@@ -184,6 +235,34 @@ class TestAddRoute:
         assert response.status_code == 200
         assert b"already exists" in response.content
 
+    def test_add_normalized_duplicate_fails(self, client, test_db_path):
+        """Adding a variant spelling of an existing restaurant should be rejected."""
+        response = client.post("/add", data={"name": "mcdonalds", "option": "cheap"})
+        assert "already exists as 'McDonald's'" in response.text
+
+        conn = sqlite3.connect(test_db_path)
+        count = conn.execute("SELECT COUNT(*) FROM lunch_list WHERE restaurants = 'mcdonalds'").fetchone()[0]
+        conn.close()
+        assert count == 0
+
+    def test_suggest_prefix_matches(self, client):
+        """Typing a prefix should list matching restaurants."""
+        response = client.get("/add/suggest", params={"name": "bu"})
+        assert response.status_code == 200
+        assert "<li>Burger King</li>" in response.text
+
+    def test_suggest_warns_on_near_duplicate(self, client):
+        """A near-duplicate name should produce a warning."""
+        response = client.get("/add/suggest", params={"name": "Burger Kings"})
+        assert "Similar to: Burger King" in response.text
+
+    def test_suggest_picks_up_new_restaurants(self, client):
+        """Restaurants added after the index is built should be suggested."""
+        client.get("/add/suggest", params={"name": "x"})
+        client.post("/add", data={"name": "Xiao Long Bao House", "option": "normal"})
+        response = client.get("/add/suggest", params={"name": "xiao"})
+        assert "Xiao Long Bao House" in response.text
+
 
 class TestListRoute:
     """Tests for the list restaurants route."""
@@ -234,6 +313,118 @@ class TestDeleteRoute:
         assert response.status_code == 200
 
 
+class TestBatchRoute:
+    """Tests for the batch add/delete API."""
+
+    def test_batch_returns_per_item_results(self, client):
+        """Batch endpoint should apply operations and report each one."""
+        response = client.post(
+            "/api/restaurants/batch",
+            json={
+                "operations": [
+                    {"op": "add", "name": "Batch Place", "option": "cheap"},
+                    {"op": "delete", "name": "NonExistent"},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["ok"] is True
+        assert results[1]["ok"] is False
+
+        assert "Batch Place" in client.get("/list").text
+
+    def test_batch_reports_malformed_items(self, client):
+        """Malformed items should fail on their own without rolling back valid ones."""
+        response = client.post(
+            "/api/restaurants/batch",
+            json={
+                "operations": [
+                    {"op": "add", "name": ["x"]},
+                    {"op": "add", "name": "Ok Place", "option": "cheap"},
+                    {"op": "add", "name": "Odd Place", "option": {"kind": "cheap"}},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["ok"] for result in results] == [False, True, False]
+        assert "not a string" in results[0]["error"]
+
+        listing = client.get("/list").text
+        assert "Ok Place" in listing
+        assert "Odd Place" not in listing
+
+    def test_batch_rejects_malformed_body(self, client):
+        """Batch endpoint should reject bodies without an operations list."""
+        response = client.post("/api/restaurants/batch", json={"ops": []})
+        assert response.status_code == 400
+
+
+class TestExportRoute:
+    """Tests for the streaming export endpoint."""
+
+    def test_export_csv_default(self, client):
+        """Export should stream the catalog as CSV by default."""
+        response = client.get("/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="lunch_list.csv"' in response.headers["content-disposition"]
+        assert "McDonald's,cheap" in response.text
+
+    def test_export_ndjson(self, client):
+        """Export should support NDJSON."""
+        response = client.get("/export", params={"table": "lunch_list", "fmt": "ndjson"})
+        assert response.status_code == 200
+        assert len(response.text.splitlines()) == 6
+
+    def test_export_invalid_format(self, client):
+        """Unknown formats should return 400."""
+        response = client.get("/export", params={"fmt": "xml"})
+        assert response.status_code == 400
+
+
+class TestSearchRoute:
+    """Tests for the full-text search endpoint."""
+
+    def test_list_has_search_box(self, client):
+        """List page should include the search input."""
+        response = client.get("/list")
+        assert 'hx-get="/search"' in response.text
+        assert 'id="search-results"' in response.text
+
+    def test_search_returns_ranked_fragment(self, client):
+        """Search should return matching restaurant cards."""
+        response = client.get("/search", params={"q": "burger"})
+        assert response.status_code == 200
+        assert "Burger King" in response.text
+        assert "McDonald" not in response.text
+
+    def test_search_no_matches(self, client):
+        """Search with no hits should say so."""
+        response = client.get("/search", params={"q": "sushi"})
+        assert "No matches" in response.text
+
+    def test_empty_search_clears_results(self, client):
+        """Blank query should return an empty results container."""
+        response = client.get("/search", params={"q": ""})
+        assert 'id="search-results"' in response.text
+        assert "restaurant-card" not in response.text
+
+
+class TestStartupRoute:
+    """Tests for the startup timing report."""
+
+    def test_startup_report_phases(self, client):
+        """Startup report should list each phase up to the first request."""
+        client.get("/")
+        response = client.get("/api/startup")
+        assert response.status_code == 200
+        report = response.json()
+        assert set(report["phases"]) == {"import", "server_start", "db_init", "first_request"}
+        assert report["total_ms"] == pytest.approx(sum(report["phases"].values()), abs=0.1)
+
+
 class TestSettingsRoute:
     """Tests for the settings route."""
 
@@ -0,0 +1,117 @@
+"""
+Tests for group rolls.
+Tests bitset helpers, member vetoes and likes, and group picks against SQLite.
+"""
+
+import pytest
+import random
+from app.backend import groups
+from app.backend.db import (
+    add_restaurant_to_db,
+    delete_restaurant_from_db,
+    get_connection,
+    get_recent_lunches,
+    import_records,
+    set_restaurant_rating,
+)
+from unittest.mock import patch
+
+
+@pytest.fixture(autouse=True)
+def fresh_category_bitsets():
+    """Start each test without cached category bitsets."""
+    groups.categories.clear()
+    yield
+    groups.categories.clear()
+
+
+class TestBitsets:
+    """Test the bitset helpers."""
+
+    def test_round_trip(self):
+        ids = [0, 7, 8, 63, 64, 1000]
+        mask = groups.to_bitset(ids)
+        assert groups.from_bitset(mask) == ids
+        assert groups.decode_bitset(groups.encode_bitset(mask)) == mask
+        assert groups.to_bitset([]) == 0
+
+    def test_random_bit_covers_dense_set(self):
+        rng = random.Random(3)
+        assert {groups.random_bit(0b1011, rng) for _ in range(200)} == {0, 1, 3}
+
+    def test_random_bit_in_sparse_set(self):
+        rng = random.Random(5)
+        mask = groups.to_bitset([5, 99_000])
+        assert {groups.random_bit(mask, rng) for _ in range(100)} == {5, 99_000}
+
+    def test_random_bit_requires_a_bit(self):
+        with pytest.raises(ValueError):
+            groups.random_bit(0)
+
+
+class TestGroupRolls:
+    """Test group rooms against the database."""
+
+    def test_vetoes_are_never_picked(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", vetoes=["McDonald's"])
+            groups.set_member("team", "bo", vetoes=["Subway"])
+            assert groups.eligible_restaurants("team", "cheap") == [("Burger King", "cheap")]
+            assert groups.roll_group("team", "cheap") == ("Burger King", "cheap")
+            assert get_recent_lunches(limit=1)[0][0] == "Burger King"
+
+    def test_everything_vetoed_raises_error(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", vetoes=["McDonald's", "Burger King", "Subway"])
+            with pytest.raises(ValueError, match="nobody in 'team' has vetoed"):
+                groups.roll_group("team", "cheap")
+
+    def test_shared_likes_are_preferred(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", likes=["The Ritz", "Steakhouse"])
+            groups.set_member("team", "bo", likes=["Steakhouse"])
+            groups.set_member("team", "cy")  # no preferences
+            assert groups.roll_group("team", "Normal")[0] == "Steakhouse"
+            # Steakhouse was the last lunch; the next liked-by-anyone pick is The Ritz
+            assert groups.roll_group("team", "Normal")[0] == "The Ritz"
+
+    def test_deleted_restaurant_bits_are_released(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", vetoes=["Subway"])
+            subway_id = get_connection().execute("SELECT id FROM lunch_list WHERE restaurants = 'Subway'").fetchone()[0]
+            delete_restaurant_from_db("Subway")
+            groups.set_member("team", "bo")
+            vetoes = get_connection().execute("SELECT vetoes FROM group_member WHERE member = 'ana'").fetchone()[0]
+            assert not groups.decode_bitset(vetoes) >> subway_id & 1
+            add_restaurant_to_db("Taco Stand", "cheap")
+            assert ("Taco Stand", "cheap") in groups.eligible_restaurants("team", "cheap")
+
+    def test_vetoes_and_ratings_survive_replace_import(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", vetoes=["Subway"])
+            set_restaurant_rating("Subway", 5)
+            subway_id = get_connection().execute("SELECT id FROM lunch_list WHERE restaurants = 'Subway'").fetchone()[0]
+
+            result = import_records("lunch_list", [{"restaurants": "Subway", "option": "cheap"}], on_duplicate="replace")
+
+            assert result.written == 1
+            conn = get_connection()
+            assert conn.execute("SELECT id FROM lunch_list WHERE restaurants = 'Subway'").fetchone()[0] == subway_id
+            assert conn.execute("SELECT rating FROM restaurant_rating WHERE restaurant_id = ?", (subway_id,)).fetchone()[0] == 5
+            assert ("Subway", "cheap") not in groups.eligible_restaurants("team", "cheap")
+
+    def test_unknown_restaurant_or_room_raises_error(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(ValueError, match="Restaurant 'Nowhere' not found"):
+                groups.set_member("team", "ana", vetoes=["Nowhere"])
+            with pytest.raises(ValueError, match="Group 'ghosts' not found"):
+                groups.roll_group("ghosts", "cheap")
+
+    def test_remove_member_and_delete_room(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            groups.set_member("team", "ana", vetoes=["McDonald's", "Burger King", "Subway"])
+            groups.remove_member("team", "ana")
+            assert len(groups.eligible_restaurants("team", "cheap")) == 3
+            groups.delete_room("team")
+            with pytest.raises(ValueError, match="not found"):
+                groups.eligible_restaurants("team", "cheap")
@@ -0,0 +1,82 @@
+"""
+Tests for the shared outbound HTTP client.
+Tests that calls reuse one pooled client and apply the configured timeouts.
+"""
+
+import httpx
+import pytest
+import threading
+from app.backend import http_client
+from unittest.mock import patch
+
+
+@pytest.fixture(autouse=True)
+def fresh_client():
+    """Start and finish each test without a shared client."""
+    http_client.close_client()
+    yield
+    http_client.close_client()
+
+
+@pytest.fixture
+def seen():
+    """Install a client whose transport records requests instead of sending them."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    http_client._client = httpx.Client(transport=httpx.MockTransport(handler), timeout=httpx.Timeout(30.0, connect=5.0))
+    return requests
+
+
+class TestHttpClient:
+    """Test cases for the shared HTTP client."""
+
+    def test_client_is_shared(self):
+        """Test every caller gets the same pooled client until it is closed."""
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(http_client.get_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(client) for client in clients}) == 1
+
+        http_client.close_client()
+        assert clients[0].is_closed
+        assert http_client.get_client() is not clients[0]
+
+    def test_client_uses_config(self):
+        """Test the pool and default timeouts come from the app config."""
+        with patch.dict("os.environ", {"HTTP_TIMEOUT": "12", "HTTP_CONNECT_TIMEOUT": "2"}):
+            client = http_client.get_client()
+        assert client.timeout == httpx.Timeout(12.0, connect=2.0)
+
+    def test_get_and_post(self, seen):
+        """Test the helpers send through the shared client."""
+        assert http_client.get("https://example.com/a", params={"q": "x"}).json() == {"ok": True}
+        http_client.post("https://example.com/b", json={"model": "m"})
+
+        assert [(r.method, r.url.path) for r in seen] == [("GET", "/a"), ("POST", "/b")]
+        assert seen[0].url.params["q"] == "x"
+        assert seen[1].read() == b'{"model":"m"}'
+
+    def test_timeout_override(self, seen):
+        """Test a per-call timeout replaces the read timeout but keeps the connect timeout."""
+        http_client.get("https://example.com/")
+        http_client.get("https://example.com/", timeout=7)
+
+        assert seen[0].extensions["timeout"]["read"] == 30.0
+        assert seen[1].extensions["timeout"]["read"] == 7
+        assert seen[1].extensions["timeout"]["connect"] == 5.0
+
+    def test_per_host_limit(self, seen):
+        """Test concurrent requests to one host share a bounded slot pool."""
+        with patch.dict("os.environ", {"HTTP_MAX_PER_HOST": "2"}):
+            slot = http_client._host_slot("https://example.com/x")
+        assert slot is http_client._host_slot("https://example.com/y")
+        assert slot is not http_client._host_slot("https://other.example/")
+        assert slot.acquire(blocking=False) and slot.acquire(blocking=False)
+        assert not slot.acquire(blocking=False)
@@ -127,6 +127,23 @@ class TestRestaurantService:
         mock_db_manager.calculate_lunch.assert_called_once_with("Normal", service.session_rolled_restaurants["Normal"])
         assert result == ("McDonald's", "cheap")
 
+    def test_select_restaurants_success(self, mock_db_manager):
+        """Test selecting a schedule in one call."""
+        mock_db_manager.calculate_lunches.return_value = [("McDonald's", "cheap"), ("Burger King", "cheap")]
+        service = RestaurantService(mock_db_manager)
+        result = service.select_restaurants(2, "cheap")
+
+        mock_db_manager.calculate_lunches.assert_called_once_with(2, "cheap", service.session_rolled_restaurants["cheap"])
+        assert result == [("McDonald's", "cheap"), ("Burger King", "cheap")]
+
+    def test_select_restaurants_no_restaurants_found(self, mock_db_manager):
+        """Test schedule selection when no restaurants found."""
+        mock_db_manager.calculate_lunches.side_effect = ValueError("No restaurants found with option: expensive")
+        service = RestaurantService(mock_db_manager)
+
+        with pytest.raises(ValueError, match="No expensive restaurants available. Add some restaurants first!"):
+            service.select_restaurants(5, "expensive")
+
     def test_get_random_restaurant_success(self, mock_db_manager):
         """Test successful random restaurant selection."""
         service = RestaurantService(mock_db_manager)
@@ -171,6 +188,19 @@ class TestRestaurantService:
         assert len(service.session_rolled_restaurants["cheap"]) == 0
         assert len(service.session_rolled_restaurants["Normal"]) == 0
 
+    def test_apply_batch(self, mock_db_manager):
+        """Test batch operations are passed through to the database layer."""
+        operations = [{"op": "add", "name": "New Place", "option": "cheap"}, {"op": "delete", "name": "Gone"}]
+        mock_db_manager.apply_restaurant_batch.return_value = [
+            {"op": "add", "name": "New Place", "ok": True, "error": None},
+            {"op": "delete", "name": "Gone", "ok": False, "error": "Restaurant 'Gone' not found"},
+        ]
+        service = RestaurantService(mock_db_manager)
+        results = service.apply_batch(operations)
+
+        mock_db_manager.apply_restaurant_batch.assert_called_once_with(operations)
+        assert [r["ok"] for r in results] == [True, False]
+
     def test_session_state_isolation(self, mock_db_manager):
         """Test that session state is properly isolated between categories."""
         service = RestaurantService(mock_db_manager)
@@ -0,0 +1,93 @@
+"""
+Tests for the SQLite storage profile.
+
+Tests validate:
+- Profile selection and per-pragma overrides from environment variables
+- Pragmas applied to pooled connections
+- The pragma check report
+"""
+
+import pytest
+from unittest.mock import patch
+
+
+class TestGetStorageConfig:
+    """Test storage profile loading."""
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_default_profile_is_balanced_wal(self):
+        from app.config import get_storage_config
+
+        cfg = get_storage_config()
+        assert cfg.profile == "balanced"
+        assert cfg.journal_mode == "wal"
+        assert cfg.synchronous == "normal"
+        assert cfg.busy_timeout > 0
+
+    @patch.dict("os.environ", {"SQLITE_PROFILE": "durable"}, clear=True)
+    def test_named_profile(self):
+        from app.config import get_storage_config
+
+        cfg = get_storage_config()
+        assert cfg.profile == "durable"
+        assert cfg.synchronous == "full"
+
+    @patch.dict(
+        "os.environ", {"SQLITE_PROFILE": "fast", "SQLITE_BUSY_TIMEOUT": "250", "SQLITE_SYNCHRONOUS": "NORMAL"}, clear=True
+    )
+    def test_overrides_apply_on_top_of_profile(self):
+        from app.config import STORAGE_PROFILES, get_storage_config
+
+        cfg = get_storage_config()
+        assert cfg.busy_timeout == 250
+        assert cfg.synchronous == "normal"
+        assert cfg.mmap_size == STORAGE_PROFILES["fast"].mmap_size
+
+    @patch.dict("os.environ", {"SQLITE_PROFILE": "turbo"}, clear=True)
+    def test_invalid_profile_raises_error(self):
+        from app.config import ConfigurationError, get_storage_config
+
+        with pytest.raises(ConfigurationError, match="Invalid SQLITE_PROFILE"):
+            get_storage_config()
+
+    @patch.dict("os.environ", {"SQLITE_SYNCHRONOUS": "sometimes"}, clear=True)
+    def test_invalid_synchronous_raises_error(self):
+        from app.config import ConfigurationError, get_storage_config
+
+        with pytest.raises(ConfigurationError, match="Invalid SQLITE_SYNCHRONOUS"):
+            get_storage_config()
+
+
+class TestStoragePragmas:
+    """Test pragmas on pooled connections."""
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_pragmas_in_effect(self, setup_test_db):
+        from app.backend.db import check_storage_pragmas
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            report = check_storage_pragmas()
+
+        assert report["journal_mode"]["actual"] == "wal"
+        assert report["busy_timeout"]["ok"]
+        assert report["synchronous"]["ok"]
+        assert report["temp_store"]["ok"]
+        assert report["cache_size"]["ok"]
+
+    @patch.dict("os.environ", {"SQLITE_PROFILE": "durable"}, clear=True)
+    def test_report_reflects_profile(self, setup_test_db):
+        from app.backend.db import check_storage_pragmas
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            report = check_storage_pragmas()
+
+        assert report["synchronous"]["actual"] == 2
+        assert report["busy_timeout"]["actual"] == 10000
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_memory_database_reports_journal_mismatch(self):
+        from app.backend.db import check_storage_pragmas
+
+        report = check_storage_pragmas(":memory:")
+        assert report["journal_mode"]["ok"] is False
+        assert report["journal_mode"]["actual"] == "memory"
@@ -0,0 +1,118 @@
+"""
+Tests for the in-memory name index.
+Tests prefix autocomplete, near-duplicate detection and catalog syncing.
+"""
+
+import pytest
+from app.backend.db import CatalogSnapshot
+from app.backend.suggest import NameIndex, find_near_duplicates, name_key, normalize_name, suggest_names
+from unittest.mock import patch
+
+
+def snapshot(names, version):
+    return CatalogSnapshot(
+        restaurants=tuple((name, "cheap") for name in names), by_category={}, version=version, stamp=(1, version)
+    )
+
+
+@pytest.fixture
+def index():
+    idx = NameIndex()
+    idx.sync(snapshot(["Bubba's", "Burger King", "Café Rio", "The Ritz", "Fine Dining"], 1))
+    return idx
+
+
+class TestNormalization:
+    """Test name normalization."""
+
+    def test_variants_share_a_key(self):
+        assert name_key("Bubba's") == name_key("Bubbas") == name_key("bubba's") == "bubbas"
+
+    def test_accents_and_spacing(self):
+        assert normalize_name("  Café   Rio! ") == "cafe rio"
+        assert name_key("Burger King") == name_key("burgerking")
+
+
+class TestNameIndex:
+    """Test prefix and near-duplicate lookups."""
+
+    def test_prefix_matches_any_word(self, index):
+        assert index.prefix("bu") == ["Bubba's", "Burger King"]
+        assert index.prefix("kin") == ["Burger King"]
+        assert index.prefix("cafe") == ["Café Rio"]
+        assert index.prefix("") == []
+
+    def test_prefix_limit(self, index):
+        assert index.prefix("b", limit=1) == ["Bubba's"]
+
+    def test_exact_variant_is_duplicate(self, index):
+        assert index.near_duplicates("bubbas") == [("Bubba's", 1.0)]
+
+    def test_near_duplicate_scored(self, index):
+        duplicates = index.near_duplicates("Burger Kings")
+        assert [name for name, _ in duplicates] == ["Burger King"]
+        assert 0.7 <= duplicates[0][1] < 1.0
+
+    def test_unrelated_name_has_no_duplicates(self, index):
+        assert index.near_duplicates("Sushi Palace") == []
+
+    def test_sync_applies_changes(self, index):
+        index.sync(snapshot(["Bubba's", "Burger King", "Café Rio", "Fine Dining", "Ramen Bar"], 2))
+        assert len(index) == 5
+        assert index.prefix("ritz") == []
+        assert index.near_duplicates("The Ritz") == []
+        assert index.prefix("ram") == ["Ramen Bar"]
+
+    def test_sync_same_version_is_noop(self, index):
+        index.sync(snapshot([], 1))
+        assert len(index) == 5
+
+    def test_apply_change_in_place(self, index):
+        index.apply_change((1, 1), (1, 3), added=["Ramen Bar"], removed=["The Ritz"])
+        assert index.stamp == (1, 3)
+        assert index.prefix("ram") == ["Ramen Bar"]
+        assert index.prefix("ritz") == []
+
+    def test_apply_change_skipped_when_behind(self, index):
+        index.apply_change((1, 2), (1, 3), added=["Ramen Bar"], removed=[])
+        assert index.stamp == (1, 1)
+        assert index.prefix("ram") == []
+
+
+class TestCatalogIntegration:
+    """Test the shared index follows the database."""
+
+    def test_suggestions_follow_catalog(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            assert suggest_names("mc").matches == ["McDonald's"]
+            assert find_near_duplicates("Mcdonalds") == [("McDonald's", 1.0)]
+
+            from app.backend.db import add_restaurant_to_db, delete_restaurant_from_db
+
+            add_restaurant_to_db("Ramen Bar", "Normal")
+            delete_restaurant_from_db("McDonald's")
+            assert suggest_names("ra").matches == ["Ramen Bar"]
+            assert suggest_names("mc").matches == []
+
+    def test_local_writes_skip_the_catalog_diff(self, setup_test_db):
+        from app.backend import db
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            suggest_names("mc")
+            db.add_restaurant_to_db("Ramen Bar", "Normal")
+            db.apply_restaurant_batch([{"op": "add", "name": "Rice House"}, {"op": "delete", "name": "Subway"}])
+            with patch.object(db, "get_catalog", wraps=db.get_catalog) as get_catalog:
+                assert suggest_names("r").matches == ["Ramen Bar", "Rice House", "The Ritz"]
+                assert suggest_names("sub").matches == []
+            get_catalog.assert_not_called()
+
+    def test_external_writes_resync(self, setup_test_db):
+        import sqlite3
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            suggest_names("mc")
+            conn = sqlite3.connect(setup_test_db)
+            conn.execute("INSERT INTO lunch_list (restaurants, option) VALUES ('Ramen Bar', 'Normal')")
+            conn.commit()
+            conn.close()
+            assert suggest_names("ra").matches == ["Ramen Bar"]
@@ -0,0 +1,188 @@
+"""
+Tests for weighted selection.
+Tests alias tables, weight functions and weighted rolls against SQLite.
+"""
+
+import pytest
+import random
+import sqlite3
+from app.backend.db import calculate_lunch, get_connection, get_recent_lunches, set_restaurant_rating
+from app.backend.weights import (
+    AliasTable,
+    HistoryStats,
+    RestaurantStats,
+    WeightedSelector,
+    get_weight_functions,
+    recency_weight,
+)
+from app.config import ConfigurationError
+from collections import Counter
+from unittest.mock import patch
+
+
+class TestAliasTable:
+    """Test the alias table sampler."""
+
+    def test_draws_follow_weights(self):
+        table = AliasTable(["a", "b", "c"], [1.0, 2.0, 7.0])
+        rng = random.Random(42)
+        counts = Counter(table.draw(rng) for _ in range(20000))
+        assert counts["a"] / 20000 == pytest.approx(0.1, abs=0.02)
+        assert counts["b"] / 20000 == pytest.approx(0.2, abs=0.02)
+        assert counts["c"] / 20000 == pytest.approx(0.7, abs=0.02)
+
+    def test_zero_weight_never_drawn(self):
+        table = AliasTable(["a", "b"], [0.0, 1.0])
+        rng = random.Random(1)
+        assert {table.draw(rng) for _ in range(1000)} == {"b"}
+
+    def test_requires_positive_weight(self):
+        with pytest.raises(ValueError):
+            AliasTable(["a"], [0.0])
+
+
+class TestWeightFunctions:
+    """Test weight functions and their configuration."""
+
+    def test_recency_penalizes_recent_visits(self):
+        config = {"recency_half_life_days": 7}
+        never = RestaurantStats("a", "cheap", None, 0, None)
+        today = RestaurantStats("a", "cheap", None, 1, 0)
+        last_month = RestaurantStats("a", "cheap", None, 1, 30)
+        assert recency_weight(today, config) < recency_weight(last_month, config) < recency_weight(never, config)
+
+    def test_unknown_weight_raises_error(self):
+        with pytest.raises(ConfigurationError, match="Invalid SELECTION_WEIGHTS 'stars'"):
+            get_weight_functions(["rating", "stars"])
+
+
+class TestWeightedRolls:
+    """Test weighted selection against the database."""
+
+    @patch.dict("os.environ", {"SELECTION_MODE": "weighted", "SELECTION_WEIGHTS": "rating"})
+    def test_rating_zero_is_never_picked(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            set_restaurant_rating("McDonald's", 0)
+            picks = {calculate_lunch("cheap")[0] for _ in range(30)}
+            assert picks == {"Burger King", "Subway"}
+
+    @patch.dict("os.environ", {"SELECTION_MODE": "weighted", "SELECTION_WEIGHTS": "uniform"})
+    def test_never_repeats_last_pick(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            previous = None
+            for _ in range(30):
+                chosen = calculate_lunch("cheap")[0]
+                assert chosen != previous
+                previous = chosen
+            assert len(get_recent_lunches()) == 14
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "rating"})
+    def test_mode_argument_overrides_config(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            set_restaurant_rating("The Ritz", 5)
+            set_restaurant_rating("Fine Dining", 0)
+            set_restaurant_rating("Steakhouse", 0)
+            calculate_lunch("Normal", mode="weighted")
+            assert calculate_lunch("Normal", mode="weighted")[0] in {"Fine Dining", "Steakhouse"}
+
+    def test_invalid_mode_raises_error(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db), pytest.raises(ConfigurationError):
+            calculate_lunch("cheap", mode="psychic")
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "rating"})
+    def test_only_changed_categories_rebuild(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            selector = WeightedSelector()
+            conn = get_connection()
+            selector.refresh(conn)
+            assert selector.rebuilds == 2
+
+            set_restaurant_rating("Subway", 5)
+            selector.refresh(conn)
+            assert selector.rebuilds == 3
+
+            # Unchanged data: no rebuild at all
+            selector.refresh(conn)
+            assert selector.rebuilds == 3
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "rating"})
+    def test_ratings_from_another_connection_rebuild(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            selector = WeightedSelector()
+            conn = get_connection()
+            selector.refresh(conn)
+            assert selector.rebuilds == 2
+
+            other = sqlite3.connect(setup_test_db)
+            other.execute(
+                "INSERT INTO restaurant_rating (restaurant_id, rating) "
+                "SELECT id, 0 FROM lunch_list WHERE restaurants != 'Subway' AND category = 'cheap'"
+            )
+            other.commit()
+            other.close()
+            selector.refresh(conn)
+            assert selector.rebuilds == 3
+            assert {selector.draw(conn, "cheap", rng=random.Random(i))[0] for i in range(20)} == {"Subway"}
+
+    @patch.dict("os.environ", {"SELECTION_MODE": "weighted", "SELECTION_WEIGHTS": "rating,recency"})
+    def test_rolls_do_not_rebuild_tables(self, setup_test_db):
+        from app.backend.weights import selector
+
+        with patch('app.backend.db.db_path', setup_test_db):
+            selector.clear()
+            calculate_lunch("cheap")
+            rebuilds = selector.rebuilds
+            for _ in range(10):
+                calculate_lunch("cheap")
+            assert selector.rebuilds == rebuilds
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "recency"})
+    def test_per_draw_weights_follow_history(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            selector = WeightedSelector()
+            conn = get_connection()
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES ('Subway', datetime('now', 'localtime'))")
+            rng = random.Random(7)
+            counts = Counter(selector.draw(conn, "cheap", rng=rng)[0] for _ in range(6000))
+
+            config = {"recency_half_life_days": 7.0}
+            subway = recency_weight(RestaurantStats("Subway", "cheap", None, 1, 0), config)
+            assert counts["Subway"] / 6000 == pytest.approx(subway / (subway + 2), abs=0.015)
+            assert selector.rebuilds == 2
+
+    @patch.dict("os.environ", {"SELECTION_WEIGHTS": "frequency"})
+    def test_unbounded_history_weight_is_baked_in(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            selector = WeightedSelector()
+            conn = get_connection()
+            selector.refresh(conn)
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES ('Subway', '2024-01-01T12:00:00')")
+            selector.refresh(conn)
+            assert selector.rebuilds == 3
+
+    def test_history_stats_incremental_and_reload(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            conn = get_connection()
+            history = HistoryStats()
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES ('Subway', '2024-01-01T12:00:00')")
+            history.refresh(conn)
+            conn.executemany(
+                "INSERT INTO recent_lunch (restaurants, date) VALUES (?, ?)",
+                [("Subway", "2024-01-03T12:00:00"), ("The Ritz", "2024-01-02T12:00:00")],
+            )
+            history.refresh(conn)
+            assert history.visits == {"Subway": 2, "The Ritz": 1}
+            assert history.last_visit["Subway"] == "2024-01-03T12:00:00"
+
+            conn.execute("DELETE FROM recent_lunch WHERE date > '2024-01-02T13'")
+            conn.execute("INSERT INTO recent_lunch (restaurants, date) VALUES ('McDonald''s', '2024-01-04T12:00:00')")
+            history.refresh(conn)
+            assert history.visits == {"Subway": 1, "The Ritz": 1, "McDonald's": 1}
+            assert history.last_visit["Subway"] == "2024-01-01T12:00:00"
+
+    def test_rating_validation(self, setup_test_db):
+        with patch('app.backend.db.db_path', setup_test_db):
+            with pytest.raises(ValueError, match="between 0 and 5"):
+                set_restaurant_rating("Subway", 6)
+            with pytest.raises(ValueError, match="not found"):
+                set_restaurant_rating("Nowhere", 4)